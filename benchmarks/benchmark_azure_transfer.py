@@ -0,0 +1,67 @@
+"""Measure the throughput of AzureBlobStorageManager against a local blob stand-in.
+
+The stand-in limits each connection's bandwidth and adds a per-request latency, so parallel ranged transfers and connection reuse show their effect.
+
+Usage:
+    python benchmarks/benchmark_azure_transfer.py [--size_mb 256] [--max_concurrency 8] [--block_size_mb 8]
+"""
+import argparse
+import os
+import time
+from azure.storage.blob import ContainerClient
+from irisml.core.cache_manager import AzureBlobStorageManager
+from blob_stand_in import BlobStandIn
+
+
+class SingleStreamAzureBlobStorageManager(AzureBlobStorageManager):
+    """The behavior before connection pooling: a new client with the SDK defaults for each request and a single stream for each transfer.
+
+    Every request of the base class, including get_hash(), list_files() and delete_files(), gets its client from _get_container_client().
+    """
+    def __init__(self, container_url):
+        super().__init__(container_url, max_concurrency=1)
+
+    def _get_container_client(self):
+        return ContainerClient.from_container_url(self._container_url)
+
+
+def measure(storage_manager, name, data, num_small_requests):
+    start = time.perf_counter()
+    storage_manager.put_contents([name, 'large'], data, 'hash')
+    upload_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    downloaded = storage_manager.get_contents([name, 'large'])
+    download_time = time.perf_counter() - start
+    assert downloaded == data
+
+    storage_manager.put_contents([name, 'small'], b'0', 'hash')
+    start = time.perf_counter()
+    for _ in range(num_small_requests):
+        storage_manager.get_hash([name, 'small'])
+    metadata_time = (time.perf_counter() - start) / num_small_requests
+
+    return {'upload_mb_per_sec': len(data) / upload_time / 2 ** 20, 'download_mb_per_sec': len(data) / download_time / 2 ** 20, 'get_hash_ms': metadata_time * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AzureBlobStorageManager transfers.")
+    parser.add_argument('--size_mb', type=int, default=256)
+    parser.add_argument('--max_concurrency', type=int, default=AzureBlobStorageManager.DEFAULT_MAX_CONCURRENCY)
+    parser.add_argument('--block_size_mb', type=int, default=AzureBlobStorageManager.DEFAULT_BLOCK_SIZE // 2 ** 20)
+    parser.add_argument('--latency_ms', type=float, default=20)
+    parser.add_argument('--bandwidth_mb', type=float, default=50, help="Bandwidth limit for each connection in MB/s.")
+    parser.add_argument('--num_small_requests', type=int, default=20)
+    args = parser.parse_args()
+
+    data = os.urandom(args.size_mb * 2 ** 20)
+    with BlobStandIn(latency=args.latency_ms / 1000, bandwidth=args.bandwidth_mb * 2 ** 20) as server:
+        managers = {'single_stream': SingleStreamAzureBlobStorageManager(server.container_url),
+                    'pooled_parallel': AzureBlobStorageManager(server.container_url, max_concurrency=args.max_concurrency, block_size=args.block_size_mb * 2 ** 20)}
+        for name, storage_manager in managers.items():
+            result = measure(storage_manager, name, data, args.num_small_requests)
+            print(f"{name:>16}: upload {result['upload_mb_per_sec']:8.1f} MB/s, download {result['download_mb_per_sec']:8.1f} MB/s, get_hash {result['get_hash_ms']:6.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
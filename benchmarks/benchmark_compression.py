@@ -0,0 +1,73 @@
+"""Compare the compression codecs on representative task outputs.
+
+The outputs are pickled and then compressed with each available codec. Note that CacheManager stores large dense tensors in the tensors format without
+compression so that they can be memory-mapped. Those are marked in the output.
+
+Usage:
+    python benchmarks/benchmark_compression.py [--size_mb 64] [--codecs zlib:1 zlib zstd zstd:9 lz4]
+"""
+import argparse
+import importlib.util
+import os
+import random
+import time
+import torch
+from irisml.core import compression, serialization
+
+_REQUIRED_PACKAGES = {'zstd': 'zstandard', 'lz4': 'lz4'}
+
+
+def make_outputs(size):
+    """Returns {name: object} whose serialized sizes are roughly the given size."""
+    rng = random.Random(0)
+    words = ['a', 'photo', 'of', 'the', 'dog', 'cat', 'on', 'table', 'with', 'red', 'small', 'large', 'person', 'car']
+    num_strings = size // 64
+    captions = [' '.join(rng.choice(words) for _ in range(10)) for _ in range(num_strings)]
+    labels = torch.randint(0, 1000, (size // 8,), generator=torch.Generator().manual_seed(0))
+    sparse = torch.zeros(size // 4)
+    sparse[torch.randint(0, size // 4, (size // 400,), generator=torch.Generator().manual_seed(0))] = 1.0
+    encoded_images = [os.urandom(64 * 1024) for _ in range(size // (64 * 1024))]
+    return {'captions': captions, 'labels': labels, 'sparse_tensor': sparse, 'encoded_images': encoded_images}
+
+
+def measure(data, codec_name, level):
+    start = time.perf_counter()
+    compressed = compression.compress(data, codec_name, level)
+    compress_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decompressed = compression.decompress(compressed, codec_name)
+    decompress_time = time.perf_counter() - start
+    assert len(decompressed) == len(data)
+
+    return {'ratio': len(data) / len(compressed), 'compress_mb_per_sec': len(data) / compress_time / 2 ** 20, 'decompress_mb_per_sec': len(data) / decompress_time / 2 ** 20}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compression codecs for the cache.")
+    parser.add_argument('--size_mb', type=int, default=64)
+    parser.add_argument('--tensors_format_min_size_mb', type=float, default=1, help="The tensors_format_min_size of CacheManager in MB.")
+    parser.add_argument('--codecs', nargs='+', default=['zlib:1', 'zlib', 'zstd:1', 'zstd', 'zstd:9', 'lz4'])
+    args = parser.parse_args()
+
+    codecs = []
+    for value in args.codecs:
+        codec_name, level = compression.parse_compression(value)
+        if codec_name in _REQUIRED_PACKAGES and not importlib.util.find_spec(_REQUIRED_PACKAGES[codec_name]):
+            print(f"Skipping {value} since {_REQUIRED_PACKAGES[codec_name]} is not installed.")
+            continue
+        codecs.append((value, codec_name, level))
+
+    for name, value in make_outputs(args.size_mb * 2 ** 20).items():
+        data = serialization.serialize(value, serialization.FORMAT_PICKLE)
+        stored_as_tensors = serialization.select_format(value, args.tensors_format_min_size_mb * 2 ** 20) == serialization.FORMAT_TENSORS
+        print(f"\n{name} ({len(data) / 2 ** 20:.1f} MB){' - stored in the tensors format by CacheManager' if stored_as_tensors else ''}")
+        for label, codec_name, level in codecs:
+            result = measure(data, codec_name, level)
+            compressible = compression.is_compressible(data, codec_name, level)
+            print(f"{label:>10}: ratio {result['ratio']:6.2f}, compress {result['compress_mb_per_sec']:8.1f} MB/s, "
+                  f"decompress {result['decompress_mb_per_sec']:8.1f} MB/s, selected: {compressible}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Measure the time and the peak memory to resolve and hash Task inputs that have a large tensor.
+
+Context.resolve() and HashGenerator.calculate_hash() visit the dataclass fields without copying them. For comparison, the same operations are measured
+with dataclasses.asdict(), which deep-copies all the fields.
+
+Usage:
+    python benchmarks/benchmark_resolve.py [--size_gb 2] [--hash_version 2]
+"""
+import argparse
+import dataclasses
+import sys
+import time
+import torch
+from irisml.core import Context, JobDescription, TaskBase
+from irisml.core.hash_generator import HashGenerator
+from irisml.core.job import Job
+from irisml.core.memory_monitor import get_rss, MemoryMonitor
+
+
+class _TaskModule:
+    class Task(TaskBase):
+        VERSION = '0.1.0'
+        CACHE_ENABLED = False
+
+        @dataclasses.dataclass
+        class Inputs:
+            tensor: torch.Tensor
+
+        @dataclasses.dataclass
+        class Outputs:
+            num_elements: int = 0
+
+        def execute(self, inputs):
+            return self.Outputs(inputs.tensor.nelement())
+
+
+def measure(name, func, monitor, base_rss):
+    start = time.perf_counter()
+    with monitor.track(name):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:>24}: {elapsed:8.3f} s, peak memory {(monitor.get_peak(name) - base_rss) / 2 ** 30:6.2f} GB above the inputs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Context.resolve() and HashGenerator.calculate_hash() with a large tensor input.")
+    parser.add_argument('--size_gb', type=float, default=1)
+    parser.add_argument('--hash_version', type=int, default=2, choices=HashGenerator.HASH_VERSIONS)
+    parser.add_argument('--skip_asdict', action='store_true', help="Skip the measurements with dataclasses.asdict(), which need twice the memory.")
+    args = parser.parse_args()
+
+    HashGenerator.set_hash_version(args.hash_version)
+    tensor = torch.ones(int(args.size_gb * 2 ** 30) // 4, dtype=torch.float32)
+    inputs = _TaskModule.Task.Inputs(tensor)
+    context = Context()
+
+    sys.modules['irisml.tasks.benchmark_task'] = _TaskModule
+    job = Job(JobDescription.from_dict({'tasks': [{'task': 'benchmark_task', 'inputs': {'tensor': '$output.producer.tensor'}}]}))
+    job.load_modules()
+
+    @dataclasses.dataclass
+    class ProducerOutputs:
+        tensor: torch.Tensor = None
+
+    context.add_outputs('producer', ProducerOutputs(tensor))
+
+    monitor = MemoryMonitor(interval=0.01)
+    base_rss = get_rss() or 0
+    print(f"Input tensor: {tensor.nelement() * tensor.element_size() / 2 ** 30:.2f} GB, hash version {args.hash_version}")
+    measure('resolve', lambda: context.resolve(inputs), monitor, base_rss)
+    measure('calculate_hash', lambda: HashGenerator.calculate_hash(inputs), monitor, base_rss)
+    measure('Task.execute', lambda: next(job.tasks).execute(context), monitor, base_rss)
+    if not args.skip_asdict:
+        measure('resolve (asdict)', lambda: type(inputs)(**dataclasses.asdict(inputs)), monitor, base_rss)
+        measure('calculate_hash (asdict)', lambda: HashGenerator.calculate_hash(dataclasses.asdict(inputs)), monitor, base_rss)
+    monitor.close()
+
+
+if __name__ == '__main__':
+    main()
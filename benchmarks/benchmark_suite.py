@@ -0,0 +1,226 @@
+"""Measure the hot paths of the framework and compare the results with a baseline.
+
+The benchmarks run offline on CPU with synthetic tasks:
+    hash: HashGenerator.calculate_hash() on tensors and on a large dict, for each hash version.
+    resolve: Context.resolve() of Task inputs that refer to an output tensor.
+    load_config: Task._load_config() with a nested config that has many entries.
+    cache: CacheManager.upload_cache() and get_cache() with loading the field, on the local filesystem and on a local blob stand-in.
+    job: Constructing a chained job and loading its modules, and Job.get_consumers().
+
+The results are saved as JSON. Since the numbers depend on the machine, save a baseline on the same machine before the change and compare with it:
+    python benchmarks/benchmark_suite.py --output baseline.json
+    python benchmarks/benchmark_suite.py --baseline baseline.json --output results.json
+
+--save and --compare are aliases of --output and --baseline.
+
+The command exits with status 1 if any benchmark is slower than the baseline by more than --threshold and --min_diff_ms.
+
+Usage:
+    python benchmarks/benchmark_suite.py [--filter hash/] [--sizes 1K 1M 64M 1G] [--num_tasks 10 100 1000 10000] [--repeat 3]
+"""
+import argparse
+import dataclasses
+import datetime
+import json
+import pathlib
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import typing
+import unittest.mock
+import torch
+from irisml.core import Context, JobDescription, TaskBase
+from irisml.core.cache_manager import AzureBlobStorageManager, CacheManager, FileSystemStorageManager, parse_size
+from irisml.core.hash_generator import HashGenerator
+from irisml.core.job import Job
+from irisml.core.task import Task
+from irisml.core.variable import replace_variables
+from blob_stand_in import BlobStandIn
+
+
+class _TaskModule:
+    class Task(TaskBase):
+        VERSION = '0.1.0'
+
+        @dataclasses.dataclass
+        class Config:
+            name: str = ''
+
+        @dataclasses.dataclass
+        class Inputs:
+            tensor: torch.Tensor = None
+
+        @dataclasses.dataclass
+        class Outputs:
+            tensor: torch.Tensor = None
+
+        def execute(self, inputs):
+            return self.Outputs(inputs.tensor)
+
+
+@dataclasses.dataclass
+class _ChildConfig:
+    name: str
+    values: typing.List[int]
+    options: typing.Dict[str, str]
+
+
+@dataclasses.dataclass
+class _LargeConfig:
+    children: typing.List[_ChildConfig]
+    weight: typing.Optional[float] = None
+
+
+def _make_tensor(size):
+    return torch.ones(max(size // 4, 1), dtype=torch.float32)
+
+
+def _format_size(size):
+    for unit in ('B', 'K', 'M', 'G'):
+        if size < 1024 or unit == 'G':
+            return f'{size:g}{unit}' if unit != 'B' else f'{size}B'
+        size /= 1024
+
+
+def benchmark_hash(args):
+    for hash_version in HashGenerator.HASH_VERSIONS:
+        for size in args.sizes:
+            tensor = _make_tensor(size)
+            yield f'hash/v{hash_version}/tensor_{_format_size(size)}', lambda: HashGenerator.calculate_hash(tensor), lambda v=hash_version: HashGenerator.set_hash_version(v)
+        value = {f'key{i}': [i, str(i), float(i)] for i in range(10000)}
+        yield f'hash/v{hash_version}/dict_10000', lambda: HashGenerator.calculate_hash(value), lambda v=hash_version: HashGenerator.set_hash_version(v)
+
+
+def benchmark_resolve(args):
+    for size in args.sizes:
+        context = Context()
+        context.add_outputs('producer', _TaskModule.Task.Outputs(_make_tensor(size)))
+        inputs = _TaskModule.Task.Inputs(**replace_variables({'tensor': '$output.producer.tensor'}))
+        yield f'resolve/tensor_{_format_size(size)}', lambda: context.resolve(inputs), None
+
+
+def benchmark_load_config(args):
+    for num_children in (10, 1000):
+        config_dict = {'children': [{'name': f'child{i}', 'values': list(range(10)), 'options': {'k': 'v', 'k2': 'v2'}} for i in range(num_children)], 'weight': 0.5}
+        yield f'load_config/children_{num_children}', lambda: Task._load_config(_LargeConfig, config_dict), None
+
+
+def benchmark_cache(args):
+    with tempfile.TemporaryDirectory() as temp_dir, BlobStandIn() as server:
+        storage_managers = {'fs': FileSystemStorageManager(pathlib.Path(temp_dir)), 'azure': AzureBlobStorageManager(server.container_url)}
+        for storage_name, storage_manager in storage_managers.items():
+            cache_manager = CacheManager(storage_manager)
+            for size in args.sizes:
+                if storage_name == 'azure' and size > args.azure_max_size:
+                    continue  # The stand-in keeps the blobs in memory.
+                outputs = _TaskModule.Task.Outputs(_make_tensor(size))
+                task_hashes = []
+
+                def upload():
+                    # The blob storage doesn't overwrite existing caches, so each upload uses a new hash.
+                    task_hashes.append(f'hash{size}_{len(task_hashes)}')
+                    cache_manager.upload_cache('benchmark_task', '0.1.0', task_hashes[-1], outputs)
+
+                def load():
+                    cached_outputs = cache_manager.get_cache('benchmark_task', '0.1.0', task_hashes[-1], _TaskModule.Task.Outputs)
+                    assert cached_outputs.tensor.nelement() == outputs.tensor.nelement()
+
+                # The get benchmark uploads its own cache in its setup, so that it can run without the upload benchmark, e.g. with --filter get.
+                yield f'cache/{storage_name}/upload_{_format_size(size)}', upload, None
+                yield f'cache/{storage_name}/get_{_format_size(size)}', load, upload
+                server.blobs.clear()
+
+
+def benchmark_job(args):
+    for num_tasks in args.num_tasks:
+        tasks = [{'task': 'benchmark_task', 'name': 'task0'}]
+        tasks.extend({'task': 'benchmark_task', 'name': f'task{i}', 'config': {'name': f'task{i}'}, 'inputs': {'tensor': f'$output.task{i - 1}.tensor'}} for i in range(1, num_tasks))
+        job_dict = {'tasks': tasks}
+
+        def construct():
+            job = Job(JobDescription.from_dict(job_dict))
+            job.load_modules()
+            return job
+
+        yield f'job/construct_{num_tasks}', construct, None
+        job = construct()
+        yield f'job/get_consumers_{num_tasks}', job.get_consumers, None
+
+
+BENCHMARKS = {'hash': benchmark_hash, 'resolve': benchmark_resolve, 'load_config': benchmark_load_config, 'cache': benchmark_cache, 'job': benchmark_job}
+
+
+def run_benchmarks(args) -> typing.Dict[str, typing.Dict]:
+    results = {}
+    hash_version = HashGenerator.get_hash_version()
+    for benchmark in BENCHMARKS.values():
+        for name, func, setup in benchmark(args):
+            if args.filter and not any(f in name for f in args.filter):
+                continue
+            if setup:
+                setup()
+            times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                func()
+                times.append(time.perf_counter() - start)
+            results[name] = {'median': statistics.median(times), 'min': min(times), 'repeat': args.repeat}
+            print(f"{name:<40} median {results[name]['median'] * 1000:10.3f} ms, min {results[name]['min'] * 1000:10.3f} ms", flush=True)
+    HashGenerator.set_hash_version(hash_version)
+    return results
+
+
+def compare(results, baseline_results, threshold, min_diff) -> typing.List[str]:
+    """Print the ratios to the baseline.
+
+    Returns the names of the benchmarks that are slower than the baseline by more than the threshold ratio and by more than min_diff seconds. The absolute
+    difference filters out the noise of very short benchmarks.
+    """
+    regressions = []
+    print(f"\n{'Benchmark':<40} {'Baseline ms':>12} {'Current ms':>12} {'Ratio':>8}")
+    for name, result in results.items():
+        if name not in baseline_results:
+            print(f"{name:<40} {'-':>12} {result['median'] * 1000:12.3f} {'new':>8}")
+            continue
+        baseline = baseline_results[name]['median']
+        ratio = result['median'] / baseline if baseline > 0 else float('inf')
+        regressed = ratio > 1 + threshold and result['median'] - baseline > min_diff
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<40} {baseline * 1000:12.3f} {result['median'] * 1000:12.3f} {ratio:8.2f}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths of the framework.")
+    parser.add_argument('--filter', nargs='+', help="Run only the benchmarks whose names contain one of these strings, e.g. hash/v2 cache/fs")
+    parser.add_argument('--sizes', nargs='+', default=['1K', '1M', '64M'], help="Tensor sizes, e.g. 1K 1M 64M 1G")
+    parser.add_argument('--azure_max_size', default='256M', help="The max tensor size for the blob stand-in, which keeps the data in memory.")
+    parser.add_argument('--num_tasks', nargs='+', type=int, default=[10, 100, 1000, 10000], help="The number of tasks in the job benchmarks.")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', '--save', type=pathlib.Path, help="Save the results to this JSON file.")
+    parser.add_argument('--baseline', '--compare', type=pathlib.Path, help="Compare the results with this JSON file saved by --output.")
+    parser.add_argument('--threshold', type=float, default=0.2, help="A benchmark is a regression if its median time is larger than the baseline by this ratio.")
+    parser.add_argument('--min_diff_ms', type=float, default=1.0, help="Differences smaller than this are not regressions.")
+    args = parser.parse_args()
+    args.sizes = [parse_size(s) for s in args.sizes]
+    args.azure_max_size = parse_size(args.azure_max_size)
+
+    with unittest.mock.patch.dict(sys.modules, {'irisml.tasks.benchmark_task': _TaskModule}):
+        results = run_benchmarks(args)
+
+    if args.output:
+        metadata = {'timestamp': datetime.datetime.now().isoformat(), 'python': platform.python_version(), 'torch': torch.__version__, 'platform': platform.platform()}
+        args.output.write_text(json.dumps({'metadata': metadata, 'results': results}, indent=2))
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text())['results'], args.threshold, args.min_diff_ms / 1000)
+        if regressions:
+            print(f"\n{len(regressions)} benchmarks are slower than the baseline: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
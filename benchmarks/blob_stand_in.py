@@ -0,0 +1,181 @@
+"""A minimal in-memory stand-in for Azure Blob Storage.
+
+It implements only the subset of the Blob REST API that irisml uses: Get Blob Properties, Get Blob (with ranges), Put Blob, Put Block and Put Block List.
+To make the numbers comparable to a remote storage, each request is delayed by `latency` seconds and each connection is limited to `bandwidth` bytes/sec.
+
+Usage:
+    with BlobStandIn(latency=0.02, bandwidth=50 * 1024 * 1024) as server:
+        storage_manager = AzureBlobStorageManager(server.container_url)
+"""
+import base64
+import email.utils
+import http.server
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+import xml.etree.ElementTree
+
+
+class _Blob:
+    def __init__(self, data, metadata):
+        self.data = data
+        self.metadata = metadata
+        self.etag = '"' + uuid.uuid4().hex + '"'
+        self.last_modified = email.utils.formatdate(usegmt=True)
+
+
+class _RequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    CHUNK_SIZE = 64 * 1024
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._handle_get(head=True)
+
+    def do_GET(self):
+        self._handle_get(head=False)
+
+    def do_PUT(self):
+        self.server.stand_in.count_request()
+        blob_name, query = self._parse_path()
+        body = self._read_body()
+        metadata = {k[len('x-ms-meta-'):]: v for k, v in self.headers.items() if k.lower().startswith('x-ms-meta-')}
+        stand_in = self.server.stand_in
+
+        comp = query.get('comp')
+        if comp == 'block':
+            with stand_in.lock:
+                stand_in.uncommitted_blocks.setdefault(blob_name, {})[query['blockid']] = body
+            self._send(201)
+        elif comp == 'blocklist':
+            block_ids = [e.text for e in xml.etree.ElementTree.fromstring(body)]
+            with stand_in.lock:
+                if self.headers.get('If-None-Match') == '*' and blob_name in stand_in.blobs:
+                    return self._send_error(409, 'BlobAlreadyExists')
+                blocks = stand_in.uncommitted_blocks.pop(blob_name, {})
+                blob = stand_in.blobs[blob_name] = _Blob(b''.join(blocks[i] for i in block_ids), metadata)
+            self._send(201, {'ETag': blob.etag, 'Last-Modified': blob.last_modified})
+        else:
+            with stand_in.lock:
+                if self.headers.get('If-None-Match') == '*' and blob_name in stand_in.blobs:
+                    return self._send_error(409, 'BlobAlreadyExists')
+                blob = stand_in.blobs[blob_name] = _Blob(body, metadata)
+            self._send(201, {'ETag': blob.etag, 'Last-Modified': blob.last_modified})
+
+    def _handle_get(self, head):
+        self.server.stand_in.count_request()
+        blob_name, _ = self._parse_path()
+        blob = self.server.stand_in.blobs.get(blob_name)
+        if not blob:
+            return self._send_error(404, 'BlobNotFound')
+
+        headers = {'ETag': blob.etag, 'Last-Modified': blob.last_modified, 'x-ms-blob-type': 'BlockBlob', 'Accept-Ranges': 'bytes', 'Content-Type': 'application/octet-stream'}
+        headers.update({'x-ms-meta-' + k: v for k, v in blob.metadata.items()})
+        if head:
+            headers['Content-Length'] = str(len(blob.data))
+            return self._send(200, headers, send_content_length=False)
+
+        range_header = self.headers.get('x-ms-range') or self.headers.get('Range')
+        match = range_header and re.match(r'bytes=(\d+)-(\d*)', range_header)
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)) if match.group(2) else len(blob.data) - 1, len(blob.data) - 1)
+            if start >= len(blob.data):
+                return self._send_error(416, 'InvalidRange')
+            headers['Content-Range'] = f'bytes {start}-{end}/{len(blob.data)}'
+            self._send(206, headers, blob.data[start:end + 1])
+        else:
+            self._send(200, headers, blob.data)
+
+    def _parse_path(self):
+        parsed = urllib.parse.urlparse(self.path)
+        # The path is /<account>/<container>/<blob name>.
+        blob_name = urllib.parse.unquote(parsed.path).split('/', 3)[3]
+        query = {k: v[0] for k, v in urllib.parse.parse_qs(parsed.query).items()}
+        return blob_name, query
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        data = bytearray()
+        while len(data) < length:
+            chunk = self.rfile.read(min(self.CHUNK_SIZE, length - len(data)))
+            self.server.stand_in.throttle(len(chunk))
+            data += chunk
+        return bytes(data)
+
+    def _send(self, status, headers=None, body=b'', send_content_length=True):
+        time.sleep(self.server.stand_in.latency)
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header('x-ms-request-id', str(uuid.uuid4()))
+        self.send_header('x-ms-version', '2021-08-06')
+        self.send_header('Date', email.utils.formatdate(usegmt=True))
+        if send_content_length:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        view = memoryview(body)
+        for i in range(0, len(view), self.CHUNK_SIZE):
+            chunk = view[i:i + self.CHUNK_SIZE]
+            self.server.stand_in.throttle(len(chunk))
+            self.wfile.write(chunk)
+
+    def _send_error(self, status, error_code):
+        body = f'<?xml version="1.0" encoding="utf-8"?><Error><Code>{error_code}</Code><Message>{error_code}</Message></Error>'.encode('utf-8')
+        self._send(status, {'x-ms-error-code': error_code, 'Content-Type': 'application/xml'}, body if self.command != 'HEAD' else b'')
+
+
+class BlobStandIn:
+    """Serve a fake blob container on localhost.
+
+    Args:
+        latency (float): Delay in seconds added to each response.
+        bandwidth (int): Max bytes/sec for each connection. If None, unlimited.
+    """
+    ACCOUNT_NAME = 'devstoreaccount1'
+    CONTAINER_NAME = 'irisml'
+
+    def __init__(self, latency=0.0, bandwidth=None):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.blobs = {}
+        self.uncommitted_blocks = {}
+        self.lock = threading.Lock()
+        self.num_requests = 0
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _RequestHandler)
+        self._server.daemon_threads = True
+        self._server.stand_in = self
+        self._thread = None
+
+    @property
+    def container_url(self):
+        # A fake SAS token so that the client doesn't try other authentication methods.
+        sas = 'sv=2021-08-06&sig=' + urllib.parse.quote(base64.b64encode(b'irisml').decode('ascii'))
+        return f'http://127.0.0.1:{self._server.server_address[1]}/{self.ACCOUNT_NAME}/{self.CONTAINER_NAME}?{sas}'
+
+    def count_request(self):
+        with self.lock:
+            self.num_requests += 1
+
+    def throttle(self, num_bytes):
+        if self.bandwidth:
+            time.sleep(num_bytes / self.bandwidth)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
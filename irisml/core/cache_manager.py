@@ -1,30 +1,69 @@
 import abc
+import collections
+import concurrent.futures
 import dataclasses
+import json
 import logging
+import mmap
+import os
 import pathlib
 import pickle
+import threading
 import typing
 import urllib.parse
-import azure.core.exceptions
-from azure.storage.blob import ContainerClient
-from irisml.core.hash_generator import HashGenerator
+import uuid
+from irisml.core.hash_generator import asdict_without_copy, HashGenerator
+from irisml.core import compression, profiler, serialization
 
 
 logger = logging.getLogger(__name__)
 
 
 def create_storage_manager(url: str):
+    """Create a StorageManager for the given URL.
+
+    Supported URLs are:
+        - Azure Blob Storage container URL (http or https).
+        - Local directory path. The max size of the directory can be specified as <path>?max_size=<size>, e.g. /mnt/cache?max_size=100G.
+        - Multiple URLs separated by ';'. The first one is the fastest tier. See TieredStorageManager.
+    """
+    if ';' in url:
+        return TieredStorageManager([create_storage_manager(u.strip()) for u in url.split(';') if u.strip()])
+
     is_http = urllib.parse.urlparse(url).scheme in ['http', 'https']
     if is_http:
         return AzureBlobStorageManager(url)
-    elif pathlib.Path(url).exists():
-        return FileSystemStorageManager(pathlib.Path(url))
+
+    path, _, query = url.partition('?')
+    if pathlib.Path(path).exists():
+        options = urllib.parse.parse_qs(query)
+        max_size = parse_size(options['max_size'][0]) if 'max_size' in options else None
+        return FileSystemStorageManager(pathlib.Path(path), max_size=max_size)
 
     raise ValueError(f"Invalid cache storage URL is provided. {url} If it's local file path, please make sure the path exists on your filesystem.")
 
 
+def parse_size(size_str: str) -> int:
+    """Parse a size string such as '1024', '500M' or '100G'."""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+    size_str = size_str.strip().upper().rstrip('B')
+    if size_str and size_str[-1] in units:
+        return int(float(size_str[:-1]) * units[size_str[-1]])
+    return int(size_str)
+
+
+@dataclasses.dataclass
+class CacheFileInfo:
+    paths: typing.List[str]
+    size: int
+    last_access: float  # POSIX timestamp
+
+
 class StorageManager(abc.ABC):
-    """Access the storage that manages cache"""
+    """Access the storage that manages cache.
+
+    Contents can be compressed when they are stored. The codec is recorded with the contents, and get_contents() returns the decompressed contents.
+    """
     @abc.abstractmethod
     def get_hash(self, paths):
         pass
@@ -34,115 +73,669 @@ class StorageManager(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def put_contents(self, paths, contents, hash_value):
+    def put_contents(self, paths, contents, hash_value, codec: typing.Optional[str] = None, codec_level: typing.Optional[int] = None):
+        """Store the contents.
+
+        Args:
+            paths (List[str]): The paths to the contents.
+            contents (bytes-like): The contents.
+            hash_value (str): The hash value of the original object.
+            codec (str): The compression codec. See irisml.core.compression. If None, the contents are stored as is.
+            codec_level (int): The compression level. If None, the default level for the codec is used.
+        """
         pass
 
+    def get_buffer(self, paths):
+        """Get the contents as a writable buffer. Storages that can map the contents into memory should override this method."""
+        contents = self.get_contents(paths)
+        return contents if contents is None or isinstance(contents, bytearray) else bytearray(contents)
+
+    def get_contents_and_hash(self, paths):
+        """Returns a tuple (contents, hash_value). Storages that can get both in a single request should override this method."""
+        contents = self.get_contents(paths)
+        return (None, None) if contents is None else (contents, self.get_hash(paths))
+
+    def get_stats(self) -> typing.Dict[str, typing.Dict[str, int]]:
+        """Returns statistics of the storage access, e.g. {<storage name>: {'hits': <int>, 'misses': <int>}}."""
+        return {}
+
+    def list_files(self, prefix_paths: typing.Optional[typing.List[str]] = None) -> typing.Iterator[CacheFileInfo]:
+        """List all cached files under the prefix paths."""
+        raise NotImplementedError(f"{type(self).__name__} doesn't support listing.")
+
+    def delete_files(self, paths_list: typing.List[typing.List[str]]):
+        """Delete the specified files. Missing files are ignored."""
+        raise NotImplementedError(f"{type(self).__name__} doesn't support deletion.")
+
 
 class AzureBlobStorageManager(StorageManager):
     """Interact with Azure Blob Storage.
 
     URL to the container must be provided. If the URL doesn't contain SAS token, Managed Identity and Intractive authentication will be used.
 
-    Hash value will be stored in the metadata field of the blob.
+    Hash value, compression codec and the size before compression will be stored in the metadata field of the blob.
+
+    A single ContainerClient is shared by all requests so that the connections are reused. Large blobs are transferred in blocks of block_size bytes,
+    with up to max_concurrency parallel connections.
+
+    Compressed contents are streamed: the compressed chunks are uploaded as blocks as they are produced, and a compressed blob is decompressed while its
+    chunks are downloaded into a buffer of the original size, which is recorded in the metadata. So a compressed copy of the contents is never held in
+    memory. Note that compressed blobs are downloaded with a
+    single connection since the chunks must be decompressed in order.
+
+    The Azure SDK is imported when the first request is made, so that the other storages don't pay for its import time.
+
+    Args:
+        container_url (str): URL to the container.
+        max_concurrency (int): The max number of parallel connections for a single transfer.
+        block_size (int): The size of each block in bytes for chunked uploads and ranged downloads.
     """
     HASH_METADATA_NAME = 'irisml_hash'
-
-    def __init__(self, container_url):
+    CODEC_METADATA_NAME = 'irisml_compression'
+    SIZE_METADATA_NAME = 'irisml_size'  # The size of the contents before compression.
+    DEFAULT_MAX_CONCURRENCY = 8
+    DEFAULT_BLOCK_SIZE = 8 * 1024 * 1024
+    LIST_PAGE_SIZE = 5000
+    DELETE_BATCH_SIZE = 256
+
+    def __init__(self, container_url, max_concurrency=DEFAULT_MAX_CONCURRENCY, block_size=DEFAULT_BLOCK_SIZE):
         self._container_url = container_url
+        self._max_concurrency = max_concurrency
+        self._block_size = block_size
+        self._container_client = None
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        # Hide the SAS token.
+        return urllib.parse.urlparse(self._container_url)._replace(query='').geturl()
+
+    def _get_container_client(self):
+        from azure.core.pipeline.transport import RequestsTransport
+        from azure.storage.blob import ContainerClient
+        import requests.adapters
+        import urllib3
+
+        with self._lock:
+            if not self._container_client:
+                # The default connection pool of requests keeps only 10 connections. Make sure all parallel connections can be reused.
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(self._max_concurrency, 10), max_retries=urllib3.util.Retry(total=False, redirect=False, raise_on_status=False))
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                transport = RequestsTransport(session=session, session_owner=False)
+                self._container_client = ContainerClient.from_container_url(self._container_url, transport=transport,
+                                                                            max_single_get_size=self._block_size, max_chunk_get_size=self._block_size,
+                                                                            max_single_put_size=self._block_size, max_block_size=self._block_size)
+            return self._container_client
 
     def get_hash(self, paths):
-        container_client = ContainerClient.from_container_url(self._container_url)
-        blob_client = container_client.get_blob_client('/'.join(paths))
+        from azure.core.exceptions import ResourceNotFoundError
+        blob_client = self._get_container_client().get_blob_client('/'.join(paths))
         try:
             properties = blob_client.get_blob_properties()
             hash_value = properties.metadata.get(self.HASH_METADATA_NAME)
             return hash_value
-        except azure.core.exceptions.ResourceNotFoundError:
+        except ResourceNotFoundError:
             logger.debug(f"{paths} was not found in the container.")
         return None
 
     def get_contents(self, paths):
-        container_client = ContainerClient.from_container_url(self._container_url)
+        return self.get_contents_and_hash(paths)[0]
+
+    def get_contents_and_hash(self, paths):
+        from azure.core.exceptions import ResourceNotFoundError
         try:
-            contents = container_client.download_blob('/'.join(paths)).readall()
-            return contents
-        except azure.core.exceptions.ResourceNotFoundError:
+            # The properties and the first block are downloaded here. The rest is downloaded by readall() or chunks().
+            downloader = self._get_container_client().download_blob('/'.join(paths), max_concurrency=self._max_concurrency)
+        except ResourceNotFoundError:
             logger.debug(f"{paths} was not found in the container.")
-        return None
-
-    def put_contents(self, paths, contents, hash_value):
+            return None, None
+
+        metadata = downloader.properties.metadata
+        codec = metadata.get(self.CODEC_METADATA_NAME)
+        if codec:
+            size = metadata.get(self.SIZE_METADATA_NAME)
+            contents = compression.decompress_chunks(downloader.chunks(), codec, int(size) if size else None)
+        else:
+            contents = downloader.readall()
+        return contents, metadata.get(self.HASH_METADATA_NAME)
+
+    def list_files(self, prefix_paths=None):
+        prefix = '/'.join(prefix_paths) + '/' if prefix_paths else None
+        # Each page has up to 5000 blobs. The last access time is available only if the access tracking is enabled on the storage account.
+        for blob in self._get_container_client().list_blobs(name_starts_with=prefix, results_per_page=self.LIST_PAGE_SIZE):
+            last_access = getattr(blob, 'last_accessed_on', None) or blob.last_modified
+            yield CacheFileInfo(blob.name.split('/'), blob.size, last_access.timestamp())
+
+    def delete_files(self, paths_list):
+        container_client = self._get_container_client()
+        names = ['/'.join(paths) for paths in paths_list]
+        for i in range(0, len(names), self.DELETE_BATCH_SIZE):
+            # A batch request can have up to 256 sub-requests.
+            container_client.delete_blobs(*names[i:i + self.DELETE_BATCH_SIZE], raise_on_any_failure=False)
+
+    def put_contents(self, paths, contents, hash_value, codec=None, codec_level=None):
         try:
-            container_client = ContainerClient.from_container_url(self._container_url)
-            container_client.upload_blob('/'.join(paths), contents, metadata={self.HASH_METADATA_NAME: hash_value})
+            metadata = {self.HASH_METADATA_NAME: hash_value}
+            if codec:
+                # The SDK reads the compressed chunks into blocks and uploads up to max_concurrency blocks in parallel.
+                metadata[self.SIZE_METADATA_NAME] = str(memoryview(contents).nbytes)
+                contents = compression.compress_chunks(contents, codec, codec_level)
+                metadata[self.CODEC_METADATA_NAME] = codec
+            elif not isinstance(contents, bytes):
+                contents = bytes(contents)  # The SDK handles other bytes-like objects as an iterable.
+            self._get_container_client().upload_blob('/'.join(paths), contents, metadata=metadata, max_concurrency=self._max_concurrency)
         except Exception as e:
             logger.warning(f"Failed to upload cache {paths} (hash={hash_value}) due to {e}. The error is ignored.")
 
 
 class FileSystemStorageManager(StorageManager):
-    """Use the local filesystem as the cache."""
+    """Use the local filesystem as the cache.
+
+    Each file has a sidecar file <filename>.irisml.json that stores {"hash": <hash value>, "size": <size in bytes>, "compression": <codec, optional>}, so that
+    get_hash() doesn't need to read the contents. Both files are written atomically. Compressed contents are streamed to the file in chunks.
+
+    The modification time of a file is updated when it is read, so it represents the last access time. If max_size is specified, the least recently used
+    entries are deleted when the total size exceeds max_size. An entry is the set of files in a directory, i.e. <task_name>/<version>/<task_hash> of
+    CacheManager, and it is deleted as a whole so that a manifest never refers to a deleted field. The last access time of an entry is the one of its
+    manifest since every cache lookup reads the manifest while fields might not be read at all.
+
+    Args:
+        cache_dir (pathlib.Path): The root directory of the cache.
+        max_size (int): The max total size of the cached files in bytes. If None, the size is not limited.
+    """
+    METADATA_SUFFIX = '.irisml.json'
 
-    def __init__(self, cache_dir: pathlib.Path):
+    def __init__(self, cache_dir: pathlib.Path, max_size: typing.Optional[int] = None):
         assert isinstance(cache_dir, pathlib.Path)
         self._cache_dir = cache_dir
+        self._max_size = max_size
+        self._total_size = None  # Estimated total size. It is calculated when the first file is added.
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return str(self._cache_dir)
 
     def get_hash(self, paths):
-        loaded = pickle.loads(self.get_contents(paths))
-        return HashGenerator.calculate_hash(loaded)
+        filepath = self._cache_dir.joinpath(*paths)
+        metadata = self._read_metadata(filepath)
+        if metadata:
+            self._touch(filepath)
+            return metadata['hash']
+
+        contents = self.get_contents(paths)
+        if contents is None:
+            return None
+
+        # The cache was created before the sidecar file was introduced. Calculate the hash and save it for the next time.
+        hash_value = HashGenerator.calculate_hash(pickle.loads(contents))
+        self._write_metadata(filepath, hash_value, len(contents))
+        return hash_value
 
     def get_contents(self, paths):
         filepath = self._cache_dir.joinpath(*paths)
-        if not filepath.exists():
+        try:
+            contents = filepath.read_bytes()
+        except FileNotFoundError:
             return None
-        return filepath.read_binary()
+        self._touch(filepath)
+        codec = self._get_codec(filepath)
+        return compression.decompress(contents, codec) if codec else contents
 
-    def put_contents(self, paths, contents, hash_value):
+    def get_buffer(self, paths):
+        """Map the file into memory. The pages are read when they are accessed. Changes to the buffer are not written back to the file.
+
+        Compressed contents cannot be mapped, so they are decompressed into a new buffer.
+        """
+        filepath = self._cache_dir.joinpath(*paths)
+        if self._get_codec(filepath):
+            contents = self.get_contents(paths)
+            return None if contents is None else bytearray(contents)
+        try:
+            with open(filepath, 'rb') as f:
+                self._touch(filepath)
+                if os.fstat(f.fileno()).st_size == 0:
+                    return bytearray()
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        except FileNotFoundError:
+            return None
+
+    def put_contents(self, paths, contents, hash_value, codec=None, codec_level=None):
         filepath = self._cache_dir.joinpath(*paths)
         if filepath.exists():
             logger.warning(f"Path {filepath} already exists. The new cache is not saved.")
             return
         filepath.parent.mkdir(parents=True, exist_ok=True)
-        filepath.write_bytes(contents)
+        size = self._write_atomic(filepath, compression.compress_chunks(contents, codec, codec_level) if codec else [contents])
+        self._write_metadata(filepath, hash_value, size, codec)
+
+        if self._max_size is not None:
+            with self._lock:
+                self._total_size = self._get_total_size() if self._total_size is None else self._total_size + size
+                if self._total_size > self._max_size:
+                    self._evict()
+
+    def list_files(self, prefix_paths=None):
+        for filepath, last_access, size in self._list_files(self._cache_dir.joinpath(*(prefix_paths or []))):
+            yield CacheFileInfo(list(filepath.relative_to(self._cache_dir).parts), size, last_access)
+
+    def delete_files(self, paths_list):
+        for paths in paths_list:
+            filepath = self._cache_dir.joinpath(*paths)
+            filepath.unlink(missing_ok=True)
+            self._get_metadata_path(filepath).unlink(missing_ok=True)
+        with self._lock:
+            self._total_size = None
+
+    def _touch(self, filepath):
+        try:
+            os.utime(filepath)
+        except OSError:  # The file might be deleted or the filesystem might be read-only.
+            pass
+
+    def _list_files(self, directory=None):
+        """Returns a list of (filepath, last access time, size) for all cached files in the directory."""
+        files = []
+        for dirpath, _, filenames in os.walk(directory or self._cache_dir):
+            for filename in filenames:
+                if filename.endswith(self.METADATA_SUFFIX) or filename.endswith('.tmp'):
+                    continue
+                filepath = pathlib.Path(dirpath, filename)
+                try:
+                    stat = filepath.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((filepath, stat.st_mtime, stat.st_size))
+        return files
+
+    def _get_total_size(self):
+        return sum(size for _, _, size in self._list_files())
+
+    def _evict(self):
+        """Delete the least recently used entries until the total size is under max_size. Other processes might share the directory, so scan it again."""
+        entries = {}  # directory, or file path for the files at the root => [(filepath, last access time, size)]
+        for f in self._list_files():
+            entries.setdefault(f[0].parent if f[0].parent != self._cache_dir else f[0], []).append(f)
+
+        def get_last_access(files):
+            manifests = [last_access for filepath, last_access, _ in files if filepath.name == CacheManager.MANIFEST_NAME]
+            return manifests[0] if manifests else max(last_access for _, last_access, _ in files)
+
+        self._total_size = sum(size for files in entries.values() for _, _, size in files)
+        for key, files in sorted(entries.items(), key=lambda e: get_last_access(e[1])):
+            if self._total_size <= self._max_size:
+                break
+            logger.debug(f"Evicting a cache entry {key}")
+            # The manifest is deleted first so that an interrupted eviction doesn't leave a manifest that refers to missing fields.
+            for filepath, _, size in sorted(files, key=lambda f: f[0].name != CacheManager.MANIFEST_NAME):
+                filepath.unlink(missing_ok=True)
+                self._get_metadata_path(filepath).unlink(missing_ok=True)
+                self._total_size -= size
+
+    def _get_metadata_path(self, filepath):
+        return filepath.with_name(filepath.name + self.METADATA_SUFFIX)
+
+    def _read_metadata(self, filepath):
+        try:
+            return json.loads(self._get_metadata_path(filepath).read_text())
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning(f"Failed to read the metadata for {filepath}: {e}")
+            return None
+
+    def _get_codec(self, filepath):
+        metadata = self._read_metadata(filepath)
+        return metadata and metadata.get('compression')
+
+    def _write_metadata(self, filepath, hash_value, size, codec=None):
+        metadata = {'hash': hash_value, 'size': size}
+        if codec:
+            metadata['compression'] = codec
+        self._write_atomic(self._get_metadata_path(filepath), [json.dumps(metadata).encode('utf-8')])
+
+    @staticmethod
+    def _write_atomic(filepath, chunks):
+        """Write the chunks to a temporary file and rename it so that readers never see a partial file. Returns the written size."""
+        temp_filepath = filepath.with_name(f'.{filepath.name}.{uuid.uuid4().hex}.tmp')
+        size = 0
+        try:
+            with open(temp_filepath, 'wb') as f:
+                for chunk in chunks:
+                    size += f.write(chunk)
+            os.replace(temp_filepath, filepath)
+        finally:
+            temp_filepath.unlink(missing_ok=True)
+        return size
+
+
+class TieredStorageManager(StorageManager):
+    """Combine multiple storages. The first tier is the fastest, e.g. a local disk, and the last one is the slowest, e.g. Azure Blob Storage.
+
+    Reads try each tier in order. If the contents are found in a slower tier, they are copied to all faster tiers without compression (read-through).
+    Writes go to all tiers (write-through).
+
+    A manifest of CacheManager is copied to the faster tiers only after all the fields in it are there, so that a manifest in a tier always means that the
+    whole entry is in the tier. Until then, the manifest is read from the slower tier.
+    """
+    MAX_PENDING_MANIFESTS = 1024
+
+    def __init__(self, tiers: typing.List[StorageManager]):
+        if not tiers:
+            raise ValueError("At least one storage is required.")
+        self._tiers = tiers
+        self._stats = [{'hits': 0, 'misses': 0} for _ in tiers]
+        self._pending_manifests = collections.OrderedDict()  # entry paths => (tier index, contents, hash value, names of the fields missing in faster tiers)
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return ';'.join(str(t) for t in self._tiers)
+
+    @property
+    def tiers(self):
+        return list(self._tiers)
+
+    def get_hash(self, paths):
+        for i, tier in enumerate(self._tiers):
+            hash_value = tier.get_hash(paths)
+            self._record(i, hash_value is not None)
+            if hash_value is not None:
+                return hash_value
+        return None
+
+    def get_contents(self, paths):
+        return self.get_contents_and_hash(paths)[0]
+
+    def get_contents_and_hash(self, paths):
+        for i, tier in enumerate(self._tiers):
+            contents, hash_value = tier.get_contents_and_hash(paths)
+            self._record(i, contents is not None)
+            if contents is not None:
+                self._promote(i, paths, contents, hash_value)
+                return contents, hash_value
+        return None, None
+
+    def get_buffer(self, paths):
+        buffer = self._tiers[0].get_buffer(paths)
+        self._record(0, buffer is not None)
+        if buffer is not None:
+            return buffer
+
+        for i, tier in enumerate(self._tiers[1:], 1):
+            contents, hash_value = tier.get_contents_and_hash(paths)
+            self._record(i, contents is not None)
+            if contents is not None:
+                self._promote(i, paths, contents, hash_value)
+                # Use the buffer from the fastest tier since it might be memory-mapped.
+                return self._tiers[0].get_buffer(paths) or bytearray(contents)
+        return None
+
+    def put_contents(self, paths, contents, hash_value, codec=None, codec_level=None):
+        for tier in self._tiers:
+            tier.put_contents(paths, contents, hash_value, codec, codec_level)
+
+    def get_stats(self):
+        with self._lock:
+            return {f'tier{i} {t}': dict(s) for i, (t, s) in enumerate(zip(self._tiers, self._stats))}
+
+    def _record(self, tier_index, hit):
+        with self._lock:
+            self._stats[tier_index]['hits' if hit else 'misses'] += 1
+
+    def _promote(self, tier_index, paths, contents, hash_value):
+        """Copy the contents found in the tier to the faster tiers. A manifest is kept pending until all of its fields are copied."""
+        if tier_index == 0:
+            return
+        faster_tiers = self._tiers[:tier_index]
+        entry_paths = tuple(paths[:-1])
+        if paths[-1] == CacheManager.MANIFEST_NAME:
+            try:
+                field_names = set(json.loads(contents)['fields'])
+            except Exception as e:
+                logger.warning(f"Failed to parse the manifest {'/'.join(paths)}: {e}")
+                return
+            missing = {n for n in field_names if any(t.get_hash(list(entry_paths) + [n]) is None for t in faster_tiers)}
+            with self._lock:
+                if missing:
+                    self._pending_manifests[entry_paths] = (tier_index, contents, hash_value, missing)
+                    if len(self._pending_manifests) > self.MAX_PENDING_MANIFESTS:
+                        self._pending_manifests.popitem(last=False)
+                    return
+        else:
+            for faster_tier in faster_tiers:
+                faster_tier.put_contents(paths, contents, hash_value)
+            with self._lock:
+                pending = self._pending_manifests.get(entry_paths)
+                if not pending:
+                    return
+                pending[3].discard(paths[-1])
+                if pending[3]:
+                    return
+                del self._pending_manifests[entry_paths]
+            # The manifest is written at last, the same as CacheManager does for uploads.
+            faster_tiers = self._tiers[:pending[0]]
+            paths, contents, hash_value = list(entry_paths) + [CacheManager.MANIFEST_NAME], pending[1], pending[2]
+
+        for faster_tier in faster_tiers:
+            faster_tier.put_contents(paths, contents, hash_value)
 
 
 class CachedOutputs:
-    """Used to represent cached outputs so that we can load the contents lazily."""
-    def __init__(self, storage_manager, base_paths, outputs_class, hash_values: typing.Dict[str, str]):
+    """Used to represent cached outputs so that we can load the contents lazily.
+
+    A field can be loaded in background with load_async(). Accessing the field waits for the background loading.
+
+    Args:
+        storage_manager (StorageManager): The storage that has the cache.
+        base_paths (List[str]): The paths to the cache entry.
+        outputs_class (dataclasses.dataclass): The Outputs class of the task.
+        hash_values (Dict[str, str]): The hash value of each field.
+        sizes (Dict[str, int]): The serialized size of each field, if known.
+        formats (Dict[str, str]): The serialization format of each field. See irisml.core.serialization. The default is pickle.
+    """
+    def __init__(self, storage_manager, base_paths, outputs_class, hash_values: typing.Dict[str, str], sizes: typing.Optional[typing.Dict[str, int]] = None,
+                 formats: typing.Optional[typing.Dict[str, str]] = None):
         self._storage_manager = storage_manager
         self._paths = base_paths
         self._field_types = {f.name: f.type for f in dataclasses.fields(outputs_class)}
         self._hash_values = hash_values
+        self._sizes = sizes or {}
+        self._formats = formats or {}
         self._contents = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Background loadings are not copied.
+        state = self.__dict__.copy()
+        state['_futures'] = {}
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def field_names(self) -> typing.List[str]:
+        return list(self._field_types)
 
     def get_hash(self, name: str) -> str:
         assert '.' not in name
         return self._hash_values[name]
 
+    def get_size(self, name: str) -> typing.Optional[int]:
+        """Returns the size of the serialized field in bytes. Returns None if the size is unknown."""
+        assert '.' not in name
+        return self._sizes.get(name)
+
+    def load_async(self, name: str, executor: concurrent.futures.Executor) -> concurrent.futures.Future:
+        """Start loading the field in the executor. Returns None if the field is already loaded or being loaded."""
+        with self._lock:
+            if name in self._contents or name in self._futures:
+                return None
+            future = executor.submit(profiler.bind_task(self._load), name)
+            self._futures[name] = future
+            return future
+
+    def release(self, name: str):
+        """Drop the reference to the loaded contents. The field will be loaded again if it is accessed."""
+        with self._lock:
+            self._contents.pop(name, None)
+            future = self._futures.pop(name, None)
+        if future:
+            future.cancel()
+
     def __getattr__(self, name):
         """Load the actual contents."""
+        # Special methods are looked up by copy and pickle. _field_types doesn't exist until __init__ or __setstate__ is called.
+        if name.startswith('__') or '_field_types' not in self.__dict__:
+            raise AttributeError(name)
+
         if name not in self._field_types:
             raise ValueError(f"Unexpected path: {name}")
 
-        if name in self._contents:
-            return self._contents[name]
-
-        contents = self._storage_manager.get_contents(self._paths + [name])
-        value = pickle.loads(contents)
-
-        if not isinstance(value, self._field_types[name]):
+        with self._lock:
+            if name in self._contents:
+                return self._contents[name]
+            future = self._futures.pop(name, None)
+
+        loaded = False
+        if future:
+            try:
+                value = future.result()
+                loaded = True
+            except concurrent.futures.CancelledError:
+                pass
+            except Exception as e:
+                logger.warning(f"Failed to load {name} in background: {e}. Retrying.")
+
+        if not loaded:
+            value = self._load(name)
+
+        with self._lock:
+            return self._contents.setdefault(name, value)
+
+    def _load(self, name):
+        format_name = self._formats.get(name, serialization.FORMAT_PICKLE)
+        with profiler.span('download', field=name):
+            if format_name == serialization.FORMAT_TENSORS:
+                contents = self._storage_manager.get_buffer(self._paths + [name])
+            else:
+                contents = self._storage_manager.get_contents(self._paths + [name])
+        if contents is None:
+            raise RuntimeError(f"The cache file for the field {name} is missing: {'/'.join(self._paths + [name])}")
+        profiler.add_bytes('downloaded', len(contents))
+        with profiler.span('deserialize', field=name):
+            value = serialization.deserialize(contents, format_name)
+        del contents
+
+        field_type = typing.get_origin(self._field_types[name]) or self._field_types[name]
+        if not isinstance(value, field_type):
             raise RuntimeError(f"The downloaded cache for {name} has invalid type: {type(value)}. Expected: {self._field_types[name]}")
 
-        # Check the hash value of the downloaded cache.
-        current_hash = HashGenerator.calculate_hash(value)
-        if current_hash != self._hash_values[name]:
-            logger.error(f"Downloaded cache {name} has wrong hash. Expected: {self._hash_values[name]}. Actual: {current_hash}. Ignoring this error.")
+        # Check the hash value of the downloaded cache. The tensors format is not checked since it would read all the memory-mapped pages.
+        if format_name == serialization.FORMAT_PICKLE:
+            with profiler.span('hash', field=name):
+                current_hash = HashGenerator.calculate_hash(value)
+            if current_hash != self._hash_values[name]:
+                logger.error(f"Downloaded cache {name} has wrong hash. Expected: {self._hash_values[name]}. Actual: {current_hash}. Ignoring this error.")
 
-        self._contents[name] = value
         return value
 
 
+class BackgroundUploader:
+    """Run uploads one by one in a background thread.
+
+    submit() blocks while the queue has max_pending_uploads items or while the queued items would exceed max_pending_bytes. A single item larger than
+    max_pending_bytes is accepted once the queue is empty.
+    """
+    def __init__(self, max_pending_uploads, max_pending_bytes):
+        self._max_pending_uploads = max_pending_uploads
+        self._max_pending_bytes = max_pending_bytes
+        self._queue = collections.deque()
+        self._condition = threading.Condition()
+        self._num_pending = 0  # Includes the item that is being uploaded.
+        self._pending_bytes = 0
+        self._failures = []
+        self._thread = None
+
+    def submit(self, paths, size, func, *args):
+        with self._condition:
+            self._condition.wait_for(lambda: self._num_pending == 0 or (self._num_pending < self._max_pending_uploads and self._pending_bytes + size <= self._max_pending_bytes))
+            self._queue.append((paths, size, func, args))
+            self._num_pending += 1
+            self._pending_bytes += size
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run, name='irisml-cache-uploader', daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def add_failure(self, paths, exception):
+        with self._condition:
+            self._failures.append((paths, exception))
+
+    def flush(self):
+        with self._condition:
+            self._condition.wait_for(lambda: self._num_pending == 0)
+            failures = self._failures
+            self._failures = []
+            return failures
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queue)
+                paths, size, func, args = self._queue.popleft()
+
+            try:
+                func(*args)
+            except Exception as e:
+                logger.warning(f"Failed to upload cache {paths} due to {e}. The error is ignored.")
+                self.add_failure(paths, e)
+
+            with self._condition:
+                self._num_pending -= 1
+                self._pending_bytes -= size
+                self._condition.notify_all()
+
+
 class CacheManager:
-    def __init__(self, storage_manager):
+    """Save and load task outputs.
+
+    Each field of the outputs is stored at <task_name>/<version>/<task_hash>/<field_name>. After all fields are stored, a manifest is stored at
+    <task_name>/<version>/<task_hash>/manifest.json so that a single read can decide if there is a cache. The manifest has the following format.
+        {"version": 1, "hash_version": <HashGenerator version>, "fields": {<field_name>: {"hash": <hash value>, "size": <size in bytes>, "format": "pickle" | "tensors"}}}
+
+    Each field is serialized in the format chosen by irisml.core.serialization.select_format(). Caches without a manifest are still loaded by reading the hash of each field.
+
+    If a compression codec is specified, pickled fields larger than compression_min_size are compressed by the storage, unless a sample of the contents
+    doesn't get smaller. The tensors format is never compressed so that it can be memory-mapped. The sizes in the manifest are the uncompressed sizes.
+    """
+    MANIFEST_NAME = 'manifest.json'  # Not a valid field name, so it never conflicts with the outputs.
+    MANIFEST_VERSION = 1
+
+    def __init__(self, storage_manager, background_upload=False, max_pending_uploads=8, max_pending_bytes=2 * 1024 ** 3, tensors_format_min_size=1024 ** 2,
+                 compression_codec=None, compression_level=None, compression_min_size=64 * 1024):
+        """
+        Args:
+            storage_manager (StorageManager): The storage for the cache.
+            background_upload (bool): If True, upload_cache() returns after serializing the outputs. flush() must be called to wait for the uploads.
+            max_pending_uploads (int): The max number of uploads waiting in the background queue.
+            max_pending_bytes (int): The max total size of the serialized outputs waiting in the background queue.
+            tensors_format_min_size (int): Tensors and dicts of tensors larger than this size in bytes are stored in the tensors format instead of pickle.
+            compression_codec (str): The compression codec for the fields. See irisml.core.compression. If None, the fields are not compressed.
+            compression_level (int): The compression level. If None, the default level for the codec is used.
+            compression_min_size (int): Fields smaller than this size in bytes are not compressed.
+        """
+        if compression_codec:
+            compression.check_codec(compression_codec)
         self._storage_manager = storage_manager
+        self._tensors_format_min_size = tensors_format_min_size
+        self._compression_codec = compression_codec
+        self._compression_level = compression_level
+        self._compression_min_size = compression_min_size
+        self._uploader = BackgroundUploader(max_pending_uploads, max_pending_bytes) if background_upload else None
 
     def get_cache(self, task_name: str, task_version: str, task_hash: str, outputs_class: dataclasses.dataclass):
         """Try to get the cache for the specified task.
@@ -156,32 +749,134 @@ class CacheManager:
             CachedOutputs if a cache is found. If not, returns None.
         """
         base_paths = [task_name, task_version, task_hash]
-        hash_values = {}
-        for field in dataclasses.fields(outputs_class):
-            hash_values[field.name] = self._storage_manager.get_hash(base_paths + [field.name])
-            assert hash_values[field.name] is None or isinstance(hash_values[field.name], str)
-
-        if not any(hash_values.values()):
+        field_names = [f.name for f in dataclasses.fields(outputs_class)]
+        if not field_names:
             return None
 
+        manifest = self._load_manifest(base_paths)
+        if manifest:
+            missing_fields = set(field_names) - set(manifest['fields'])
+            if missing_fields:
+                logger.warning(f"The cache manifest doesn't have fields {missing_fields}. Ignoring the cache for {base_paths}.")
+                return None
+
+            hash_values = {name: manifest['fields'][name]['hash'] for name in field_names}
+            sizes = {name: manifest['fields'][name].get('size') for name in field_names}
+            formats = {name: manifest['fields'][name].get('format', serialization.FORMAT_PICKLE) for name in field_names}
+            return CachedOutputs(self._storage_manager, base_paths, outputs_class, hash_values, sizes, formats)
+
+        # Caches created before the manifest was introduced. If the first field is missing, there is no cache.
+        hash_values = {}
+        for name in field_names:
+            hash_values[name] = self._storage_manager.get_hash(base_paths + [name])
+            assert hash_values[name] is None or isinstance(hash_values[name], str)
+            if not hash_values[field_names[0]]:
+                return None
+
         if not all(hash_values.values()):
             logger.warning(f"Some cache files are missing: {hash_values}")
             return None
 
         return CachedOutputs(self._storage_manager, base_paths, outputs_class, hash_values)
 
-    def upload_cache(self, task_name: str, task_version: str, task_hash: str, outputs: dataclasses.dataclass):
+    def upload_cache(self, task_name: str, task_version: str, task_hash: str, outputs: dataclasses.dataclass, hash_values: typing.Optional[typing.Dict[str, str]] = None):
+        """Save the task outputs to the cache storage.
+
+        If the background upload is enabled, the outputs are hashed and serialized in the current thread so that later changes to the outputs don't affect
+        the cache. Upload is done in the background thread.
+
+        Args:
+            hash_values (Dict[str, str]): {field name: hash value} of the outputs, e.g. the ones that Context already calculated. If not provided, they are
+                calculated from the outputs.
+        """
         base_paths = [task_name, task_version, task_hash]
-        for name, value in dataclasses.asdict(outputs).items():
-            # This hash_value doesn't match with the actual hash for the contents. See HashGenerator for the detail.
-            hash_value = HashGenerator.calculate_hash(value)
-            contents = pickle.dumps(value)
-
-            # Double check that the hash is calculated correctly.
-            # If this check failed, please check the HashGenerator and __getstate__ attribute of the failed object.
-            loaded = pickle.loads(contents)
-            loaded_hash_value = HashGenerator.calculate_hash(loaded)
-            if hash_value != loaded_hash_value:
-                logger.error(f"The object {name} has different hash after serialization. Before: {hash_value}. After: {loaded_hash_value} task: {task_name}")
-
-            self._storage_manager.put_contents(base_paths + [name], contents, hash_value)
+        # This hash_value doesn't match with the actual hash for the contents. See HashGenerator for the detail.
+        if hash_values is None:
+            with profiler.span('hash'):
+                hash_values = {name: HashGenerator.calculate_hash(value) for name, value in asdict_without_copy(outputs).items()}
+
+        if self._uploader:
+            try:
+                serialized = self._serialize_outputs(outputs)
+            except Exception as e:
+                logger.warning(f"Failed to serialize the outputs of {task_name} due to {e}. The cache is not saved.")
+                self._uploader.add_failure(base_paths, e)
+                return
+            self._uploader.submit(base_paths, sum(len(c) for _, c in serialized.values()), profiler.bind_task(self._put_serialized_outputs), base_paths, serialized,
+                                  hash_values)
+            return
+
+        self._put_serialized_outputs(base_paths, self._serialize_outputs(outputs), hash_values)
+
+    def get_stats(self):
+        """Returns the statistics of the storage. See StorageManager.get_stats()."""
+        return self._storage_manager.get_stats()
+
+    def flush(self):
+        """Wait for the background uploads to finish.
+
+        Returns:
+            A list of (paths, exception) for the failed uploads.
+        """
+        return self._uploader.flush() if self._uploader else []
+
+    def _serialize_outputs(self, outputs):
+        """Returns {field_name: (format_name, serialized contents)}."""
+        serialized = {}
+        # The outputs are serialized as if they were converted by dataclasses.asdict(), without copying the values.
+        for name, value in asdict_without_copy(outputs).items():
+            with profiler.span('serialize', field=name):
+                format_name = serialization.select_format(value, self._tensors_format_min_size)
+                serialized[name] = (format_name, serialization.serialize(value, format_name))
+        return serialized
+
+    def _put_serialized_outputs(self, base_paths, serialized: typing.Dict[str, typing.Tuple[str, bytes]], hash_values: typing.Optional[typing.Dict[str, str]] = None):
+        """Store the serialized outputs and its manifest. If hash_values are not provided, they are calculated from the serialized contents."""
+        manifest_fields = {}
+        for name, (format_name, contents) in serialized.items():
+            if format_name == serialization.FORMAT_PICKLE or not hash_values:
+                # Double check that the hash is calculated correctly.
+                # If this check failed, please check the HashGenerator and __getstate__ attribute of the failed object.
+                with profiler.span('hash', field=name):
+                    loaded = serialization.deserialize(contents, format_name)
+                    loaded_hash_value = HashGenerator.calculate_hash(loaded)
+                hash_value = hash_values[name] if hash_values else loaded_hash_value
+                if hash_value != loaded_hash_value:
+                    logger.error(f"The object {name} has different hash after serialization. Before: {hash_value}. After: {loaded_hash_value} task: {base_paths[0]}")
+            else:
+                hash_value = hash_values[name]
+
+            codec = self._select_codec(format_name, contents)
+            with profiler.span('upload', field=name, codec=codec):
+                self._storage_manager.put_contents(base_paths + [name], contents, hash_value, codec, self._compression_level)
+            profiler.add_bytes('uploaded', len(contents))
+            manifest_fields[name] = {'hash': hash_value, 'size': len(contents), 'format': format_name}
+
+        if not manifest_fields:
+            return
+
+        # The manifest is stored at last so that its existence means all fields are stored.
+        manifest = {'version': self.MANIFEST_VERSION, 'hash_version': HashGenerator.get_hash_version(), 'fields': manifest_fields}
+        with profiler.span('upload', field=self.MANIFEST_NAME):
+            self._storage_manager.put_contents(base_paths + [self.MANIFEST_NAME], json.dumps(manifest).encode('utf-8'), HashGenerator.calculate_hash(manifest))
+
+    def _select_codec(self, format_name, contents):
+        if not self._compression_codec or format_name != serialization.FORMAT_PICKLE or len(contents) < self._compression_min_size:
+            return None
+        return self._compression_codec if compression.is_compressible(contents, self._compression_codec, self._compression_level) else None
+
+    def _load_manifest(self, base_paths):
+        contents = self._storage_manager.get_contents(base_paths + [self.MANIFEST_NAME])
+        if contents is None:
+            return None
+
+        try:
+            manifest = json.loads(contents)
+        except ValueError as e:
+            logger.warning(f"Failed to parse the cache manifest for {base_paths}: {e}")
+            return None
+
+        if manifest.get('version') != self.MANIFEST_VERSION:
+            logger.warning(f"Unsupported cache manifest version: {manifest.get('version')}. Ignoring the cache for {base_paths}.")
+            return None
+        return manifest
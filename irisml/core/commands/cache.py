@@ -0,0 +1,182 @@
+import argparse
+import dataclasses
+import datetime
+import os
+import time
+import typing
+from irisml.core.cache_manager import CacheFileInfo, CacheManager, TieredStorageManager, create_storage_manager, parse_size
+from irisml.core.commands.common import configure_logger
+
+
+@dataclasses.dataclass
+class CacheEntry:
+    """Cached outputs of a task. The files are stored under <task_name>/<version>/<hash_value>/."""
+    task_name: str
+    version: str
+    hash_value: str
+    files: typing.List[CacheFileInfo]
+
+    @property
+    def size(self):
+        return sum(f.size for f in self.files)
+
+    @property
+    def last_access(self):
+        return max(f.last_access for f in self.files)
+
+    def __str__(self):
+        return f'{self.task_name}/{self.version}/{self.hash_value}'
+
+
+def group_entries(files: typing.Iterable[CacheFileInfo]) -> typing.List[CacheEntry]:
+    """Group the cached files into entries. Files that don't follow the cache layout are ignored."""
+    entries = {}
+    for f in files:
+        if len(f.paths) < 4:
+            continue
+        key = tuple(f.paths[:3])
+        if key not in entries:
+            entries[key] = CacheEntry(*key, [])
+        entries[key].files.append(f)
+    return list(entries.values())
+
+
+def _version_key(version):
+    try:
+        return (1, tuple(int(v) for v in version.split('.')), version)
+    except ValueError:
+        return (0, (), version)
+
+
+def select_entries_to_delete(entries: typing.List[CacheEntry], max_age_days: typing.Optional[float] = None, max_size: typing.Optional[int] = None,
+                             stale_versions: bool = False, now: typing.Optional[float] = None) -> typing.List[CacheEntry]:
+    """Select the cache entries to be deleted.
+
+    Args:
+        entries: All entries in the cache.
+        max_age_days: Delete the entries that have not been accessed for this number of days.
+        max_size: Delete the least recently used entries until the total size is under this number of bytes.
+        stale_versions: Delete the entries of older task versions if there is a newer version of the task in the cache.
+        now: The current POSIX timestamp. Used for tests.
+
+    Returns:
+        The entries to be deleted.
+    """
+    now = time.time() if now is None else now
+    to_delete = set()
+
+    if stale_versions:
+        latest_versions = {}
+        for e in entries:
+            if e.task_name not in latest_versions or _version_key(e.version) > _version_key(latest_versions[e.task_name]):
+                latest_versions[e.task_name] = e.version
+        to_delete.update(id(e) for e in entries if e.version != latest_versions[e.task_name])
+
+    if max_age_days is not None:
+        to_delete.update(id(e) for e in entries if e.last_access < now - max_age_days * 24 * 60 * 60)
+
+    if max_size is not None:
+        remaining = sorted((e for e in entries if id(e) not in to_delete), key=lambda e: e.last_access)
+        total_size = sum(e.size for e in remaining)
+        for e in remaining:
+            if total_size <= max_size:
+                break
+            to_delete.add(id(e))
+            total_size -= e.size
+
+    return [e for e in entries if id(e) in to_delete]
+
+
+def delete_entries(storage_manager, entries: typing.List[CacheEntry]):
+    """Delete the files of the entries.
+
+    The manifest of an entry is deleted before its fields, so that an interrupted deletion doesn't leave a manifest that refers to missing files.
+    """
+    paths_list = []
+    for e in entries:
+        paths_list.extend(sorted((f.paths for f in e.files), key=lambda p: p[-1] != CacheManager.MANIFEST_NAME))
+    storage_manager.delete_files(paths_list)
+
+
+def _format_size(size):
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if size < 1024 or unit == 'TB':
+            return f'{size:.1f} {unit}' if unit != 'B' else f'{size} B'
+        size /= 1024
+
+
+def _format_time(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _list(entries):
+    for e in sorted(entries, key=lambda e: (e.task_name, _version_key(e.version), -e.last_access)):
+        print(f"{str(e):<80} {_format_size(e.size):>12} {_format_time(e.last_access)}")
+    print(f"\nTotal {len(entries)} entries, {_format_size(sum(e.size for e in entries))}")
+
+
+def _stats(entries):
+    tasks = {}
+    for e in entries:
+        tasks.setdefault(e.task_name, []).append(e)
+
+    print(f"{'Task':<40} {'Versions':>8} {'Entries':>8} {'Size':>12} {'Last access':>20}")
+    for task_name, task_entries in sorted(tasks.items()):
+        num_versions = len(set(e.version for e in task_entries))
+        last_access = max(e.last_access for e in task_entries)
+        print(f"{task_name:<40} {num_versions:>8} {len(task_entries):>8} {_format_size(sum(e.size for e in task_entries)):>12} {_format_time(last_access):>20}")
+    print(f"\nTotal {len(tasks)} tasks, {len(entries)} entries, {_format_size(sum(e.size for e in entries))}")
+
+
+def _gc(storage_manager, entries, args):
+    to_delete = select_entries_to_delete(entries, args.max_age_days, args.max_size and parse_size(args.max_size), args.stale_versions)
+    for e in to_delete:
+        print(f"{'Would delete' if args.dry_run else 'Deleting'} {e} ({_format_size(e.size)})")
+    if not args.dry_run:
+        delete_entries(storage_manager, to_delete)
+    print(f"\n{'Would free' if args.dry_run else 'Freed'} {_format_size(sum(e.size for e in to_delete))} in {len(to_delete)} entries")
+
+
+def main():
+    configure_logger()
+    parser = argparse.ArgumentParser(description="Manage the cache storage")
+    parser.add_argument('--url', default=os.getenv('IRISML_CACHE_URL'), help="The cache storage URL. Default: $IRISML_CACHE_URL")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = subparsers.add_parser('list', help="List the cached entries with their sizes and last access times")
+    list_parser.add_argument('task_name', nargs='?')
+
+    stats_parser = subparsers.add_parser('stats', help="Show the total size for each task")
+    stats_parser.add_argument('task_name', nargs='?')
+
+    gc_parser = subparsers.add_parser('gc', help="Delete cached entries")
+    gc_parser.add_argument('task_name', nargs='?')
+    gc_parser.add_argument('--max_age_days', type=float, help="Delete the entries that have not been accessed for this number of days")
+    gc_parser.add_argument('--max_size', help="Delete the least recently used entries until the total size is under this limit, e.g. 500G")
+    gc_parser.add_argument('--stale_versions', action='store_true', help="Delete the entries of older task versions")
+    gc_parser.add_argument('--dry_run', '-n', action='store_true')
+
+    args = parser.parse_args()
+    if not args.url:
+        parser.error("The cache storage URL is not specified. Use --url or set IRISML_CACHE_URL.")
+    if args.command == 'gc' and args.max_age_days is None and args.max_size is None and not args.stale_versions:
+        parser.error("Specify at least one of --max_age_days, --max_size or --stale_versions.")
+
+    storage_manager = create_storage_manager(args.url)
+    # Each tier of a tiered storage is managed independently.
+    storage_managers = storage_manager.tiers if isinstance(storage_manager, TieredStorageManager) else [storage_manager]
+
+    for s in storage_managers:
+        if len(storage_managers) > 1:
+            print(f"\n[{s}]")
+        entries = group_entries(s.list_files([args.task_name] if args.task_name else None))
+        if args.command == 'list':
+            _list(entries)
+        elif args.command == 'stats':
+            _stats(entries)
+        elif args.command == 'gc':
+            _gc(s, entries, args)
+
+
+if __name__ == '__main__':
+    main()
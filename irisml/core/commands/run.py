@@ -1,10 +1,16 @@
 import argparse
 import json
+import logging
 import os
 import pathlib
+from irisml.core import JobDescription
 from irisml.core.job_runner import JobRunner
+from irisml.core.journal import RunJournal
+from irisml.core.planner import format_plan
 from irisml.core.commands.common import configure_logger
 
+logger = logging.getLogger(__name__)
+
 
 def main():
     class KeyValuePairAction(argparse.Action):
@@ -17,19 +23,59 @@ def main():
     parser.add_argument('job_filepath', type=pathlib.Path)
     parser.add_argument('--env', '-e', default={}, action=KeyValuePairAction)
     parser.add_argument('--dry_run', '-n', action='store_true')
+    parser.add_argument('--plan', action='store_true', help="Show which tasks would be skipped by the cache and the size to download, without running them.")
     parser.add_argument('--verbose', '-v', action='store_true')
     parser.add_argument('--very_verbose', '-vv', action='store_true')
     parser.add_argument('--no-cache', dest='no_cache', action='store_true')
+    parser.add_argument('--num_workers', '-j', type=int, default=1, help="The number of tasks that can run at the same time.")
+    parser.add_argument('--executor', choices=['thread', 'process'],
+                        help="Run tasks in threads or in worker processes. The default is process if -j > 1, since tasks in threads share the random seeds.")
+    parser.add_argument('--profile', type=pathlib.Path, help="Save the time spent in each task to this file in the Chrome trace event format.")
+    parser.add_argument('--keep_outputs', action='store_true', help="Keep all the task outputs until the end of the run. Use it for tasks that read other outputs with Context.get_outputs().")
+    parser.add_argument('--run_dir', type=pathlib.Path, help="Record the outputs of the completed tasks in this directory so that the run can be resumed.")
+    parser.add_argument('--resume', type=pathlib.Path, metavar='RUN_DIR', help="Resume a run recorded with --run_dir. The recorded tasks are skipped.")
+    parser.add_argument('--listen', type=int, metavar='PORT', help="Run as a coordinator that assigns the tasks to irisml_worker processes. See irisml.core.distributed.")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="The address for --listen. The default accepts only local workers. Use 0.0.0.0 to accept workers on other machines.")
 
     args = parser.parse_args()
 
     configure_logger(2 if args.very_verbose else (1 if args.verbose else 0))
 
+    if args.resume and not (args.resume / RunJournal.JOURNAL_NAME).exists():
+        parser.error(f"No run journal is found in {args.resume}")
+
     cache_storage_url = (not args.no_cache) and os.getenv('IRISML_CACHE_URL')
+    hash_version = os.getenv('IRISML_HASH_VERSION')
+    cache_compression = os.getenv('IRISML_CACHE_COMPRESSION')
     job_description = json.loads(args.job_filepath.read_text())
-    job_runner = JobRunner(job_description, args.env, cache_storage_url=cache_storage_url)
+    if args.listen:
+        run_coordinator(job_description, args.env, args.host, args.listen, hash_version and int(hash_version))
+        return
+
+    job_runner = JobRunner(job_description, args.env, cache_storage_url=cache_storage_url, num_workers=args.num_workers, executor_type=args.executor,
+                           hash_version=hash_version and int(hash_version), cache_compression=cache_compression,
+                           profile_filepath=args.profile, run_dir=args.resume or args.run_dir, release_outputs=not args.keep_outputs)
+    if args.plan:
+        print(format_plan(job_runner.plan()))
+        return
     job_runner.run(dry_run=args.dry_run)
 
 
+def run_coordinator(job_description, env_vars, host, port, hash_version):
+    from irisml.core.distributed import Coordinator
+    from irisml.core.hash_generator import HashGenerator
+    from irisml.core.job import Job
+    from irisml.core.task_index import TaskIndex
+
+    Job(JobDescription.from_dict(job_description)).validate(TaskIndex())
+    if hash_version:
+        HashGenerator.set_hash_version(hash_version)
+    coordinator = Coordinator(job_description, env_vars, host, port)
+    coordinator.run()
+    for name, key in coordinator.get_cache_keys().items():
+        logger.info(f"{name}: {'/'.join((key['task'], key['version'], key['hash']))}")
+
+
 if __name__ == '__main__':
     main()
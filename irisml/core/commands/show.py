@@ -1,14 +1,12 @@
 import argparse
-import dataclasses
-import importlib
-import inspect
 import pkgutil
 from irisml.core.commands.common import configure_logger
+from irisml.core.task_index import TaskIndex
 
 
-def _print_dataclass(data_class):
-    for field in dataclasses.fields(data_class):
-        print(f"    {field.name}: {field.type}")
+def _print_fields(fields):
+    for name, type_name in fields:
+        print(f"    {name}: {type_name}")
 
 
 def main():
@@ -19,30 +17,32 @@ def main():
     args = parser.parse_args()
 
     if args.task_name:
-        task_module = importlib.import_module('irisml.tasks.' + args.task_name)
-        task_class = task_module.Task
+        # The task module is imported only if the task index doesn't have its metadata.
+        metadata = TaskIndex().get(args.task_name)
 
-        task_doc = inspect.getdoc(task_class)
-        if task_doc:
-            print(task_doc)
+        if metadata.doc:
+            print(metadata.doc)
         else:
             print("No description found. Please add documentation to the Task class.")
 
         print("\nConfiguration:")
-        _print_dataclass(task_class.Config)
+        _print_fields(metadata.get_fields('config'))
 
         print("\nInputs:")
-        _print_dataclass(task_class.Inputs)
+        _print_fields(metadata.get_fields('inputs'))
 
         print("\nOutputs:")
-        _print_dataclass(task_class.Outputs)
+        _print_fields(metadata.get_fields('outputs'))
     else:
         parser.print_usage()
         print("\nAvailable tasks on this environment:\n")
         import irisml.tasks
         names = [name for module_loader, name, ispkg in pkgutil.iter_modules(irisml.tasks.__path__)]
+        task_index = TaskIndex()
         for name in sorted(names):
-            print(name)
+            # The versions are shown for the tasks in the index. Listing the tasks doesn't import the modules.
+            metadata = task_index.get(name, import_module=False)
+            print(f"{name:<48} {metadata.version}" if metadata else name)
 
         print(f"\nTotal {len(names)}")
 
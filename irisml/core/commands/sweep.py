@@ -0,0 +1,54 @@
+import argparse
+import json
+import os
+import pathlib
+import sys
+from irisml.core.commands.common import configure_logger
+from irisml.core.sweep import make_env_sets, SweepRunner
+
+
+def main():
+    class KeyValuePairAction(argparse.Action):
+        def __call__(self, parser, namespace, values, option_string=None):
+            k, v = values.split('=', 1)
+            d = getattr(namespace, self.dest)
+            d[k] = v
+
+    class GridAction(argparse.Action):
+        def __call__(self, parser, namespace, values, option_string=None):
+            k, v = values.split('=', 1)
+            d = getattr(namespace, self.dest)
+            d[k] = v.split(',')
+
+    parser = argparse.ArgumentParser(description="Run a job with multiple sets of environment variables. The tasks that the variants share run only once.")
+    parser.add_argument('job_filepath', type=pathlib.Path)
+    parser.add_argument('--env', '-e', default={}, action=KeyValuePairAction, help="An environment variable common to all the variants.")
+    parser.add_argument('--grid', '-g', default={}, action=GridAction, metavar='NAME=VALUE1,VALUE2,...', help="Run a variant for each value.")
+    parser.add_argument('--env_sets', type=pathlib.Path, help="A JSON file that has a list of environment variable sets, e.g. [{\"LR\": \"0.1\"}, {\"LR\": \"0.01\"}].")
+    parser.add_argument('--verbose', '-v', action='store_true')
+    parser.add_argument('--very_verbose', '-vv', action='store_true')
+    parser.add_argument('--no-cache', dest='no_cache', action='store_true')
+    parser.add_argument('--num_workers', '-j', type=int, default=1, help="The number of tasks that can run at the same time.")
+    parser.add_argument('--keep_outputs', action='store_true', help="Keep all the task outputs until the end of the run. Use it for tasks that read other outputs with Context.get_outputs().")
+
+    args = parser.parse_args()
+
+    configure_logger(2 if args.very_verbose else (1 if args.verbose else 0))
+
+    env_sets = make_env_sets(args.env, args.grid, json.loads(args.env_sets.read_text()) if args.env_sets else None)
+    cache_storage_url = (not args.no_cache) and os.getenv('IRISML_CACHE_URL')
+    hash_version = os.getenv('IRISML_HASH_VERSION')
+    job_description = json.loads(args.job_filepath.read_text())
+    sweep_runner = SweepRunner(job_description, env_sets, cache_storage_url=cache_storage_url, num_workers=args.num_workers,
+                               hash_version=hash_version and int(hash_version), cache_compression=os.getenv('IRISML_CACHE_COMPRESSION'),
+                               release_outputs=not args.keep_outputs)
+    results = sweep_runner.run()
+    failed = [env_vars for env_vars, context in zip(env_sets, results) if context is None]
+    for env_vars in failed:
+        print(f"Failed: {env_vars}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
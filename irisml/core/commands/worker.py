@@ -0,0 +1,27 @@
+import argparse
+import os
+from irisml.core import compression
+from irisml.core.commands.common import configure_logger
+from irisml.core.distributed import Worker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the tasks assigned by a coordinator, i.e. irisml_run --listen. $IRISML_CACHE_URL and the token of the "
+                                                 "coordinator in $IRISML_COORDINATOR_TOKEN are required.")
+    parser.add_argument('coordinator_url', help="e.g. http://<host>:<port>")
+    parser.add_argument('--name', help="The name of this worker. The default is <hostname>-<pid>.")
+    parser.add_argument('--poll_interval', type=float, default=1.0, help="Seconds to wait when no task is runnable.")
+    parser.add_argument('--verbose', '-v', action='store_true')
+
+    args = parser.parse_args()
+
+    configure_logger(1 if args.verbose else 0)
+
+    cache_compression = os.getenv('IRISML_CACHE_COMPRESSION')
+    worker = Worker(args.coordinator_url, os.getenv('IRISML_CACHE_URL'), args.name, args.poll_interval,
+                    compression.parse_compression(cache_compression) if cache_compression else (None, None))
+    worker.run()
+
+
+if __name__ == '__main__':
+    main()
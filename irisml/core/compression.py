@@ -0,0 +1,166 @@
+"""Compression codecs for cached contents.
+
+Supported codecs:
+    zlib: Always available. Slow but compatible.
+    zstd: Requires the zstandard package. A good balance of speed and ratio.
+    lz4: Requires the lz4 package. The fastest, with a lower ratio.
+
+The optional packages can be installed with `pip install irisml[compression]`.
+
+All codecs compress and decompress the data in chunks, so that the contents can be streamed to a file or a blob without making a compressed copy in memory.
+"""
+import typing
+import zlib
+
+CHUNK_SIZE = 4 * 1024 * 1024
+DECOMPRESS_INPUT_SIZE = 16 * 1024
+
+
+class _ZlibCodec:
+    default_level = 6
+
+    def compressor(self, level):
+        return zlib.compressobj(level)
+
+    def decompressor(self):
+        return zlib.decompressobj()
+
+
+class _ZstdCodec:
+    default_level = 3
+
+    def compressor(self, level):
+        import zstandard
+        return zstandard.ZstdCompressor(level=level).compressobj()
+
+    def decompressor(self):
+        import zstandard
+        return zstandard.ZstdDecompressor().decompressobj()
+
+
+class _Lz4Compressor:
+    def __init__(self, level):
+        import lz4.frame
+        self._compressor = lz4.frame.LZ4FrameCompressor(compression_level=level)
+        self._begun = False
+
+    def compress(self, data):
+        header = b''
+        if not self._begun:
+            header = self._compressor.begin()
+            self._begun = True
+        return header + self._compressor.compress(data)
+
+    def flush(self):
+        header = b'' if self._begun else self._compressor.begin()
+        return header + self._compressor.flush()
+
+
+class _Lz4Codec:
+    default_level = 0
+
+    def compressor(self, level):
+        return _Lz4Compressor(level)
+
+    def decompressor(self):
+        import lz4.frame
+        return lz4.frame.LZ4FrameDecompressor()
+
+
+CODECS = {'zlib': _ZlibCodec(), 'zstd': _ZstdCodec(), 'lz4': _Lz4Codec()}
+
+
+def _get_codec(codec_name):
+    if codec_name not in CODECS:
+        raise ValueError(f"Unknown compression codec: {codec_name}. Supported codecs: {list(CODECS)}")
+    return CODECS[codec_name]
+
+
+def check_codec(codec_name: str):
+    """Raise an exception if the codec is unknown or its package is not installed."""
+    try:
+        _get_codec(codec_name).decompressor()
+    except ImportError as e:
+        raise ImportError(f"The compression codec {codec_name} is not available: {e}. Please install irisml[compression].") from e
+
+
+def parse_compression(value: str) -> typing.Tuple[str, typing.Optional[int]]:
+    """Parse a string like 'zstd' or 'zstd:9' into (codec name, level)."""
+    codec_name, _, level = value.partition(':')
+    _get_codec(codec_name)
+    return codec_name, int(level) if level else None
+
+
+def compress_chunks(data, codec_name: str, level: typing.Optional[int] = None) -> typing.Iterator[bytes]:
+    """Compress a bytes-like object and yield the compressed chunks."""
+    codec = _get_codec(codec_name)
+    compressor = codec.compressor(codec.default_level if level is None else level)
+    view = memoryview(data).cast('B')
+    for i in range(0, len(view), CHUNK_SIZE):
+        chunk = compressor.compress(view[i:i + CHUNK_SIZE])
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+def compress(data, codec_name: str, level: typing.Optional[int] = None) -> bytes:
+    return b''.join(compress_chunks(data, codec_name, level))
+
+
+def _decompress_iter(chunks, codec_name):
+    decompressor = _get_codec(codec_name).decompressor()
+    for chunk in chunks:
+        # Highly compressed data expands a lot, so the input is fed in small pieces to keep each decompressed piece small.
+        view = memoryview(chunk).cast('B')
+        for i in range(0, len(view), DECOMPRESS_INPUT_SIZE):
+            yield decompressor.decompress(view[i:i + DECOMPRESS_INPUT_SIZE])
+    if hasattr(decompressor, 'flush'):
+        yield decompressor.flush()
+
+
+def decompress_chunks(chunks: typing.Iterable[bytes], codec_name: str, size: typing.Optional[int] = None) -> bytearray:
+    """Decompress an iterable of compressed chunks into a bytearray, so that the whole compressed data doesn't need to be in memory.
+
+    Args:
+        chunks (Iterable[bytes]): The compressed chunks.
+        codec_name (str): The compression codec.
+        size (int): The size of the decompressed data if known. The buffer is allocated at once instead of being grown for each chunk.
+    """
+    decompressed_chunks = _decompress_iter(chunks, codec_name)
+    if size is None:
+        contents = bytearray()
+        for chunk in decompressed_chunks:
+            contents += chunk
+        return contents
+
+    contents = bytearray(size)
+    view = memoryview(contents)
+    position = 0
+    for chunk in decompressed_chunks:
+        if position + len(chunk) > size:
+            raise ValueError(f"The decompressed data is larger than the expected size {size}")
+        view[position:position + len(chunk)] = chunk
+        position += len(chunk)
+    if position != size:
+        raise ValueError(f"The decompressed data is {position} bytes. Expected: {size}")
+    return contents
+
+
+def decompress(data, codec_name: str) -> bytes:
+    decompressor = _get_codec(codec_name).decompressor()
+    view = memoryview(data).cast('B')
+    chunks = [decompressor.decompress(view[i:i + CHUNK_SIZE]) for i in range(0, len(view), CHUNK_SIZE)]
+    if hasattr(decompressor, 'flush'):
+        chunks.append(decompressor.flush())
+    return b''.join(chunks)
+
+
+def is_compressible(data, codec_name: str, level: typing.Optional[int] = None, sample_size: int = 256 * 1024, max_ratio: float = 0.9) -> bool:
+    """Estimate if the data is worth compressing by compressing a sample from its beginning.
+
+    Already compressed data such as encoded images doesn't get smaller, so it is better stored as is.
+    """
+    sample = memoryview(data).cast('B')[:sample_size]
+    if not sample:
+        return False
+    return len(compress(sample, codec_name, level)) <= len(sample) * max_ratio
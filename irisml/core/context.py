@@ -1,19 +1,149 @@
+import collections
+import concurrent.futures
 import copy
 import dataclasses
 import logging
+import threading
 import typing
 from .cache_manager import CachedOutputs
+from .hash_generator import asdict_without_copy, HashGenerator
 from .variable import Variable
 
 logger = logging.getLogger(__name__)
 
 
+class _OutputLiveness:
+    """Track the remaining consumers of each output field. The fields that no task refers to are not tracked, so they are kept until the end of the run."""
+    def __init__(self, consumers: typing.Dict[typing.Tuple[str, str], typing.Set[str]]):
+        self._consumers = {k: set(v) for k, v in consumers.items()}
+        self._lock = threading.Lock()
+
+    def on_outputs_added(self, name: str, release_func):
+        """Call release_func(task name, field name) for the fields whose last consumer is the completed task."""
+        dead = []
+        with self._lock:
+            for key, consumers in list(self._consumers.items()):
+                if name in consumers:
+                    consumers.discard(name)
+                    if not consumers:
+                        del self._consumers[key]
+                        dead.append(key)
+            for output_name, field_name in dead:
+                release_func(output_name, field_name)
+
+
+class _IdenticalTasks:
+    """Share the outputs among the identical tasks in a job.
+
+    Only the candidates found by Job.get_identical_task_candidates() are tracked, so that the outputs are kept only until all the candidates in the group
+    are completed. Within a group, the tasks with the same (task module, VERSION, task hash) share the outputs of the first one.
+    """
+    def __init__(self, candidates: typing.List[typing.List[str]]):
+        self._group_index = {name: i for i, group in enumerate(candidates) for name in group}
+        self._remaining = [set(group) for group in candidates]
+        self._entries = {}  # (group index, task module, version, hash) => (task name, Future of the outputs)
+        self._owned_keys = {}  # task name => key of the entry that the task is running for
+        self._lock = threading.Lock()
+
+    def find(self, name, task_name, task_version, task_hash):
+        group = self._group_index.get(name)
+        if group is None:
+            return None
+        key = (group, task_name, task_version, task_hash)
+        with self._lock:
+            self._remaining[group].discard(name)
+            entry = self._entries.get(key)
+            if entry:
+                self._release_group(group)
+                return entry
+            self._entries[key] = (name, concurrent.futures.Future())
+            self._owned_keys[name] = key
+            return None
+
+    def complete(self, name, outputs=None, exception=None):
+        with self._lock:
+            key = self._owned_keys.pop(name, None)
+            if key is None:
+                return
+            future = self._entries[key][1]
+            self._release_group(key[0])
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(outputs)
+
+    def _release_group(self, group):
+        # The entries are kept until all the candidates in the group have looked them up. The running tasks keep their own entries.
+        if not self._remaining[group]:
+            for key in [k for k in self._entries if k[0] == group and self._entries[k][0] not in self._owned_keys]:
+                del self._entries[key]
+
+
+class CachedOutputsHolders:
+    """Count the holders of the CachedOutputs that are shared by multiple tasks, e.g. identical tasks, so that a field is released when none of them need it."""
+    def __init__(self):
+        self._holders = {}  # id(CachedOutputs) => (CachedOutputs, {field name: number of the holders that haven't released the field})
+        self._lock = threading.Lock()
+
+    def add(self, outputs: CachedOutputs):
+        with self._lock:
+            holder = self._holders.get(id(outputs))
+            if holder is None:
+                # The CachedOutputs is kept in the holder so that its id is not reused until all the fields are released.
+                holder = self._holders[id(outputs)] = (outputs, collections.Counter())
+            holder[1].update(outputs.field_names)
+
+    def release(self, outputs: CachedOutputs, field_name: str):
+        """Release the field of the CachedOutputs for a holder. The field is dropped from the CachedOutputs when all the holders released it."""
+        with self._lock:
+            holder = self._holders.get(id(outputs))
+            if holder:
+                counts = holder[1]
+                counts[field_name] -= 1
+                if counts[field_name] > 0:
+                    return
+                del counts[field_name]
+                if not counts:
+                    del self._holders[id(outputs)]
+        outputs.release(field_name)
+
+
+class _OutputEntry:
+    """Outputs of a task and the states of its fields."""
+    def __init__(self, outputs):
+        self.outputs = outputs
+        self.hashes = {}  # field name => hash value
+        self.released_fields = set()
+
+
 class Context:
-    """Manage variables for a single experiment."""
-    def __init__(self, environment_variables: typing.Dict[str, str] = None, cache_manager=None):
-        self._envs = copy.deepcopy(environment_variables or {})
+    """Manage variables for a single experiment.
+
+    Args:
+        environment_variables (Dict[str, str]): Environment variables.
+        cache_manager (CacheManager): If provided, the task outputs are cached.
+        prefetcher (Prefetcher): If provided, it is notified when outputs are added so that the cached fields can be loaded in background.
+        output_consumers (Dict[Tuple[str, str], Set[str]]): {(task name, field name): names of the tasks that consume the field}. See Job.get_consumers().
+            If provided, the reference to an output field is released when all of its consumers are completed. The fields without consumers are kept.
+            The hash values of the released fields are kept.
+        journal (RunJournal): If provided, the outputs of the completed tasks are recorded, and the recorded outputs are reused. See irisml.core.journal.
+        identical_task_candidates (List[List[str]]): Groups of the task names that might be identical. See Job.get_identical_task_candidates().
+            If provided, a task whose hash is the same as an earlier task in its group reuses the outputs of that task.
+        cached_outputs_holders (CachedOutputsHolders): Counts the holders of the CachedOutputs shared with other contexts, e.g. the variants of a sweep,
+            so that a shared field is released only when none of the contexts need it. If not provided, only the holders in this context are counted.
+
+    A cloned context is a child layer on top of this context. See clone().
+    """
+    def __init__(self, environment_variables: typing.Dict[str, str] = None, cache_manager=None, prefetcher=None, output_consumers=None, journal=None,
+                 identical_task_candidates=None, cached_outputs_holders: typing.Optional[CachedOutputsHolders] = None):
+        self._envs = collections.ChainMap(copy.deepcopy(environment_variables or {}))
         self._cache_manager = cache_manager
-        self._outputs = {}
+        self._journal = journal
+        self._identical_tasks = _IdenticalTasks(identical_task_candidates) if identical_task_candidates else None
+        self._prefetcher = prefetcher
+        self._liveness = _OutputLiveness(output_consumers) if output_consumers is not None else None
+        self._cached_outputs_holders = cached_outputs_holders or CachedOutputsHolders()
+        self._outputs = collections.ChainMap()  # task name => _OutputEntry
 
     def add_outputs(self, name: str, outputs: typing.Union[dataclasses.dataclass, CachedOutputs]):
         """Add Task outputs to the context so that subsequent Tasks can consume them.
@@ -24,7 +154,13 @@ class Context:
         """
         if name in self._outputs:
             logger.warning(f"Duplicated task name: {name}. The outputs are overwritten.")
-        self._outputs[name] = outputs
+        self._outputs[name] = _OutputEntry(outputs)
+        if self._prefetcher:
+            self._prefetcher.on_outputs_added(name, outputs)
+        if self._liveness:
+            if isinstance(outputs, CachedOutputs):
+                self._cached_outputs_holders.add(outputs)
+            self._liveness.on_outputs_added(name, self._release_output)
 
     def get_outputs(self, output_name: str):
         """Get the outputs of previous tasks.
@@ -32,14 +168,54 @@ class Context:
             name (str): the name of the task
         Returns:
             Outputs dataclass. If the task had been skipped, returns CachedOutputs.
+        Raises:
+            ValueError: If some fields were released since all of their consumers are completed. Use get_output() for the remaining fields.
         """
-        if output_name not in self._outputs:
-            raise ValueError(f"Output {output_name} is not found.")
-        return self._outputs[output_name]
+        entry = self._get_entry(output_name)
+        if entry.released_fields:
+            raise ValueError(f"Outputs of {output_name} were partially released since all the consumers of {sorted(entry.released_fields)} are completed. "
+                             "Run the job with --keep_outputs, or with release_outputs=False of JobRunner, to keep them.")
+        return entry.outputs
+
+    def get_output(self, output_name: str, field_name: str):
+        """Get the value of an output field."""
+        entry = self._get_entry(output_name)
+        if field_name in entry.released_fields:
+            raise ValueError(f"Output {output_name}.{field_name} was released since all of its consumers are completed. "
+                             "Run the job with --keep_outputs, or with release_outputs=False of JobRunner, to keep it.")
+        outputs = entry.outputs
+        if not hasattr(outputs, field_name):
+            raise ValueError(f"Output {output_name} doesn't have path {field_name}")
+        return getattr(outputs, field_name)
+
+    def get_output_hash(self, output_name: str, field_name: str) -> str:
+        """Get the hash value of an output field.
+
+        The hash value is calculated only once for each field. For CachedOutputs, the hash value in the cache is used.
+        Note that if an output object is modified by subsequent tasks, the hash value still represents the original object.
+        """
+        entry = self._get_entry(output_name)
+        if isinstance(entry.outputs, CachedOutputs):
+            return entry.outputs.get_hash(field_name)
+
+        if field_name in entry.released_fields and field_name in entry.hashes:
+            return entry.hashes[field_name]
+
+        value = self.get_output(output_name, field_name)
+        if field_name not in entry.hashes:
+            entry.hashes[field_name] = HashGenerator.calculate_hash(value, self)
+        else:
+            # The resolved value might be hashed again in the same HashGenerator.memoize() context.
+            HashGenerator.add_memo(value, entry.hashes[field_name])
+        return entry.hashes[field_name]
 
     def add_environment_variable(self, name: str, value: str):
         self._envs[name] = value
 
+    def get_environment_variables(self) -> typing.Dict[str, str]:
+        """Returns a copy of all environment variables."""
+        return dict(self._envs)
+
     def get_environment_variable(self, name: str):
         if name not in self._envs:
             raise ValueError(f"Environment variable {name} is not found.")
@@ -52,11 +228,13 @@ class Context:
             - Dict
             - List
             - dataclasses.dataclass
+
+        Nested dataclasses are converted to dicts as dataclasses.asdict() does. The containers are rebuilt, but other values are not copied.
         """
         if isinstance(value, dict):
             return {k: self.resolve(v) for k, v in value.items()}
-        elif dataclasses.is_dataclass(value):
-            return type(value)(**{k: self.resolve(v) for k, v in dataclasses.asdict(value).items()})
+        elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+            return type(value)(**{k: self.resolve(v) for k, v in asdict_without_copy(value).items()})
         elif isinstance(value, list):
             return [self.resolve(v) for v in value]
         elif isinstance(value, Variable):
@@ -64,6 +242,10 @@ class Context:
         else:
             return value
 
+    @property
+    def cache_enabled(self) -> bool:
+        return self._cache_manager is not None
+
     def get_cached_outputs(self, task_name, task_version, task_hash: str, outputs_class: dataclasses.dataclass) -> typing.Optional[CachedOutputs]:
         """Try to get cached outputs for the given task
 
@@ -82,11 +264,79 @@ class Context:
         logger.debug(f"Trying to get cache for Task {task_name} version {task_version}. Hash: {task_hash}")
         return self._cache_manager.get_cache(task_name, task_version, task_hash, outputs_class)
 
-    def add_cache_outputs(self, task_name, task_version, task_hash: str, outputs):
-        """Save the task outputs to the cache storage."""
+    def add_cache_outputs(self, task_name, task_version, task_hash: str, outputs, name: typing.Optional[str] = None):
+        """Save the task outputs to the cache storage.
+
+        Args:
+            name (str): The name of the task whose outputs were added to this context. If provided, the hash values of the fields are shared with
+                get_output_hash() so that each field is hashed only once.
+        """
         if self._cache_manager:
             logger.debug(f"Uploading cache for Task {task_name} version {task_version}. Hash: {task_hash}")
-            self._cache_manager.upload_cache(task_name, task_version, task_hash, outputs)
+            hash_values = None
+            entry = self._outputs.get(name) if name is not None else None
+            if entry and dataclasses.is_dataclass(outputs):
+                hash_values = {}
+                for field in dataclasses.fields(outputs):
+                    if field.name not in entry.hashes:
+                        entry.hashes[field.name] = HashGenerator.calculate_hash(getattr(outputs, field.name), self)
+                    hash_values[field.name] = entry.hashes[field.name]
+            self._cache_manager.upload_cache(task_name, task_version, task_hash, outputs, hash_values)
+
+    def get_journaled_outputs(self, name: str, task_name: str, task_version: str, task_hash: str, outputs_class: dataclasses.dataclass) -> typing.Optional[CachedOutputs]:
+        """Returns the outputs of the task recorded in the run journal. Returns None if the journal is not enabled or the task is not recorded."""
+        if not self._journal:
+            return None
+        return self._journal.get_outputs(name, task_name, task_version, task_hash, outputs_class, self._cache_manager)
+
+    def add_journal_outputs(self, name: str, task_name: str, task_version: str, task_hash: str, outputs):
+        """Record the outputs of a completed task in the run journal."""
+        if self._journal:
+            self._journal.record(name, task_name, task_version, task_hash, outputs)
+
+    def find_identical_task(self, name: str, task_name: str, task_version: str, task_hash: str) -> typing.Optional[typing.Tuple[str, concurrent.futures.Future]]:
+        """Find an earlier task that is identical to the given task.
+
+        Returns:
+            (task name, Future of its outputs) if found. Otherwise, returns None, and complete_identical_task() must be called when the task is completed
+            so that the later identical tasks can get the outputs.
+        """
+        return self._identical_tasks and self._identical_tasks.find(name, task_name, task_version, task_hash)
+
+    def complete_identical_task(self, name: str, outputs=None, exception: typing.Optional[BaseException] = None):
+        """Pass the outputs, or the exception, of a task to the identical tasks that are waiting for it. See find_identical_task()."""
+        if self._identical_tasks:
+            self._identical_tasks.complete(name, outputs, exception)
 
     def clone(self):
-        return copy.deepcopy(self)
+        """Create a child context for nested tasks.
+
+        The child sees the outputs and the environment variables of this context, and records only its own additions and overrides, which are not
+        visible to this context. Nothing is copied, so cloning takes constant time and memory. The output objects are shared with this context and must
+        not be modified by the nested tasks. Outputs added to this context later are visible to the child as well.
+        """
+        child = copy.copy(self)
+        child._envs = self._envs.new_child()
+        child._outputs = self._outputs.new_child()
+        # The child context is used by nested tasks whose names are unrelated to the consumers and the candidates, so they are not tracked.
+        child._liveness = None
+        child._identical_tasks = None
+        return child
+
+    def _get_entry(self, output_name) -> _OutputEntry:
+        if output_name not in self._outputs:
+            raise ValueError(f"Output {output_name} is not found.")
+        return self._outputs[output_name]
+
+    def _release_output(self, output_name, field_name):
+        entry = self._outputs[output_name]
+        logger.debug(f"Releasing output {output_name}.{field_name}")
+        if isinstance(entry.outputs, CachedOutputs):
+            # Identical tasks share the CachedOutputs. The field is released when none of them need it.
+            self._cached_outputs_holders.release(entry.outputs, field_name)
+        else:
+            if not entry.released_fields:
+                # The outputs object might be referenced by others, e.g. the cache uploader. Release the field in a shallow copy.
+                entry.outputs = copy.copy(entry.outputs)
+            object.__setattr__(entry.outputs, field_name, None)
+        entry.released_fields.add(field_name)
@@ -0,0 +1,312 @@
+"""Run a job on multiple machines.
+
+A Coordinator holds the job and assigns the tasks to Workers over HTTP once the tasks they refer to with $output variables are completed. The outputs
+are not sent to the coordinator. A worker saves the outputs of each task to the cache storage, and reports only the cache key (task name, version, hash).
+The workers that run the consumers load the outputs from the cache storage with that key. All the workers must share the same cache storage, e.g. an
+Azure Blob Storage container or a network file system.
+
+The outputs of tasks with CACHE_ENABLED=False are stored with a key that includes the run id, so that they are never used by other runs. They can be
+deleted with irisml_cache gc.
+
+The coordinator listens on 127.0.0.1 unless another address is given, and every request must have the header "Authorization: Bearer <token>",
+since the job and its environment variables, which might include secrets, are sent to the workers. The token is taken from $IRISML_COORDINATOR_TOKEN
+or generated by the coordinator. Invalid requests get 4xx responses.
+
+Protocol. All requests and responses are JSON.
+    GET /job => {"job": <job description>, "env": <environment variables>, "run_id": str, "hash_version": int}
+    POST /claim {"worker": str} => {"status": "run", "index": <task index>, "dependencies": {<task name>: <cache key>}} | {"status": "wait"} | {"status": "done"}
+    POST /complete {"worker": str, "index": int, "key": <cache key>} => {}
+    POST /fail {"worker": str, "index": int, "error": str} => {}
+    where <cache key> is {"task": <task module name>, "version": str, "hash": str}.
+
+Note that a task assigned to a worker that died is not reassigned. The job can be run again; the completed tasks are skipped by the cache.
+"""
+import hmac
+import http.server
+import json
+import logging
+import os
+import secrets
+import socket
+import threading
+import time
+import typing
+import urllib.error
+import urllib.request
+import uuid
+from irisml.core import JobDescription
+from .cache_manager import create_storage_manager, CacheManager
+from .context import Context
+from .hash_generator import HashGenerator
+from .job import Job
+
+logger = logging.getLogger(__name__)
+
+TOKEN_ENV_NAME = 'IRISML_COORDINATOR_TOKEN'
+
+
+class _CoordinatorRequestHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def do_GET(self):
+        if not self._authorize():
+            return
+        if self.path == '/job':
+            self._send(200, self.server.coordinator.get_job_info())
+        else:
+            self._send(404, {'error': f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if not self._authorize():
+            return
+        coordinator = self.server.coordinator
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            if self.path == '/claim':
+                response = coordinator.claim(body['worker'])
+            elif self.path == '/complete':
+                response = coordinator.complete(body['worker'], int(body['index']), body['key'])
+            elif self.path == '/fail':
+                response = coordinator.fail(body['worker'], int(body['index']), str(body['error']))
+            else:
+                return self._send(404, {'error': f"Unknown path: {self.path}"})
+        except (KeyError, TypeError, ValueError, IndexError) as e:
+            return self._send(400, {'error': repr(e)})
+        except Exception as e:
+            logger.exception(f"Failed to handle a request {self.path}: {e}")
+            return self._send(500, {'error': repr(e)})
+        self._send(200, response)
+
+    def _authorize(self):
+        authorization = self.headers.get('Authorization', '')
+        if not hmac.compare_digest(authorization.encode('utf-8'), f'Bearer {self.server.coordinator.token}'.encode('utf-8')):
+            logger.warning(f"Rejected a request from {self.address_string()} without a valid token.")
+            self._send(401, {'error': "A valid token is required."})
+            return False
+        return True
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class Coordinator:
+    """Assign the tasks in a job to workers and track their completion.
+
+    Like JobScheduler, a task becomes runnable when all the tasks it refers to are completed, and the runnable task defined earlier in the job is
+    assigned first.
+
+    Args:
+        job_dict (Dict): The job description.
+        env_vars (Dict[str, str]): Environment variables for the job. They are sent to the workers.
+        host (str): The address to listen on. Use '0.0.0.0' to accept workers on other machines.
+        port (int): The port to listen on. If 0, a free port is chosen. See the url property.
+        token (str): The token that the workers must send. If not provided, $IRISML_COORDINATOR_TOKEN is used, or a new token is generated.
+    """
+    def __init__(self, job_dict: typing.Dict, env_vars: typing.Dict[str, str], host: str = '127.0.0.1', port: int = 0, token: typing.Optional[str] = None):
+        self._token = token or os.getenv(TOKEN_ENV_NAME) or secrets.token_urlsafe(24)
+        self._job_dict = job_dict
+        self._env_vars = env_vars
+        self._job = Job(JobDescription.from_dict(job_dict))
+        self._tasks = list(self._job.tasks)
+        self._run_id = uuid.uuid4().hex[:8]
+
+        self._remaining_dependencies = self._job.get_dependencies()
+        self._dependencies = [set(d) for d in self._remaining_dependencies]
+        self._dependents = [[] for _ in self._tasks]
+        for i, dependencies in enumerate(self._remaining_dependencies):
+            for d in dependencies:
+                self._dependents[d].append(i)
+        self._ready = [i for i, dependencies in enumerate(self._remaining_dependencies) if not dependencies]
+        self._running = {}  # task index => worker id
+        self._keys = {}  # task index => cache key
+        self._error = None
+        self._condition = threading.Condition()
+
+        self._server = http.server.ThreadingHTTPServer((host, port), _CoordinatorRequestHandler)
+        self._server.daemon_threads = True
+        self._server.coordinator = self
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        if host in ('0.0.0.0', ''):
+            host = socket.gethostname()
+        return f'http://{host}:{port}'
+
+    @property
+    def run_id(self) -> str:
+        return self._run_id
+
+    @property
+    def token(self) -> str:
+        return self._token
+
+    def run(self, timeout: typing.Optional[float] = None):
+        """Serve the workers until all the tasks are completed.
+
+        Raises:
+            RuntimeError: If a task failed or the timeout expired.
+        """
+        thread = threading.Thread(target=self._server.serve_forever, name='irisml-coordinator', daemon=True)
+        thread.start()
+        logger.info(f"Waiting for workers at {self.url}. Run id: {self._run_id}")
+        if not os.getenv(TOKEN_ENV_NAME):
+            logger.info(f"Set {TOKEN_ENV_NAME}={self._token} for the workers.")
+        try:
+            with self._condition:
+                completed = self._condition.wait_for(lambda: self._is_done(), timeout)
+                if self._error:
+                    raise RuntimeError(self._error)
+                if not completed:
+                    raise RuntimeError(f"The job didn't complete in {timeout} seconds. Running tasks: {[self._tasks[i].name for i in self._running]}")
+        finally:
+            self._server.shutdown()
+            self._server.server_close()
+            thread.join()
+
+    def get_cache_keys(self) -> typing.Dict[str, typing.Dict[str, str]]:
+        """Returns {task name: cache key} of the completed tasks."""
+        with self._condition:
+            return {self._tasks[i].name: key for i, key in self._keys.items()}
+
+    def get_job_info(self):
+        return {'job': self._job_dict, 'env': self._env_vars, 'run_id': self._run_id, 'hash_version': HashGenerator.get_hash_version()}
+
+    def claim(self, worker_id):
+        with self._condition:
+            if self._is_done():
+                return {'status': 'done'}
+            if not self._ready:
+                return {'status': 'wait'}
+            index = self._ready.pop(0)
+            self._running[index] = worker_id
+            logger.info(f"Assigned {self._tasks[index]} to {worker_id}.")
+            dependencies = {self._tasks[d].name: self._keys[d] for d in self._dependencies[index]}
+            return {'status': 'run', 'index': index, 'dependencies': dependencies}
+
+    def complete(self, worker_id, index, key):
+        if not isinstance(key, dict) or not all(isinstance(key.get(k), str) for k in ('task', 'version', 'hash')):
+            raise ValueError(f"Invalid cache key: {key}")
+        with self._condition:
+            if self._running.get(index) != worker_id:
+                raise ValueError(f"Task {index} is not assigned to {worker_id}.")
+            del self._running[index]
+            self._keys[index] = key
+            logger.info(f"{self._tasks[index]} was completed by {worker_id}.")
+            for d in self._dependents[index]:
+                self._remaining_dependencies[d].discard(index)
+                if not self._remaining_dependencies[d]:
+                    self._ready.append(d)
+            self._ready.sort()
+            self._condition.notify_all()
+        return {}
+
+    def fail(self, worker_id, index, error):
+        with self._condition:
+            if self._running.get(index) != worker_id:
+                raise ValueError(f"Task {index} is not assigned to {worker_id}.")
+            del self._running[index]
+            logger.error(f"{self._tasks[index]} failed on {worker_id}: {error}")
+            # The running tasks are not interrupted, but no new task is assigned.
+            self._error = self._error or f"Failed to run a task {self._tasks[index]}: {error}"
+            self._condition.notify_all()
+        return {}
+
+    def _is_done(self):
+        return len(self._keys) == len(self._tasks) or (self._error is not None and not self._running)
+
+
+class Worker:
+    """Run the tasks assigned by a Coordinator.
+
+    Args:
+        coordinator_url (str): The URL of the coordinator, e.g. http://host:port.
+        cache_storage_url (str): URL for the cache storage. It must be the same storage that the other workers use.
+        worker_id (str): The name of this worker. If not provided, <hostname>-<pid> is used.
+        poll_interval (float): Seconds to wait before asking the coordinator again when no task is runnable.
+        cache_compression (Tuple[str, int]): (codec, level) for the cache. See irisml.core.compression.
+        token (str): The token of the coordinator. If not provided, $IRISML_COORDINATOR_TOKEN is used.
+    """
+    def __init__(self, coordinator_url: str, cache_storage_url: str, worker_id: typing.Optional[str] = None, poll_interval: float = 1.0,
+                 cache_compression: typing.Tuple[typing.Optional[str], typing.Optional[int]] = (None, None), token: typing.Optional[str] = None):
+        if not cache_storage_url:
+            raise ValueError("The cache storage is required to exchange the outputs with other workers.")
+        self._token = token or os.getenv(TOKEN_ENV_NAME)
+        if not self._token:
+            raise ValueError(f"The token of the coordinator is required. Set {TOKEN_ENV_NAME}.")
+        self._coordinator_url = coordinator_url.rstrip('/')
+        self._cache_storage_url = cache_storage_url
+        self._worker_id = worker_id or f'{socket.gethostname()}-{os.getpid()}'
+        self._poll_interval = poll_interval
+        self._cache_compression = cache_compression
+
+    def run(self):
+        """Run the assigned tasks until the coordinator reports that the job is done."""
+        job_info = self._request('GET', '/job')
+        HashGenerator.set_hash_version(job_info['hash_version'])
+        tasks = list(Job(JobDescription.from_dict(job_info['job'])).tasks)
+        codec, codec_level = self._cache_compression
+        # The uploads must be finished before the completion is reported, so they are not run in background.
+        cache_manager = CacheManager(create_storage_manager(self._cache_storage_url), compression_codec=codec, compression_level=codec_level)
+        logger.info(f"Worker {self._worker_id} joined the run {job_info['run_id']}.")
+
+        while True:
+            try:
+                response = self._request('POST', '/claim', {'worker': self._worker_id})
+            except (urllib.error.URLError, ConnectionError) as e:
+                # The coordinator stops as soon as all the tasks are completed, possibly before this worker is told so.
+                logger.info(f"The coordinator is not available: {e}. Stopping the worker.")
+                break
+            if response['status'] == 'done':
+                break
+            if response['status'] == 'wait':
+                time.sleep(self._poll_interval)
+                continue
+
+            index = response['index']
+            try:
+                key = self._run_task(tasks, index, response['dependencies'], cache_manager, job_info)
+            except Exception as e:
+                logger.exception(f"Failed to run a task {tasks[index]}: {e}")
+                self._request('POST', '/fail', {'worker': self._worker_id, 'index': index, 'error': repr(e)})
+                continue
+            self._request('POST', '/complete', {'worker': self._worker_id, 'index': index, 'key': key})
+
+        logger.info(f"Worker {self._worker_id} completed.")
+
+    @staticmethod
+    def _run_task(tasks, index, dependencies, cache_manager, job_info):
+        """Run a task and save its outputs to the cache storage. Returns the cache key of the outputs."""
+        context = Context(job_info['env'], cache_manager)
+        tasks_by_name = {t.name: t for t in tasks}
+        for name, key in dependencies.items():
+            outputs_class = tasks_by_name[name].task_class.Outputs
+            cached_outputs = cache_manager.get_cache(key['task'], key['version'], key['hash'], outputs_class)
+            if not cached_outputs:
+                raise RuntimeError(f"The outputs of {name} are not found in the cache storage: {key}")
+            context.add_outputs(name, cached_outputs)
+
+        task = tasks[index]
+        task_hash = task.calculate_hash(context)
+        outputs = task.execute(context)
+        task_class = task.task_class
+        if task_class.CACHE_ENABLED:
+            # Task.execute() has saved the outputs, or they were loaded from the cache.
+            return {'task': task.task_name, 'version': task_class.VERSION, 'hash': task_hash}
+
+        exchange_hash = f"{job_info['run_id']}-{task_hash}"
+        cache_manager.upload_cache(task.task_name, task_class.VERSION, exchange_hash, outputs)
+        return {'task': task.task_name, 'version': task_class.VERSION, 'hash': exchange_hash}
+
+    def _request(self, method, path, body=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {self._token}'}
+        request = urllib.request.Request(self._coordinator_url + path, data=data, method=method, headers=headers)
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
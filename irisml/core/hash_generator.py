@@ -1,10 +1,15 @@
+import concurrent.futures
+import contextlib
+import copy
 import copyreg
 import dataclasses
 import hashlib
 import io
 import json
+import os
 import pickle
-import torch
+import sys
+import threading
 
 
 def _reduce_tensor(tensor):
@@ -12,34 +17,145 @@ def _reduce_tensor(tensor):
 
     Since pickle.dumps(tensor) is not deterministic, we convert torch.Tensor to numpy array.
     """
+    import torch
     return torch.Tensor, (tensor.cpu().numpy(),)
 
 
+_dispatch_tables = {}  # Whether torch is loaded => dispatch table
+
+
+def _get_dispatch_table():
+    """Returns the dispatch table for HashPickler.
+
+    torch is not imported by this module since it takes seconds. If torch hasn't been imported by anyone, there cannot be tensors to hash.
+    """
+    torch = sys.modules.get('torch')
+    key = torch is not None
+    if key not in _dispatch_tables:
+        dispatch_table = copyreg.dispatch_table.copy()
+        if torch:
+            dispatch_table[torch.Tensor] = _reduce_tensor
+        _dispatch_tables[key] = dispatch_table
+    return _dispatch_tables[key]
+
+
+def asdict_without_copy(value):
+    """Convert the dataclasses in the value in the same way as dataclasses.asdict(), but the other objects are not copied.
+
+    The lists, tuples and dicts are rebuilt. The other objects are shared with the original value.
+    """
+    return _asdict(value, lambda v: v)
+
+
+def _asdict(value, leaf_func):
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {f.name: _asdict(getattr(value, f.name), leaf_func) for f in dataclasses.fields(value)}
+    elif isinstance(value, tuple) and hasattr(value, '_fields'):  # namedtuple
+        return type(value)(*[_asdict(v, leaf_func) for v in value])
+    elif isinstance(value, (list, tuple)):
+        return type(value)(_asdict(v, leaf_func) for v in value)
+    elif isinstance(value, dict):
+        return type(value)((_asdict(k, leaf_func), _asdict(v, leaf_func)) for k, v in value.items())
+    return leaf_func(value)
+
+
 class HashPickler(pickle.Pickler):
     """Pickler to calculate hash.
 
     Note that it's not guaranteed that the loads(dumps(obj)) will create the same object.
     """
-    dispatch_table = copyreg.dispatch_table.copy()
-    dispatch_table[torch.Tensor] = _reduce_tensor
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dispatch_table = _get_dispatch_table()
 
 
 class HashGenerator:
     """Calculate hash for the given object.
 
     Note that we cannot simply hashlib.sha1(pickle.dumps(obj)) since some of the contents might be cached on remote. For nested objects, we calculate hash for each child element recursively.
+
+    Hash versions:
+        1: SHA1. Tensors are converted to numpy arrays and pickled. This is the default so that the existing caches stay valid.
+        2: BLAKE2b. Dense tensors are hashed directly from their memory buffer with dtype, shape and stride. No copy is made for contiguous CPU tensors.
+           The buffer is split into chunks that are hashed in parallel, and the tensor hash is calculated from the chunk hashes.
     """
+    HASH_VERSIONS = (1, 2)
+    TENSOR_CHUNK_SIZE = 16 * 1024 * 1024
+    _hash_version = 1
+    _executor = None
+    _executor_lock = threading.Lock()
+    _local = threading.local()
+    _NOT_MEMOIZED_TYPES = (str, bytes, int, float, bool, type(None))
+    _ATOMIC_TYPES = (str, bytes, int, float, bool, complex, type(None), type)  # copy.deepcopy() returns the same objects.
+
+    @classmethod
+    def set_hash_version(cls, version: int):
+        if version not in cls.HASH_VERSIONS:
+            raise ValueError(f"Unsupported hash version: {version}. Supported versions: {cls.HASH_VERSIONS}")
+        cls._hash_version = version
+
+    @classmethod
+    def get_hash_version(cls) -> int:
+        return cls._hash_version
+
+    @classmethod
+    @contextlib.contextmanager
+    def memoize(cls):
+        """Memoize hash values by object identity in this context.
+
+        The objects must not be modified in the context since the memoized hash values are not updated. The memo is per thread and it keeps references
+        to the hashed objects until the context exits.
+        """
+        if getattr(cls._local, 'memo', None) is not None:  # Nested context shares the outer memo.
+            yield
+            return
+
+        cls._local.memo = {}
+        try:
+            yield
+        finally:
+            cls._local.memo = None
+
+    @classmethod
+    def add_memo(cls, value, hash_value: str):
+        """Record a known hash value for the object. It has no effect outside of memoize() context."""
+        memo = getattr(cls._local, 'memo', None)
+        if memo is not None and not isinstance(value, cls._NOT_MEMOIZED_TYPES):
+            memo[id(value)] = (value, hash_value)
+
     @classmethod
     def calculate_hash(cls, value, context=None):
+        """Calculate the hash value.
+
+        Dataclasses are hashed as if they were converted by dataclasses.asdict(), but the fields are visited without making copies. Tuples are pickled
+        as a whole, so a tuple under a dataclass is converted like asdict() does if the conversion would change its pickle. See _needs_asdict_conversion().
+        """
         from .variable import Variable
+        hash_func = hashlib.sha1 if cls._hash_version == 1 else cls._blake2b
+        memo = getattr(cls._local, 'memo', None)
 
-        def get_hash(value):
-            if isinstance(value, dict):
-                value = json.dumps({k: get_hash(v) for k, v in sorted(value.items())}).encode('utf-8')
+        def get_hash(value, in_dataclass=False):
+            if in_dataclass and isinstance(value, tuple) and cls._needs_asdict_conversion(value):
+                value = _asdict(value, copy.deepcopy)
+
+            if memo is None or isinstance(value, (Variable, *cls._NOT_MEMOIZED_TYPES)):
+                return calculate(value, in_dataclass)
+
+            # The hash of a container can depend on whether it is under a dataclass.
+            key = (id(value), True) if in_dataclass else id(value)
+            if key not in memo:
+                memo[key] = (value, calculate(value, in_dataclass))  # Keep the reference so that the id is not reused.
+            return memo[key][1]
+
+        def calculate(value, in_dataclass):
+            if cls._hash_version >= 2 and cls._is_dense_tensor(value):
+                return cls._calculate_tensor_hash(value, hash_func)
+            elif isinstance(value, dict):
+                value = json.dumps({k: get_hash(v, in_dataclass) for k, v in sorted(value.items())}).encode('utf-8')
             elif isinstance(value, list):
-                value = json.dumps([get_hash(v) for v in value]).encode('utf-8')
-            elif dataclasses.is_dataclass(value):
-                value = json.dumps({k: get_hash(v) for k, v in sorted(dataclasses.asdict(value).items())}).encode('utf-8')
+                value = json.dumps([get_hash(v, in_dataclass) for v in value]).encode('utf-8')
+            elif cls._is_dataclass_instance(value):
+                value = json.dumps({f.name: get_hash(getattr(value, f.name), True) for f in sorted(dataclasses.fields(value), key=lambda f: f.name)}).encode('utf-8')
             elif isinstance(value, Variable):
                 return value.get_hash(context)
             elif hasattr(value, '__getstate__'):
@@ -50,6 +166,63 @@ class HashGenerator:
                 p.dump(value)
                 value = f.getbuffer()
 
-            return hashlib.sha1(value).hexdigest()
+            return hash_func(value).hexdigest()
 
         return get_hash(value)
+
+    @staticmethod
+    def _is_dataclass_instance(value):
+        return dataclasses.is_dataclass(value) and not isinstance(value, type)
+
+    @classmethod
+    def _needs_asdict_conversion(cls, value):
+        """dataclasses.asdict() converts the dataclasses in a tuple and copies each element separately, so the objects shared in the tuple are no longer
+        shared. Returns True if the tuple has a dataclass or a shared object, i.e. its pickle would be different from the converted one.
+        """
+        seen = set()
+
+        def visit(v):
+            if isinstance(v, cls._ATOMIC_TYPES):
+                return False
+            if cls._is_dataclass_instance(v) or id(v) in seen:
+                return True
+            seen.add(id(v))
+            if isinstance(v, (list, tuple)):
+                return any(visit(c) for c in v)
+            if isinstance(v, dict):
+                return any(visit(k) or visit(c) for k, c in v.items())
+            return False
+
+        return visit(value)
+
+    @staticmethod
+    def _blake2b(data=b''):
+        return hashlib.blake2b(data, digest_size=20)
+
+    @staticmethod
+    def _is_dense_tensor(value):
+        torch = sys.modules.get('torch')
+        return torch is not None and isinstance(value, torch.Tensor) and value.layout == torch.strided and not value.is_quantized and value.device.type != 'meta'
+
+    @classmethod
+    def _calculate_tensor_hash(cls, tensor, hash_func):
+        """Hash the raw memory of a tensor in chunks. A copy is made only if the tensor is not a contiguous CPU tensor."""
+        import torch
+        tensor_type = type(tensor).__qualname__
+        tensor = tensor.detach().cpu().contiguous()
+        h = hash_func()
+        h.update(json.dumps({'type': tensor_type, 'dtype': str(tensor.dtype), 'shape': list(tensor.shape), 'stride': list(tensor.stride())}).encode('utf-8'))
+        buffer = memoryview(tensor.reshape(-1).view(torch.uint8).numpy())
+        chunks = [buffer[i:i + cls.TENSOR_CHUNK_SIZE] for i in range(0, len(buffer), cls.TENSOR_CHUNK_SIZE)]
+        # hashlib releases GIL for large inputs, so the chunks can be hashed in parallel.
+        digests = cls._get_executor().map(lambda c: hash_func(c).digest(), chunks) if len(chunks) > 1 else [hash_func(c).digest() for c in chunks]
+        for digest in digests:
+            h.update(digest)
+        return h.hexdigest()
+
+    @classmethod
+    def _get_executor(cls):
+        with cls._executor_lock:
+            if not cls._executor:
+                cls._executor = concurrent.futures.ThreadPoolExecutor(os.cpu_count(), thread_name_prefix='irisml-hash')
+            return cls._executor
@@ -24,9 +24,58 @@ class Job:
         for t in self._tasks:
             yield t
 
+    def get_dependencies(self):
+        """Get the dependency graph of the tasks.
+
+        A task depends on a previous task if it has an OutputVariable that refers to that task. References to unknown names are ignored since they can be
+        resolved by nested jobs.
+
+        Returns:
+            A list of sets. The i-th set contains the indices of the tasks that the i-th task depends on.
+        """
+        dependencies = []
+        name_to_index = {}
+        for i, t in enumerate(self._tasks):
+            dependencies.append({name_to_index[name] for name in t.get_dependencies() if name in name_to_index})
+            name_to_index[t.name] = i
+        return dependencies
+
+    def get_consumers(self):
+        """Get the tasks that consume each output field.
+
+        Returns:
+            A dict {(task name, field name): set of the names of the tasks that consume the field}.
+        """
+        consumers = {}
+        for t in self._tasks:
+            for key in t.get_consumed_fields():
+                consumers.setdefault(key, set()).add(t.name)
+        return consumers
+
+    def get_identical_task_candidates(self):
+        """Find the groups of tasks that might be identical.
+
+        Tasks are candidates if they have the same task module, config and inputs, where the referenced outputs are from candidates as well. Whether they
+        are actually identical is decided by the task hashes at runtime since the hashes depend on the environment variables and the outputs.
+
+        Returns:
+            A list of lists of task names. Each list has two or more names.
+        """
+        signatures = {}
+        groups = {}
+        for t in self._tasks:
+            signatures[t.name] = t.get_signature(signatures)
+            groups.setdefault(signatures[t.name], []).append(t.name)
+        return [g for g in groups.values() if len(g) > 1]
+
     def load_modules(self):
         for t in self.tasks:
             t.load_module()
 
+    def validate(self, task_index):
+        """Validate the tasks with the metadata in the TaskIndex. The task modules are not imported unless the index needs to be updated."""
+        for t in self.tasks:
+            t.validate_with_index(task_index)
+
     def __str__(self):
         return "Job {\n" + '\n'.join([f"  {t}" for t in self.tasks]) + '\n}'
@@ -1,40 +1,126 @@
 import logging
+import pathlib
 import typing
 from irisml.core import JobDescription
+from irisml.core import compression, profiler
 from irisml.core.cache_manager import create_storage_manager, CacheManager
 from irisml.core.context import Context
+from irisml.core.hash_generator import HashGenerator
 from irisml.core.job import Job
+from irisml.core.job_scheduler import JobScheduler
+from irisml.core.journal import RunJournal
+from irisml.core.memory_monitor import MemoryMonitor
+from irisml.core.planner import plan_job, PlanEntry
+from irisml.core.prefetcher import Prefetcher
+from irisml.core.task_index import TaskIndex
 
 logger = logging.getLogger(__name__)
 
 
 class JobRunner:
-    """Helper class to run a job."""
-    def __init__(self, job_dict: typing.Dict, env_vars: typing.Dict[str, str], cache_storage_url: str = None):
+    """Helper class to run a job.
+
+    Args:
+        job_dict (Dict): The job description.
+        env_vars (Dict[str, str]): Environment variables for the job.
+        cache_storage_url (str): URL for the cache storage. If not provided, the cache is disabled.
+        num_workers (int): The number of tasks that can run at the same time. If 1, the tasks run sequentially in the defined order.
+        executor_type (str): 'thread' or 'process'. If not provided, 'process' is used if num_workers > 1. See JobScheduler for the detail.
+        hash_version (int): The version of HashGenerator. If not provided, the default version is used. See HashGenerator for the detail.
+        cache_compression (str): The compression codec for the cache, optionally with a level, e.g. 'zstd' or 'zstd:9'. See irisml.core.compression.
+        prefetch_max_bytes (int): The memory budget for loading cached outputs before they are consumed. If 0, the cached outputs are loaded on access.
+        release_outputs (bool): If True, the outputs are released from the context when all the tasks that refer to them are completed. The fields that no task refers to are kept.
+            Tasks that access the outputs of other tasks without $output variables require False.
+        profile_filepath (str): If provided, the time spent in each phase of the tasks is recorded and saved to this file in the Chrome trace event format.
+            A summary table is logged at the end of the run. See irisml.core.profiler.
+        run_dir (str): If provided, the outputs of the completed tasks are recorded in this directory, and the tasks recorded by a previous run with the
+            same config and inputs are skipped. See irisml.core.journal.
+    """
+    def __init__(self, job_dict: typing.Dict, env_vars: typing.Dict[str, str], cache_storage_url: str = None, num_workers: int = 1, executor_type: typing.Optional[str] = None,
+                 hash_version: typing.Optional[int] = None, cache_compression: typing.Optional[str] = None, prefetch_max_bytes: int = 2 * 1024 ** 3,
+                 release_outputs: bool = True, profile_filepath: typing.Optional[str] = None, run_dir: typing.Optional[str] = None):
         job_description = JobDescription.from_dict(job_dict)
         self._job = Job(job_description)
         self._env_vars = env_vars
         self._cache_storage_url = cache_storage_url
+        self._cache_compression = compression.parse_compression(cache_compression) if cache_compression else (None, None)
+        self._prefetch_max_bytes = prefetch_max_bytes
+        self._release_outputs = release_outputs
+        self._profile_filepath = profile_filepath
+        self._run_dir = run_dir
+        if hash_version:
+            HashGenerator.set_hash_version(hash_version)
+        self._scheduler = JobScheduler(self._job, num_workers, executor_type) if num_workers > 1 or executor_type == 'process' else None
+
+    def plan(self) -> typing.List[PlanEntry]:
+        """Find the tasks that would be skipped by the cache or the run journal, without running them. See irisml.core.planner."""
+        self._job.validate(TaskIndex())
+        cache_manager = CacheManager(create_storage_manager(self._cache_storage_url)) if self._cache_storage_url else None
+        # A journal is not created for planning.
+        journal = RunJournal(self._run_dir) if self._run_dir and (pathlib.Path(self._run_dir) / RunJournal.JOURNAL_NAME).exists() else None
+        return plan_job(self._job, Context(self._env_vars, cache_manager, journal=journal))
 
     def run(self, dry_run=False):
-        logger.debug("Loading task modules.")
-        self._job.load_modules()
+        # The task modules are imported when the tasks run.
+        logger.debug("Validating the tasks.")
+        self._job.validate(TaskIndex())
 
         logger.info("Running a job.")
 
-        cache_manager = CacheManager(create_storage_manager(self._cache_storage_url)) if self._cache_storage_url else None
+        job_profiler = profiler.Profiler() if self._profile_filepath else None
+        if job_profiler:
+            job_profiler.start()
+
+        cache_manager = None
+        if self._cache_storage_url:
+            codec, codec_level = self._cache_compression
+            cache_manager = CacheManager(create_storage_manager(self._cache_storage_url), background_upload=True, compression_codec=codec, compression_level=codec_level)
         if cache_manager:
             logger.info(f"Cache is enabled: {self._cache_storage_url}")
 
-        context = Context(self._env_vars, cache_manager)
+        journal = None
+        if self._run_dir and not dry_run:
+            journal = RunJournal(self._run_dir)
+            logger.info(f"Recording the completed tasks in {self._run_dir}. The journal has {journal.num_entries} entries.")
+
+        # The journaled outputs are loaded lazily as well.
+        prefetcher = Prefetcher(self._job.get_consumers(), self._prefetch_max_bytes) if (cache_manager or journal) and self._prefetch_max_bytes and not dry_run else None
+        context = Context(self._env_vars, cache_manager, prefetcher, self._job.get_consumers() if self._release_outputs else None, journal,
+                          self._job.get_identical_task_candidates())
+        memory_monitor = MemoryMonitor()
 
-        # Note that the random seed will be reset in each Task.execute().
-        for task in self._job.tasks:
-            logger.debug(f"Running a task: {task}")
-            try:
-                task.execute(context, dry_run)
-            except Exception as e:
-                logger.exception(f"Failed to run a task {task}: {e}")
-                raise
+        try:
+            # Note that the random seed will be reset in each Task.execute().
+            if self._scheduler:
+                self._scheduler.run(context, dry_run, memory_monitor)
+            else:
+                for task in self._job.tasks:
+                    logger.debug(f"Running a task: {task}")
+                    try:
+                        with profiler.task(task.name), memory_monitor.track(task.name):
+                            task.execute(context, dry_run)
+                    except Exception as e:
+                        logger.exception(f"Failed to run a task {task}: {e}")
+                        raise
+        finally:
+            memory_monitor.close()
+            peaks = memory_monitor.get_peaks()
+            if peaks:
+                logger.info("Peak memory: " + ', '.join(f"{t.name}={peaks[t.name] / 2 ** 20:.0f}MB" for t in self._job.tasks if t.name in peaks))
+            if prefetcher:
+                prefetcher.shutdown()
+            if cache_manager:
+                logger.debug("Waiting for the cache uploads.")
+                failures = cache_manager.flush()
+                for paths, e in failures:
+                    logger.error(f"Failed to save cache {'/'.join(paths)}: {e}")
+                for name, stats in cache_manager.get_stats().items():
+                    logger.info(f"Cache {name}: {', '.join(f'{k}={v}' for k, v in stats.items())}")
+            if job_profiler:
+                job_profiler.stop()
+                for name, peak in peaks.items():
+                    job_profiler.set_task_info(name, peak_rss=peak)
+                job_profiler.save(self._profile_filepath)
+                logger.info(f"Saved the profile to {self._profile_filepath}\n{job_profiler.format_summary()}")
 
         logger.info("Completed.")
@@ -0,0 +1,92 @@
+import concurrent.futures
+import contextlib
+import logging
+from . import profiler
+from .shared_memory import ProcessPool
+
+logger = logging.getLogger(__name__)
+
+
+class JobScheduler:
+    """Run the tasks in a job concurrently, following the dependencies defined by OutputVariables.
+
+    A task starts as soon as all the tasks it refers to are completed. If there are multiple runnable tasks, the one defined earlier in the job runs first.
+
+    Note that only $output references are considered as dependencies. If a task relies on side effects of other tasks, it must run with num_workers=1.
+
+    Executor types:
+        thread: Run the tasks in threads. The random seed is reset at the beginning of each task, but the random generators are shared
+                in the process. Tasks that consume random numbers might not be reproducible if they run at the same time, so a warning is logged
+                if num_workers > 1.
+        process: Run the task modules in worker processes. Each task resets the random seed in its own process, so the results are deterministic.
+                 This is the default if num_workers > 1.
+                 The task modules, their config, inputs and outputs must be picklable. Large tensors and numpy arrays in the inputs and outputs are
+                 transferred through memory-mapped files instead of the pipe. See irisml.core.shared_memory.
+    """
+    EXECUTOR_TYPES = ('thread', 'process')
+
+    def __init__(self, job, num_workers=1, executor_type=None):
+        if num_workers < 1:
+            raise ValueError(f"num_workers must be a positive integer: {num_workers}")
+        executor_type = executor_type or ('process' if num_workers > 1 else 'thread')
+        if executor_type not in self.EXECUTOR_TYPES:
+            raise ValueError(f"Unknown executor type: {executor_type}. Supported types: {self.EXECUTOR_TYPES}")
+        if executor_type == 'thread' and num_workers > 1:
+            logger.warning("Tasks run in threads share the random generators, so tasks that use random numbers are not reproducible. "
+                           "Use the process executor for deterministic results.")
+
+        self._job = job
+        self._num_workers = num_workers
+        self._executor_type = executor_type
+
+    def run(self, context, dry_run=False, memory_monitor=None):
+        """Run all tasks. If a memory_monitor is given, the peak memory of each task is recorded."""
+        tasks = list(self._job.tasks)
+        remaining_dependencies = self._job.get_dependencies()
+        dependents = [[] for _ in tasks]
+        for i, dependencies in enumerate(remaining_dependencies):
+            for d in dependencies:
+                dependents[d].append(i)
+
+        ready = [i for i, dependencies in enumerate(remaining_dependencies) if not dependencies]
+        running = {}
+        error = None
+
+        with self._create_process_pool(dry_run) as process_pool, concurrent.futures.ThreadPoolExecutor(self._num_workers, thread_name_prefix='irisml') as executor:
+            while ready or running:
+                while ready and not error:
+                    index = ready.pop(0)
+                    logger.debug(f"Running a task: {tasks[index]}")
+                    running[executor.submit(self._execute, tasks[index], context, dry_run, process_pool, memory_monitor)] = index
+
+                if not running:
+                    break
+
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.exception(f"Failed to run a task {tasks[index]}: {e}")
+                        error = error or e
+                        continue
+
+                    for d in dependents[index]:
+                        remaining_dependencies[d].discard(index)
+                        if not remaining_dependencies[d]:
+                            ready.append(d)
+                    ready.sort()
+
+        if error:
+            raise error
+
+    @staticmethod
+    def _execute(task, context, dry_run, process_pool, memory_monitor):
+        with profiler.task(task.name), memory_monitor.track(task.name) if memory_monitor else contextlib.nullcontext():
+            return task.execute(context, dry_run, process_pool)
+
+    def _create_process_pool(self, dry_run):
+        if self._executor_type == 'process' and not dry_run:
+            return ProcessPool(self._num_workers)
+        return contextlib.nullcontext()
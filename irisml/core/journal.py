@@ -0,0 +1,99 @@
+"""A local journal of the completed tasks in a run, so that a failed run can be resumed without the cache.
+
+The outputs of each completed task are saved to <run_dir>/outputs in the same layout as the cache, and an entry is appended to <run_dir>/journal.jsonl
+after the outputs are saved. An entry is {"name": <task name in the job>, "task": <task module name>, "version": str, "hash": <task hash>,
+"location": "journal" | "cache"}. The outputs of a cache hit are not copied; the entry refers to the cache instead.
+
+When the run is resumed, a task is skipped if the journal has an entry with the same name, task module, version and hash. Since the hash covers the
+config and the inputs, a task runs again if its config or any of its upstream outputs changed. Tasks with CACHE_ENABLED=False are skipped as well;
+their journaled outputs are reused as they are.
+"""
+import json
+import logging
+import pathlib
+import threading
+import typing
+from .cache_manager import CacheManager, CachedOutputs, FileSystemStorageManager
+
+logger = logging.getLogger(__name__)
+
+
+class RunJournal:
+    """Save the outputs of the completed tasks and look them up when the run is resumed.
+
+    Args:
+        run_dir (pathlib.Path): The directory for the journal. It is created if it doesn't exist.
+    """
+    JOURNAL_NAME = 'journal.jsonl'
+
+    def __init__(self, run_dir: pathlib.Path):
+        self._run_dir = pathlib.Path(run_dir)
+        (self._run_dir / 'outputs').mkdir(parents=True, exist_ok=True)
+        self._journal_filepath = self._run_dir / self.JOURNAL_NAME
+        # The outputs are saved synchronously so that an entry is written only after its outputs are complete.
+        self._cache_manager = CacheManager(FileSystemStorageManager(self._run_dir / 'outputs'))
+        self._entries = self._load()
+        self._lock = threading.Lock()
+
+    @property
+    def num_entries(self) -> int:
+        return len(self._entries)
+
+    def get_outputs(self, name: str, task_name: str, task_version: str, task_hash: str, outputs_class, cache_manager=None) -> typing.Optional[CachedOutputs]:
+        """Returns the journaled outputs of the task as CachedOutputs. Returns None if the task is not in the journal.
+
+        Args:
+            cache_manager (CacheManager): The cache to load the outputs of cache hits from. If None, those entries are ignored.
+        """
+        entry = self._entries.get((name, task_hash))
+        if not entry or entry['task'] != task_name or entry['version'] != task_version:
+            return None
+
+        if entry['location'] == 'cache':
+            return cache_manager and cache_manager.get_cache(task_name, task_version, task_hash, outputs_class)
+
+        outputs = self._cache_manager.get_cache(*self._get_paths(entry), outputs_class)
+        if not outputs:
+            logger.warning(f"The journaled outputs of {name} are missing in {self._run_dir}.")
+        return outputs
+
+    def record(self, name: str, task_name: str, task_version: str, task_hash: str, outputs):
+        """Save the outputs of a completed task. If the outputs are CachedOutputs, only the reference to the cache is saved.
+
+        If the outputs cannot be saved, e.g. they are not picklable, the task is not recorded and runs again when the run is resumed.
+        """
+        entry = {'name': name, 'task': task_name, 'version': task_version, 'hash': task_hash}
+        if isinstance(outputs, CachedOutputs):
+            entry['location'] = 'cache'
+        else:
+            entry['location'] = 'journal'
+            try:
+                self._cache_manager.upload_cache(*self._get_paths(entry), outputs)
+            except Exception as e:
+                logger.warning(f"Failed to save the outputs of {name} to the run journal due to {e}. The task will run again when the run is resumed.")
+                return
+
+        with self._lock:
+            with open(self._journal_filepath, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+            self._entries[(name, task_hash)] = entry
+
+    @staticmethod
+    def _get_paths(entry):
+        # The task name is used instead of the module name since the same task can run with the same config in a job.
+        return entry['name'], entry['version'], entry['hash']
+
+    def _load(self):
+        """Returns {(task name, task hash): entry}."""
+        entries = {}
+        if not self._journal_filepath.exists():
+            return entries
+        for line in self._journal_filepath.read_text().splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # The last line is incomplete if the process was killed while writing it.
+                logger.warning(f"Ignoring a broken entry in {self._journal_filepath}: {line}")
+                continue
+            entries[(entry['name'], entry['hash'])] = entry
+        return entries
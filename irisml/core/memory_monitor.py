@@ -0,0 +1,82 @@
+import contextlib
+import logging
+import os
+import threading
+import typing
+
+logger = logging.getLogger(__name__)
+
+
+def get_rss() -> typing.Optional[int]:
+    """Returns the resident set size of this process in bytes. Returns None if it is not available on this platform."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+class MemoryMonitor:
+    """Track the peak resident memory of this process while each task is running.
+
+    The memory usage is sampled in a background thread every `interval` seconds, so short spikes might be missed. If multiple tasks are running at the
+    same time, each of them reports the peak of the whole process. Tasks that run in worker processes are not included.
+    The peaks are not available on platforms without /proc.
+    """
+    def __init__(self, interval: float = 0.05):
+        self._interval = interval
+        self._active = {}  # name => peak RSS so far
+        self._peaks = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = None
+        self._closed = False
+        self._enabled = get_rss() is not None
+
+    @contextlib.contextmanager
+    def track(self, name: str):
+        """Record the peak memory while the block is running."""
+        if not self._enabled:
+            yield
+            return
+
+        with self._lock:
+            self._active[name] = get_rss()
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run, daemon=True, name='irisml-memory-monitor')
+                self._thread.start()
+            self._wakeup.notify()
+        try:
+            yield
+        finally:
+            rss = get_rss()
+            with self._lock:
+                self._peaks[name] = max(self._active.pop(name), rss)
+
+    def get_peak(self, name: str) -> typing.Optional[int]:
+        """Returns the peak memory in bytes while the task was running. Returns None if it is not available."""
+        with self._lock:
+            return self._peaks.get(name)
+
+    def get_peaks(self) -> typing.Dict[str, int]:
+        with self._lock:
+            return dict(self._peaks)
+
+    def close(self):
+        """Stop the background thread."""
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        with self._lock:
+            while not self._closed:
+                if not self._active:
+                    self._wakeup.wait()
+                    continue
+                rss = get_rss()
+                for name in self._active:
+                    self._active[name] = max(self._active[name], rss)
+                self._wakeup.wait(self._interval)
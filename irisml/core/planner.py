@@ -0,0 +1,145 @@
+"""Find out which tasks in a job would be skipped by the cache, without running or downloading anything.
+
+The task hashes are calculated in the job order. When a task is a cache hit, its CachedOutputs are added to the context, so the hashes of the downstream
+tasks are calculated from the hash values in the cache manifest. A task whose upstream task has to run cannot be looked up since its inputs are unknown,
+so it is planned to run as well.
+
+The cache lookups are issued concurrently. A task is hashed and looked up as soon as all of its upstream tasks are found in the cache.
+"""
+import concurrent.futures
+import dataclasses
+import logging
+import typing
+from . import profiler
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class PlanEntry:
+    """The plan for a task.
+
+    status is 'hit' if the outputs are in the cache, 'journal' if they are in the run journal, or 'run'. download_bytes is the size of the cached
+    fields that the tasks to run consume. unknown_sizes is the number of such fields whose size is not recorded in the cache.
+    """
+    name: str
+    task_name: str
+    status: str
+    reason: str = ''
+    task_hash: typing.Optional[str] = None
+    download_bytes: int = 0
+    unknown_sizes: int = 0
+
+
+def plan_job(job, context, num_workers: int = 16) -> typing.List[PlanEntry]:
+    """Plan the tasks in the job. The context must have the cache manager, and optionally the run journal, that the run would use.
+
+    Args:
+        job (Job): The job to plan.
+        context (Context): The context to look up the cache. The CachedOutputs of the hits are added to it.
+        num_workers (int): The max number of concurrent cache lookups.
+    Returns:
+        A list of PlanEntry in the job order.
+    """
+    tasks = list(job.tasks)
+    dependencies = job.get_dependencies()
+    remaining_dependencies = [set(d) for d in dependencies]
+    dependents = [[] for _ in tasks]
+    for i, task_dependencies in enumerate(dependencies):
+        for d in task_dependencies:
+            dependents[d].append(i)
+
+    entries = [None] * len(tasks)
+    outputs = {}  # task index => CachedOutputs of the hits
+    ready = [i for i, d in enumerate(dependencies) if not d]
+    running = {}
+
+    def release(index):
+        for d in dependents[index]:
+            remaining_dependencies[d].discard(index)
+            if not remaining_dependencies[d]:
+                ready.append(d)
+
+    with concurrent.futures.ThreadPoolExecutor(num_workers, thread_name_prefix='irisml-plan') as executor:
+        while ready or running:
+            # Hashing uses the context, so it is done in this thread. Only the lookups run in the executor.
+            while ready:
+                index = ready.pop(0)
+                task = tasks[index]
+                try:
+                    if any(entries[d].status == 'run' for d in dependencies[index]):
+                        entries[index] = PlanEntry(task.name, task.task_name, 'run', 'upstream task runs')
+                    else:
+                        with profiler.span('hash'):
+                            task_hash = task.calculate_hash(context)
+                        running[executor.submit(profiler.bind_task(_lookup), task, task_hash, context)] = index
+                        continue
+                except ValueError as e:  # Refers to outputs that are not in the job, e.g. those of a parent job.
+                    entries[index] = PlanEntry(task.name, task.task_name, 'run', f'cannot calculate the hash: {e}')
+                release(index)
+
+            if not running:
+                break
+
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                entries[index], cached_outputs = future.result()
+                if cached_outputs:
+                    outputs[index] = cached_outputs
+                    context.add_outputs(tasks[index].name, cached_outputs)
+                release(index)
+            ready.sort()
+
+    # Cached fields are downloaded only if a task that runs consumes them.
+    name_to_index = {t.name: i for i, t in enumerate(tasks)}
+    for (output_name, field_name), consumer_names in job.get_consumers().items():
+        index = name_to_index.get(output_name)
+        if index is None or entries[index].status != 'hit':
+            continue
+        if any(name in name_to_index and entries[name_to_index[name]].status == 'run' for name in consumer_names):
+            size = outputs[index].get_size(field_name)
+            if size is None:
+                entries[index].unknown_sizes += 1
+            else:
+                entries[index].download_bytes += size
+
+    return entries
+
+
+def _lookup(task, task_hash, context):
+    """Returns (PlanEntry, CachedOutputs or None)."""
+    task_class = task.task_class
+    journaled_outputs = context.get_journaled_outputs(task.name, task.task_name, task_class.VERSION, task_hash, task_class.Outputs)
+    if journaled_outputs:
+        return PlanEntry(task.name, task.task_name, 'journal', task_hash=task_hash), journaled_outputs
+    if not task_class.CACHE_ENABLED:
+        return PlanEntry(task.name, task.task_name, 'run', 'cache disabled for the task', task_hash), None
+    if not context.cache_enabled:
+        return PlanEntry(task.name, task.task_name, 'run', 'no cache', task_hash), None
+
+    with profiler.span('cache_lookup'):
+        cached_outputs = context.get_cached_outputs(task.task_name, task_class.VERSION, task_hash, task_class.Outputs)
+    if cached_outputs:
+        return PlanEntry(task.name, task.task_name, 'hit', task_hash=task_hash), cached_outputs
+    return PlanEntry(task.name, task.task_name, 'run', 'cache miss', task_hash), None
+
+
+def format_plan(entries: typing.List[PlanEntry]) -> str:
+    """Returns a table of the plan and a summary line."""
+    header = ['task', 'status', 'download', 'reason']
+    rows = [[e.name, e.status, _format_bytes(e.download_bytes) + (f' (+{e.unknown_sizes} unknown)' if e.unknown_sizes else ''), e.reason] for e in entries]
+    widths = [max(len(r[i]) for r in [header] + rows) for i in range(len(header))]
+    lines = ['  '.join(c.ljust(w) for c, w in zip(r, widths)).rstrip() for r in [header] + rows]
+
+    counts = {s: sum(1 for e in entries if e.status == s) for s in ('hit', 'journal', 'run')}
+    total_bytes = sum(e.download_bytes for e in entries)
+    lines.append(f"{counts['hit']} hits, {counts['journal']} journaled, {counts['run']} to run. Estimated download: {_format_bytes(total_bytes)}")
+    return '\n'.join(lines)
+
+
+def _format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f'{size:.0f}{unit}' if unit == 'B' else f'{size:.1f}{unit}'
+        size /= 1024
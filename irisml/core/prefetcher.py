@@ -0,0 +1,78 @@
+import collections
+import concurrent.futures
+import logging
+import threading
+import typing
+from .cache_manager import CachedOutputs
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """Load the fields of CachedOutputs in background threads before the tasks that consume them run.
+
+    When a task is skipped by a cache hit, the fields referenced by the later tasks start loading right away, so that the downloads overlap with other tasks.
+    The loaded fields are counted against max_bytes until all of their consumers are completed. Fields that don't fit in the budget wait in a queue,
+    and fields whose size is unknown are not prefetched. If all consumers of a field are completed before its loading starts, e.g. because the consumers
+    were cache hits too, the loading is cancelled.
+
+    Args:
+        consumers (Dict[Tuple[str, str], Set[str]]): {(task name, field name): names of the tasks that consume the field}. See Job.get_consumers().
+        max_bytes (int): The max total size of the prefetched fields in bytes. The size in the cache manifest is used.
+        num_workers (int): The number of background threads.
+    """
+    def __init__(self, consumers: typing.Dict[typing.Tuple[str, str], typing.Set[str]], max_bytes: int = 2 * 1024 ** 3, num_workers: int = 4):
+        self._consumers = {k: set(v) for k, v in consumers.items() if v}
+        self._max_bytes = max_bytes
+        self._executor = concurrent.futures.ThreadPoolExecutor(num_workers, thread_name_prefix='irisml-prefetch')
+        self._queue = collections.OrderedDict()  # (task name, field name) => (CachedOutputs, size)
+        self._futures = {}  # (task name, field name) => Future
+        self._reserved = {}  # (task name, field name) => size
+        self._lock = threading.Lock()
+
+    def on_outputs_added(self, name: str, outputs):
+        """Called when a task is completed. Start loading the consumed fields if the outputs are from the cache."""
+        with self._lock:
+            # The fields consumed by the completed task are no longer ahead of their consumers.
+            for key, consumers in list(self._consumers.items()):
+                if name in consumers:
+                    consumers.discard(name)
+                    if not consumers:
+                        del self._consumers[key]
+                        self._release(key)
+
+            if isinstance(outputs, CachedOutputs):
+                for key in self._consumers:
+                    if key[0] == name:
+                        size = outputs.get_size(key[1])
+                        if size is not None and size <= self._max_bytes:
+                            self._queue[key] = (outputs, size)
+
+            self._start_loading()
+
+    def shutdown(self):
+        """Cancel the pending loadings and wait for the running ones."""
+        with self._lock:
+            self._queue.clear()
+            for future in self._futures.values():
+                future.cancel()
+        self._executor.shutdown(wait=True)
+
+    def _release(self, key):
+        self._queue.pop(key, None)
+        future = self._futures.pop(key, None)
+        if future and future.cancel():
+            logger.debug(f"Cancelled prefetching {key[0]}.{key[1]}")
+        self._reserved.pop(key, None)
+
+    def _start_loading(self):
+        while self._queue:
+            key, (outputs, size) = next(iter(self._queue.items()))
+            if sum(self._reserved.values()) + size > self._max_bytes:
+                break
+            del self._queue[key]
+            future = outputs.load_async(key[1], self._executor)
+            if future:
+                logger.debug(f"Prefetching {key[0]}.{key[1]} ({size} bytes)")
+                self._futures[key] = future
+                self._reserved[key] = size
@@ -0,0 +1,245 @@
+"""Record where the time goes in a job run.
+
+While a Profiler is active, the framework records spans for the phases of each task and writes them in the Chrome trace event format, which can be
+opened with chrome://tracing or https://ui.perfetto.dev.
+
+Phases:
+    hash: Calculating the hash of the task config and inputs, and verifying the hashes of the cached contents.
+    cache_lookup: Looking for the cached outputs of the task.
+    resolve: Resolving the variables in the config and inputs. Loading cached outputs of other tasks is recorded separately.
+    download: Reading cached contents from the storage.
+    deserialize: Deserializing cached contents.
+    execute: Running the task module.
+    serialize: Serializing the outputs for the cache.
+    upload: Writing the outputs to the cache storage.
+
+A span is attributed to the task running in the same thread. Background work such as cache uploads and prefetching is attributed to the task that
+started it. The time of a nested span is not included in its parent in the summary.
+
+The module-level functions do nothing if there is no active profiler, so they can be called without checking.
+"""
+import contextlib
+import dataclasses
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import typing
+
+PHASES = ('hash', 'cache_lookup', 'resolve', 'download', 'deserialize', 'execute', 'serialize', 'upload')
+
+_active_profiler = None
+
+
+class Profiler:
+    """Collect trace events of a job run.
+
+    Use start() and stop() to make this profiler active. Only one profiler can be active at a time.
+    """
+    def __init__(self):
+        self._events = []
+        self._task_stats = {}  # task name => {'wall_time': seconds, 'phases': {phase: seconds}, 'bytes': {kind: int}, other info}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._start_time = time.perf_counter()
+        self._pid = os.getpid()
+        self._thread_names = {}
+
+    def start(self):
+        global _active_profiler
+        if _active_profiler:
+            raise RuntimeError("Another profiler is already active.")
+        _active_profiler = self
+
+    def stop(self):
+        global _active_profiler
+        if _active_profiler is self:
+            _active_profiler = None
+
+    @contextlib.contextmanager
+    def task(self, name: str):
+        """Record the wall time of a task. The spans in this block are attributed to the task."""
+        previous_task = getattr(self._local, 'task', None)
+        self._local.task = name
+        start = time.perf_counter()
+        try:
+            with self.span(name, 'task'):
+                yield
+        finally:
+            self._local.task = previous_task
+            with self._lock:
+                self._get_task_stats(name)['wall_time'] = time.perf_counter() - start
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: typing.Optional[str] = None, **args):
+        """Record a span. The category defaults to the name. If the category is one of PHASES, its time is added to the current task."""
+        category = category or name
+        stack = self._get_stack()
+        stack.append(0.0)  # The total time of the child spans.
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            children_time = stack.pop()
+            if stack:
+                stack[-1] += end - start
+            task = self.get_current_task()
+            event = {'name': name, 'cat': category, 'ph': 'X', 'ts': (start - self._start_time) * 1e6, 'dur': (end - start) * 1e6, 'pid': self._pid,
+                     'tid': threading.get_ident(), 'args': {'task': task, **args} if task else args}
+            with self._lock:
+                self._events.append(event)
+                self._thread_names.setdefault(threading.get_ident(), threading.current_thread().name)
+                if task and category in PHASES:
+                    phases = self._get_task_stats(task)['phases']
+                    phases[category] = phases.get(category, 0.0) + (end - start) - children_time
+
+    def add_bytes(self, kind: str, nbytes: int):
+        """Add the number of bytes transferred, e.g. kind='downloaded', to the current task."""
+        task = self.get_current_task()
+        if task:
+            with self._lock:
+                task_bytes = self._get_task_stats(task)['bytes']
+                task_bytes[kind] = task_bytes.get(kind, 0) + nbytes
+
+    def set_task_info(self, task: typing.Optional[str] = None, **kwargs):
+        """Set additional information of a task such as the cache status. The current task is used if the task name is not provided.
+
+        The values that are already set are kept, so that nested tasks don't overwrite the information of the task that runs them.
+        """
+        task = task or self.get_current_task()
+        if task:
+            with self._lock:
+                task_stats = self._get_task_stats(task)
+                for key, value in kwargs.items():
+                    task_stats.setdefault(key, value)
+
+    def get_current_task(self) -> typing.Optional[str]:
+        return getattr(self._local, 'task', None)
+
+    def bind_task(self, func):
+        """Returns a function that runs func as a part of the current task. Used to attribute background work to the task that started it."""
+        task = self.get_current_task()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            previous_task = getattr(self._local, 'task', None)
+            self._local.task = task
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._local.task = previous_task
+        return wrapper
+
+    def get_task_stats(self) -> typing.Dict[str, typing.Dict]:
+        """Returns {task name: {'wall_time': seconds, 'phases': {phase: seconds}, 'bytes': {kind: bytes}, ...}} in the order the tasks started."""
+        with self._lock:
+            return {k: {**v, 'phases': dict(v['phases']), 'bytes': dict(v['bytes'])} for k, v in self._task_stats.items()}
+
+    def get_trace(self) -> typing.Dict:
+        """Returns the events in the Chrome trace event format."""
+        with self._lock:
+            metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': self._pid, 'tid': tid, 'args': {'name': name}} for tid, name in self._thread_names.items()]
+            metadata.append({'name': 'process_name', 'ph': 'M', 'pid': self._pid, 'args': {'name': 'irisml'}})
+            events = sorted(self._events, key=lambda e: e['ts'])
+            task_stats = {k: {**v, 'phases': dict(v['phases']), 'bytes': dict(v['bytes'])} for k, v in self._task_stats.items()}
+        return {'traceEvents': metadata + events, 'displayTimeUnit': 'ms', 'otherData': {'tasks': task_stats}}
+
+    def save(self, filepath):
+        with open(filepath, 'w') as f:
+            json.dump(self.get_trace(), f)
+
+    def format_summary(self) -> str:
+        """Returns a table of the time spent in each phase of each task."""
+        def format_mb(value):
+            return f'{value / 2 ** 20:12.1f}' if value is not None else f"{'-':>12}"
+
+        stats = self.get_task_stats()
+        header = f"{'Task':<32} {'Cache':>8} {'Wall (s)':>12} " + ' '.join(f'{p:>12}' for p in PHASES)
+        header += f" {'Download MB':>12} {'Upload MB':>12} {'Peak RSS MB':>12} {'Tensors MB':>12}"
+        lines = [header]
+        for task, s in stats.items():
+            phases = ' '.join(f"{s['phases'].get(p, 0.0):12.3f}" for p in PHASES)
+            lines.append(f"{task:<32.32} {s.get('cache', '-'):>8} {s['wall_time']:12.3f} {phases} {format_mb(s['bytes'].get('downloaded', 0))} "
+                         f"{format_mb(s['bytes'].get('uploaded', 0))} {format_mb(s.get('peak_rss'))} {format_mb(s.get('output_tensor_bytes'))}")
+        return '\n'.join(lines)
+
+    def _get_stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _get_task_stats(self, task):
+        if task not in self._task_stats:
+            self._task_stats[task] = {'wall_time': 0.0, 'phases': {}, 'bytes': {}}
+        return self._task_stats[task]
+
+
+def get_active_profiler() -> typing.Optional[Profiler]:
+    return _active_profiler
+
+
+def span(name: str, category: typing.Optional[str] = None, **args):
+    """Record a span in the active profiler. See Profiler.span()."""
+    profiler = _active_profiler
+    return profiler.span(name, category, **args) if profiler else contextlib.nullcontext()
+
+
+def task(name: str):
+    """Record a task in the active profiler. See Profiler.task()."""
+    profiler = _active_profiler
+    return profiler.task(name) if profiler else contextlib.nullcontext()
+
+
+def add_bytes(kind: str, nbytes: int):
+    profiler = _active_profiler
+    if profiler:
+        profiler.add_bytes(kind, nbytes)
+
+
+def set_task_info(task: typing.Optional[str] = None, **kwargs):
+    profiler = _active_profiler
+    if profiler:
+        profiler.set_task_info(task, **kwargs)
+
+
+def bind_task(func):
+    profiler = _active_profiler
+    return profiler.bind_task(func) if profiler else func
+
+
+def record_outputs(outputs):
+    """Record the total size of the CPU tensors in the task outputs as 'output_tensor_bytes'.
+
+    torch doesn't provide statistics for its CPU allocator, so this is used together with the peak RSS to see the memory held by each task.
+    """
+    profiler = _active_profiler
+    if profiler:
+        profiler.set_task_info(output_tensor_bytes=get_tensor_bytes(outputs))
+
+
+def get_tensor_bytes(value) -> int:
+    """Returns the total size of the CPU tensors in a dataclass, dict, list or tuple. Tensors that share the same storage are counted once."""
+    torch = sys.modules.get('torch')
+    if not torch:
+        return 0
+
+    storages = {}
+    visited = set()
+
+    def visit(v):
+        if isinstance(v, torch.Tensor):
+            if v.device.type == 'cpu' and v.layout == torch.strided:
+                storage = v.untyped_storage()
+                storages[storage.data_ptr()] = storage.nbytes()
+        elif id(v) not in visited:
+            if isinstance(v, (dict, list, tuple)) or (dataclasses.is_dataclass(v) and not isinstance(v, type)):
+                visited.add(id(v))
+                children = v.values() if isinstance(v, dict) else (getattr(v, f.name) for f in dataclasses.fields(v)) if dataclasses.is_dataclass(v) else v
+                for c in children:
+                    visit(c)
+
+    visit(value)
+    return sum(storages.values())
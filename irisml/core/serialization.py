@@ -0,0 +1,147 @@
+"""Serialization formats for cached outputs.
+
+pickle: The default format for any objects.
+tensors: For a torch.Tensor or a dict of torch.Tensor such as a state_dict. The raw tensor buffers are stored after a small header so that they can be
+         loaded without a copy from a memory-mapped file.
+
+The layout of the tensors format is:
+    b'IRISTNS1' | header size (8 bytes, little endian) | header (JSON) | padding | tensor buffers (each aligned to 64 bytes)
+
+    header = {"container": "tensor" | "dict" | "ordered_dict", "tensors": [{"key": <dict key or null>, "dtype": <e.g. "float32">, "shape": [...], "offset": <int>, "nbytes": <int>}]}
+"""
+import collections
+import json
+import pickle
+import struct
+import sys
+import typing
+
+FORMAT_PICKLE = 'pickle'
+FORMAT_TENSORS = 'tensors'
+
+_MAGIC = b'IRISTNS1'
+_ALIGNMENT = 64
+
+
+def select_format(value, tensors_min_size: int = 0) -> str:
+    """Select the serialization format for the value.
+
+    The tensors format is used if the value is a tensor or a dict of tensors with string keys, and its total size is at least tensors_min_size bytes.
+    """
+    tensors = _get_tensors(value)
+    if tensors is not None and sum(t.nelement() * t.element_size() for t in tensors.values()) >= tensors_min_size:
+        return FORMAT_TENSORS
+    return FORMAT_PICKLE
+
+
+def serialize(value, format_name: str):
+    """Serialize the value. Returns a bytes-like object."""
+    if format_name == FORMAT_PICKLE:
+        return pickle.dumps(value)
+    elif format_name == FORMAT_TENSORS:
+        return _serialize_tensors(value)
+    raise ValueError(f"Unknown serialization format: {format_name}")
+
+
+def deserialize(buffer, format_name: str):
+    """Deserialize the value from a buffer. For the tensors format, the returned tensors share the memory with the buffer."""
+    if format_name == FORMAT_PICKLE:
+        return pickle.loads(buffer)
+    elif format_name == FORMAT_TENSORS:
+        return _deserialize_tensors(buffer)
+    raise ValueError(f"Unknown serialization format: {format_name}")
+
+
+def _is_supported_tensor(value):
+    # Subclasses such as nn.Parameter and tensors that require grad are not supported since they cannot be restored from a buffer.
+    # If torch hasn't been imported, the value cannot be a tensor. torch is not imported by this module since it takes seconds.
+    torch = sys.modules.get('torch')
+    return torch is not None and type(value) is torch.Tensor and value.layout == torch.strided and not value.is_quantized and not value.requires_grad and value.device.type == 'cpu'
+
+
+def _get_tensors(value) -> typing.Optional[typing.Dict]:
+    """Returns a dict of tensors if the value can be serialized in the tensors format. Otherwise returns None."""
+    if _is_supported_tensor(value):
+        return {None: value}
+    if type(value) in (dict, collections.OrderedDict) and value and all(isinstance(k, str) and _is_supported_tensor(v) for k, v in value.items()):
+        return value
+    return None
+
+
+def _align(offset):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def write_tensors(value, file) -> int:
+    """Write the value to a binary file in the tensors format without building the serialized bytes in memory. Returns the number of bytes written.
+
+    The value must be supported by the tensors format. See select_format().
+    """
+    header, entries, size = _get_tensors_layout(value)
+    position = file.write(header)
+    for e, data in _iter_tensor_buffers(value, entries):
+        position += file.write(bytes(e['offset'] - position))
+        position += file.write(data)
+    position += file.write(bytes(size - position))
+    return position
+
+
+def _get_tensors_layout(value):
+    """Returns (the bytes before the padding, i.e. the magic, the header size and the header, the header entries, the total size)."""
+    tensors = _get_tensors(value)
+    assert tensors is not None
+    container = 'tensor' if _is_supported_tensor(value) else ('ordered_dict' if isinstance(value, collections.OrderedDict) else 'dict')
+
+    entries = [{'key': k, 'dtype': str(t.dtype).split('.')[1], 'shape': list(t.shape), 'nbytes': t.nelement() * t.element_size()} for k, t in tensors.items()]
+
+    # The header size depends on the offsets. Reserve enough space for the offsets first.
+    header_size = len(json.dumps({'container': container, 'tensors': [{**e, 'offset': 2 ** 63} for e in entries]}).encode('utf-8'))
+    offset = _align(len(_MAGIC) + 8 + header_size)
+    for e in entries:
+        e['offset'] = offset
+        offset = _align(offset + e['nbytes'])
+
+    header = json.dumps({'container': container, 'tensors': entries}).encode('utf-8')
+    return _MAGIC + struct.pack('<Q', len(header)) + header, entries, offset
+
+
+def _iter_tensor_buffers(value, entries):
+    """Yields (entry, memoryview of the tensor data) for the non-empty tensors."""
+    import torch
+    for e, t in zip(entries, _get_tensors(value).values()):
+        if e['nbytes']:
+            yield e, memoryview(t.contiguous().reshape(-1).view(torch.uint8).numpy())
+
+
+def _serialize_tensors(value):
+    header, entries, size = _get_tensors_layout(value)
+    buffer = bytearray(size)
+    buffer[:len(header)] = header
+    view = memoryview(buffer)
+    for e, data in _iter_tensor_buffers(value, entries):
+        view[e['offset']:e['offset'] + e['nbytes']] = data
+    return buffer
+
+
+def _deserialize_tensors(buffer):
+    import torch
+    view = memoryview(buffer)
+    if bytes(view[:len(_MAGIC)]) != _MAGIC:
+        raise ValueError("The buffer is not in the tensors format.")
+    header_size = struct.unpack('<Q', view[len(_MAGIC):len(_MAGIC) + 8])[0]
+    header = json.loads(bytes(view[len(_MAGIC) + 8:len(_MAGIC) + 8 + header_size]))
+
+    tensors = []
+    for e in header['tensors']:
+        dtype = getattr(torch, e['dtype'])
+        if e['nbytes']:
+            tensor = torch.frombuffer(buffer, dtype=torch.uint8, count=e['nbytes'], offset=e['offset']).view(dtype).reshape(e['shape'])
+        else:
+            tensor = torch.empty(e['shape'], dtype=dtype)
+        tensors.append((e['key'], tensor))
+
+    if header['container'] == 'tensor':
+        return tensors[0][1]
+    elif header['container'] == 'ordered_dict':
+        return collections.OrderedDict(tensors)
+    return dict(tensors)
@@ -0,0 +1,135 @@
+"""Transfer large tensors and numpy arrays between processes through memory-mapped files.
+
+Objects are pickled as usual, except that tensors and numpy arrays larger than min_size are written to files in the tensors format (see
+irisml.core.serialization), and only their paths go through the pipe. The receiver maps the file into memory with copy-on-write, so the loaded tensors are
+ordinary writable tensors that don't copy the data until they are modified. The file is deleted as soon as it's mapped.
+
+The files are placed in /dev/shm if it's available, so that the data never touches the disk. If a file cannot be written, e.g. /dev/shm is full, the
+object is pickled as usual.
+"""
+import concurrent.futures
+import io
+import logging
+import mmap
+import multiprocessing
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import uuid
+import warnings
+from . import serialization
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_SIZE = 1024 * 1024
+
+
+def get_default_directory():
+    return '/dev/shm' if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK) else tempfile.gettempdir()
+
+
+class _SharedMemoryPickler(pickle.Pickler):
+    def __init__(self, file, directory, min_size):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._directory = directory
+        self._min_size = min_size
+
+    def reducer_override(self, obj):
+        tensor, kind = self._get_tensor(obj)
+        if tensor is None or serialization.select_format(tensor, self._min_size) != serialization.FORMAT_TENSORS:
+            return NotImplemented
+
+        filepath = os.path.join(self._directory, uuid.uuid4().hex + '.tensor')
+        try:
+            with open(filepath, 'wb') as f:
+                # The tensor data is written straight from the tensor, without a serialized copy in memory.
+                serialization.write_tensors(tensor, f)
+        except OSError as e:
+            logger.debug(f"Failed to write a shared tensor to {filepath}: {e}. Pickling it instead.")
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            return NotImplemented
+        return _load_shared, (filepath, kind)
+
+    @staticmethod
+    def _get_tensor(obj):
+        """Returns (tensor, kind) if the object is a tensor or a numpy array that can be stored in the tensors format. Otherwise returns (None, None)."""
+        torch = sys.modules.get('torch')
+        if torch is None:
+            return None, None
+        if type(obj) is torch.Tensor:
+            return obj, 'tensor'
+        numpy = sys.modules.get('numpy')
+        if numpy is not None and type(obj) is numpy.ndarray:
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')  # torch warns about read-only arrays. The tensor is only read.
+                    return torch.from_numpy(obj), 'ndarray'
+            except TypeError:  # Unsupported dtypes such as object.
+                return None, None
+        return None, None
+
+
+def _load_shared(filepath, kind):
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            buffer = bytearray()
+        else:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    # The mapping stays valid after the file is removed.
+    os.remove(filepath)
+    tensor = serialization.deserialize(buffer, serialization.FORMAT_TENSORS)
+    return tensor.numpy() if kind == 'ndarray' else tensor
+
+
+def dumps(value, directory: str, min_size: int = DEFAULT_MIN_SIZE) -> bytes:
+    """Pickle the value. Tensors and numpy arrays larger than min_size bytes are written to files in the directory.
+
+    The returned bytes must be loaded exactly once with loads(), which removes the files.
+    """
+    f = io.BytesIO()
+    _SharedMemoryPickler(f, directory, min_size).dump(value)
+    return f.getvalue()
+
+
+def loads(data: bytes):
+    return pickle.loads(data)
+
+
+def _run_in_worker(payload, directory, min_size):
+    func, args = loads(payload)
+    return dumps(func(*args), directory, min_size)
+
+
+class ProcessPool:
+    """A pool of worker processes that exchanges large tensors and numpy arrays through memory-mapped files.
+
+    The worker processes are started with 'spawn' since forking a process with running threads is not safe. They are reused until shutdown().
+
+    Args:
+        num_workers (int): The number of worker processes.
+        directory (str): The directory for the transferred files. If None, /dev/shm or the temporary directory is used.
+        min_size (int): Tensors and arrays smaller than this size in bytes are pickled through the pipe.
+    """
+    def __init__(self, num_workers: int, directory: str = None, min_size: int = DEFAULT_MIN_SIZE):
+        self._executor = concurrent.futures.ProcessPoolExecutor(num_workers, mp_context=multiprocessing.get_context('spawn'))
+        self._directory = tempfile.mkdtemp(prefix='irisml-', dir=directory or get_default_directory())
+        self._min_size = min_size
+
+    def run(self, func, *args):
+        """Run func(*args) in a worker process and return the result. func and args must be picklable."""
+        payload = dumps((func, args), self._directory, self._min_size)
+        return loads(self._executor.submit(_run_in_worker, payload, self._directory, self._min_size).result())
+
+    def shutdown(self):
+        self._executor.shutdown()
+        # Removes the files that were not loaded due to errors. The loaded tensors are not affected.
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
@@ -0,0 +1,140 @@
+"""Run a job with many sets of environment variables in one process, running the tasks that the variants share only once.
+
+All the variants have the same tasks, so they are run in lockstep. At each step, the task of every variant is hashed in its own context, and the variants
+are grouped by (task name, VERSION, task hash), which is the cache key of the task. The task runs once for each group, and its outputs are added to the
+contexts of all the variants in the group without copying. The groups of a step run concurrently.
+
+Tasks with CACHE_ENABLED=False run for each variant, since their outputs might depend on something other than the config and inputs.
+"""
+import concurrent.futures
+import itertools
+import logging
+import typing
+from irisml.core import JobDescription
+from . import compression
+from .cache_manager import create_storage_manager, CacheManager
+from .context import CachedOutputsHolders, Context
+from .hash_generator import HashGenerator
+from .job import Job
+from .task_index import TaskIndex
+
+logger = logging.getLogger(__name__)
+
+
+def make_env_sets(base_env_vars: typing.Dict[str, str], grid: typing.Dict[str, typing.List[str]] = None,
+                  env_sets: typing.Optional[typing.List[typing.Dict[str, str]]] = None) -> typing.List[typing.Dict[str, str]]:
+    """Returns the environment variables of the variants.
+
+    Each env set is combined with every combination of the grid values. The values override base_env_vars, and the grid values override the env sets.
+
+    Args:
+        base_env_vars (Dict[str, str]): The environment variables common to all the variants.
+        grid (Dict[str, List[str]]): {name: candidate values}.
+        env_sets (List[Dict[str, str]]): Explicit list of environment variables. If not provided, only the grid is used.
+    """
+    grid = grid or {}
+    names = list(grid)
+    return [{**base_env_vars, **env_set, **dict(zip(names, values))} for env_set in (env_sets or [{}]) for values in itertools.product(*(grid[n] for n in names))]
+
+
+class SweepRunner:
+    """Run a job for each set of environment variables.
+
+    Args:
+        job_dict (Dict): The job description.
+        env_sets (List[Dict[str, str]]): Environment variables of each variant. See make_env_sets().
+        cache_storage_url (str): URL for the cache storage. If not provided, the cache is disabled.
+        num_workers (int): The number of tasks that can run at the same time.
+        hash_version (int): The version of HashGenerator. If not provided, the default version is used.
+        cache_compression (str): The compression codec for the cache. See irisml.core.compression.
+        release_outputs (bool): If True, the outputs are released from each variant when all the tasks that refer to them are completed. See JobRunner.
+    """
+    def __init__(self, job_dict: typing.Dict, env_sets: typing.List[typing.Dict[str, str]], cache_storage_url: str = None, num_workers: int = 1,
+                 hash_version: typing.Optional[int] = None, cache_compression: typing.Optional[str] = None, release_outputs: bool = True):
+        if not env_sets:
+            raise ValueError("At least one set of environment variables is required.")
+        self._job_dict = job_dict
+        self._env_sets = env_sets
+        self._cache_storage_url = cache_storage_url
+        self._num_workers = num_workers
+        self._cache_compression = compression.parse_compression(cache_compression) if cache_compression else (None, None)
+        self._release_outputs = release_outputs
+        if hash_version:
+            HashGenerator.set_hash_version(hash_version)
+
+    def run(self) -> typing.List[typing.Optional[Context]]:
+        """Run all the variants. A failed variant doesn't stop the others.
+
+        Returns:
+            The context of each variant. None for the variants that failed.
+        """
+        # Each variant has its own Task instances since a task can run for multiple groups at the same time.
+        jobs = [Job(JobDescription.from_dict(self._job_dict)) for _ in self._env_sets]
+        jobs[0].validate(TaskIndex())
+        task_lists = [list(j.tasks) for j in jobs]
+
+        cache_manager = None
+        if self._cache_storage_url:
+            codec, codec_level = self._cache_compression
+            cache_manager = CacheManager(create_storage_manager(self._cache_storage_url), background_upload=True, compression_codec=codec, compression_level=codec_level)
+            logger.info(f"Cache is enabled: {self._cache_storage_url}")
+
+        consumers = jobs[0].get_consumers() if self._release_outputs else None
+        # The variants share the outputs, so a field is released when all the variants are done with it.
+        holders = CachedOutputsHolders()
+        contexts = [Context(env_vars, cache_manager, None, consumers, cached_outputs_holders=holders) for env_vars in self._env_sets]
+        failed = {}  # variant index => error
+        num_runs = 0
+
+        logger.info(f"Running {len(self._env_sets)} variants.")
+        try:
+            with concurrent.futures.ThreadPoolExecutor(self._num_workers, thread_name_prefix='irisml') as executor:
+                for step in range(len(task_lists[0])):
+                    groups = self._group_variants(step, task_lists, contexts, failed)
+                    futures = {executor.submit(self._run_group, step, variants, task_lists, contexts): variants for variants in groups}
+                    num_runs += len(futures)
+                    for future in concurrent.futures.as_completed(futures):
+                        try:
+                            future.result()
+                        except Exception as e:
+                            task = task_lists[futures[future][0]][step]
+                            logger.exception(f"Failed to run a task {task} for variants {futures[future]}: {e}")
+                            failed.update((v, e) for v in futures[future])
+        finally:
+            if cache_manager:
+                logger.debug("Waiting for the cache uploads.")
+                for paths, e in cache_manager.flush():
+                    logger.error(f"Failed to save cache {'/'.join(paths)}: {e}")
+
+        logger.info(f"Completed. Ran {num_runs} tasks for {len(task_lists[0]) * len(self._env_sets)} tasks in the variants. {len(failed)} variants failed.")
+        return [None if i in failed else c for i, c in enumerate(contexts)]
+
+    @staticmethod
+    def _group_variants(step, task_lists, contexts, failed):
+        """Returns a list of variant indices that share the task at the step."""
+        groups = {}
+        # The outputs shared by the variants are hashed only once.
+        with HashGenerator.memoize():
+            for v, tasks in enumerate(task_lists):
+                if v in failed:
+                    continue
+                task = tasks[step]
+                task_class = task.task_class
+                try:
+                    key = (task.task_name, task_class.VERSION, task.calculate_hash(contexts[v])) if task_class.CACHE_ENABLED else v
+                except Exception as e:
+                    logger.exception(f"Failed to calculate the hash of {task} for variant {v}: {e}")
+                    failed[v] = e
+                    continue
+                groups.setdefault(key, []).append(v)
+        return list(groups.values())
+
+    @staticmethod
+    def _run_group(step, variants, task_lists, contexts):
+        leader = variants[0]
+        task = task_lists[leader][step]
+        if len(variants) > 1:
+            logger.info(f"[{task.name}]: Shared by {len(variants)} variants.")
+        outputs = task.execute(contexts[leader])
+        for v in variants[1:]:
+            contexts[v].add_outputs(task.name, outputs)
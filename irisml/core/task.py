@@ -1,20 +1,27 @@
 import dataclasses
+import hashlib
 import importlib
+import json
 import logging
 import random
 import typing
-import torch
 from irisml.core import TaskDescription
+from . import profiler
 from .hash_generator import HashGenerator
 from .task_base import TaskBase
-from .variable import replace_variables, Variable
+from .context import Context
+from .variable import find_variables, replace_variables, OutputVariable, Variable
 
 
 logger = logging.getLogger(__name__)
 
 
 class Task:
-    """Represents a task. It doesn't require actual task modules until load_module() is called."""
+    """Represents a task. It doesn't require actual task modules until load_module() is called.
+
+    The task can be validated with the metadata in a TaskIndex without importing the module. See validate_with_index(). The module is loaded when the task
+    is executed if load_module() hasn't been called.
+    """
     def __init__(self, description: TaskDescription):
         assert description.task.islower()
 
@@ -36,38 +43,129 @@ class Task:
     def task_name(self):
         return self._task_name
 
-    def execute(self, context, dry_run=False):
+    @property
+    def task_class(self):
+        """The Task class in the task module. The module is loaded if it hasn't been."""
+        if not self._task_class:
+            self.load_module()
+        return self._task_class
+
+    def get_dependencies(self):
+        """Returns a set of task names whose outputs are referenced by this task's inputs or config."""
+        return {output_name for output_name, _ in self.get_consumed_fields()}
+
+    def get_signature(self, output_signatures: typing.Dict[str, str]) -> str:
+        """Returns a string that is the same for the tasks with the same task module, config and inputs. The task module is not loaded.
+
+        Args:
+            output_signatures (Dict[str, str]): {task name: signature} of the previous tasks. The outputs of those tasks are represented by the signatures
+                instead of the task names, so that the tasks that consume identical outputs have the same signature.
+        """
+        def convert(value):
+            if isinstance(value, dict):
+                return {k: convert(v) for k, v in value.items()}
+            elif isinstance(value, list):
+                return [convert(v) for v in value]
+            elif isinstance(value, OutputVariable):
+                return ['$output', output_signatures.get(value.output_name, value.output_name), value.field_name]
+            elif isinstance(value, Variable):
+                return str(value)
+            return value
+
+        data = json.dumps([self._task_name, convert(self._config_dict), convert(self._inputs_dict)], sort_keys=True, default=repr)
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def get_consumed_fields(self):
+        """Returns a set of (task name, field name) for the output fields referenced by this task's inputs or config."""
+        variables = find_variables([self._inputs_dict, self._config_dict], OutputVariable)
+        return {(v.output_name, v.field_name) for v in variables}
+
+    def execute(self, context, dry_run=False, process_pool=None):
+        """Run the task and add its outputs to the context.
+
+        Args:
+            context (Context): The context of the job.
+            dry_run (bool): If True, call dry_run() instead.
+            process_pool (ProcessPool): If provided, the task module is executed in this process pool. Otherwise, it runs in the current thread.
+                See irisml.core.shared_memory.
+        """
         if dry_run:
             return self.dry_run(context)
 
         if not self._task_class:
-            raise RuntimeError("load_module() must be called before executing the task.")
+            self.load_module()
 
         config = self._load_config(self._task_class.Config, self._config_dict)
         inputs = self._load_inputs(self._task_class.Inputs, self._inputs_dict)
 
-        task_hash = HashGenerator.calculate_hash([config, inputs], context)
-        if self._task_class.CACHE_ENABLED:
-            cached_outputs = context.get_cached_outputs(self._task_name, self._task_class.VERSION, task_hash, self._task_class.Outputs)
-            if cached_outputs:
-                logger.info(f"[{self._task_name}]: Found cached outputs. Skipping the task.")
-                context.add_outputs(self.name, cached_outputs)
-                return cached_outputs
+        # The config and inputs are hashed several times below. The objects are not modified until the task starts.
+        with HashGenerator.memoize():
+            with profiler.span('hash'):
+                task_hash = self._calculate_hash(config, inputs, context)
 
-        logger.info(f"[{self._task_name}]: Running the task.")
-        resolved_config = context.resolve(config)
-        resolved_inputs = context.resolve(inputs)
+        if not self._task_class.CACHE_ENABLED:
+            return self._execute(context, config, inputs, task_hash, process_pool)
 
-        if self._task_class.CACHE_ENABLED:
-            if HashGenerator.calculate_hash(config, context) != HashGenerator.calculate_hash(resolved_config):
-                logger.error("Resolved config has different hash.")
-            if HashGenerator.calculate_hash(inputs, context) != HashGenerator.calculate_hash(resolved_inputs):
-                logger.error("Resolved inputs has different hash.")
+        # If an identical task has run in the job, its outputs are reused. Otherwise, the later identical tasks wait for this one.
+        identical_task = context.find_identical_task(self.name, self._task_name, self._task_class.VERSION, task_hash)
+        if identical_task:
+            identical_name, future = identical_task
+            logger.info(f"[{self._task_name}]: {self.name} is identical to {identical_name}. Reusing its outputs.")
+            profiler.set_task_info(cache='identical')
+            outputs = future.result()
+            context.add_outputs(self.name, outputs)
+            return outputs
+
+        try:
+            outputs = self._execute(context, config, inputs, task_hash, process_pool)
+        except BaseException as e:
+            context.complete_identical_task(self.name, exception=e)
+            raise
+        context.complete_identical_task(self.name, outputs)
+        return outputs
+
+    def _execute(self, context, config, inputs, task_hash, process_pool):
+        with HashGenerator.memoize():
+            journaled_outputs = context.get_journaled_outputs(self.name, self._task_name, self._task_class.VERSION, task_hash, self._task_class.Outputs)
+            if journaled_outputs:
+                logger.info(f"[{self._task_name}]: Found outputs in the run journal. Skipping the task.")
+                profiler.set_task_info(cache='journal')
+                context.add_outputs(self.name, journaled_outputs)
+                return journaled_outputs
+
+            if self._task_class.CACHE_ENABLED:
+                with profiler.span('cache_lookup'):
+                    cached_outputs = context.get_cached_outputs(self._task_name, self._task_class.VERSION, task_hash, self._task_class.Outputs)
+                if cached_outputs:
+                    logger.info(f"[{self._task_name}]: Found cached outputs. Skipping the task.")
+                    profiler.set_task_info(cache='hit')
+                    context.add_outputs(self.name, cached_outputs)
+                    context.add_journal_outputs(self.name, self._task_name, self._task_class.VERSION, task_hash, cached_outputs)
+                    return cached_outputs
+            profiler.set_task_info(cache='miss' if self._task_class.CACHE_ENABLED and context.cache_enabled else 'disabled')
+
+            logger.info(f"[{self._task_name}]: Running the task.")
+            with profiler.span('resolve'):
+                resolved_config = context.resolve(config)
+                resolved_inputs = context.resolve(inputs)
+
+            if self._task_class.CACHE_ENABLED:
+                with profiler.span('hash', verify=True):
+                    if HashGenerator.calculate_hash(config, context) != HashGenerator.calculate_hash(resolved_config):
+                        logger.error("Resolved config has different hash.")
+                    if HashGenerator.calculate_hash(inputs, context) != HashGenerator.calculate_hash(resolved_inputs):
+                        logger.error("Resolved inputs has different hash.")
+
+        with profiler.span('execute'):
+            if process_pool:
+                logger.debug(f"Instantiating the task module in a worker process. config={resolved_config}")
+                outputs = process_pool.run(_execute_in_process, self._task_class, resolved_config, resolved_inputs, context.get_environment_variables())
+            else:
+                self._reset_random_seed()
+                logger.debug(f"Instantiating the task module. config={resolved_config}")
+                task = self._task_class(resolved_config, context)
+                outputs = task.execute(resolved_inputs)
 
-        self._reset_random_seed()
-        logger.debug(f"Instantiating the task module. config={resolved_config}")
-        task = self._task_class(resolved_config, context)
-        outputs = task.execute(resolved_inputs)
         if outputs is None:
             logger.warning(f"{self} returned None output.")
             outputs = self._task_class.Outputs()
@@ -75,15 +173,28 @@ class Task:
         if not isinstance(outputs, self._task_class.Outputs):
             raise RuntimeError(f"Task {self._task_name} returned invalid outputs: {outputs}")
 
+        profiler.record_outputs(outputs)
         context.add_outputs(self.name, outputs)
         if self._task_class.CACHE_ENABLED:
-            context.add_cache_outputs(self._task_name, self._task_class.VERSION, task_hash, outputs)
+            context.add_cache_outputs(self._task_name, self._task_class.VERSION, task_hash, outputs, self.name)
+        context.add_journal_outputs(self.name, self._task_name, self._task_class.VERSION, task_hash, outputs)
         return outputs
 
+    def calculate_hash(self, context) -> str:
+        """Returns the hash of the config and inputs, which is the cache key of the task outputs. The outputs that the task refers to must be in the context."""
+        task_class = self.task_class
+        config = self._load_config(task_class.Config, self._config_dict)
+        inputs = self._load_inputs(task_class.Inputs, self._inputs_dict)
+        return self._calculate_hash(config, inputs, context)
+
+    @staticmethod
+    def _calculate_hash(config, inputs, context):
+        return HashGenerator.calculate_hash([config, inputs], context)
+
     def dry_run(self, context):
         """Dry run the task. Task can define its own dry_run() method."""
         if not self._task_class:
-            raise RuntimeError("load_module() must be called before executing the task.")
+            self.load_module()
 
         config = self._load_config(self._task_class.Config, self._config_dict)
         inputs = self._load_inputs(self._task_class.Inputs, self._inputs_dict)
@@ -117,26 +228,45 @@ class Task:
         self._load_config(task_class.Config, self._config_dict)
         self.validate()
 
+    def validate_with_index(self, task_index):
+        """Validate the task and its config with the metadata in the TaskIndex, without importing the task module.
+
+        The index might be out of date if a file it doesn't track has changed. If the validation fails, the task module is imported to refresh the
+        index and the task is validated again.
+        """
+        try:
+            self._validate_with_metadata(task_index.get(self.task_name))
+        except (RuntimeError, TypeError, ValueError) as e:
+            logger.debug(f"Validation of {self.name} with the task index failed: {e}. Refreshing the index.")
+            self._validate_with_metadata(task_index.get(self.task_name, refresh=True))
+
+    def _validate_with_metadata(self, metadata):
+        task_class = metadata.create_task_class()
+        self._load_config(task_class.Config, self._config_dict)
+        self._validate_task_class(task_class)
+
     def validate(self):
         """Check if the task satisfies the rules."""
         if not self._task_class:
             raise RuntimeError("load_module() must be called first.")
+        self._validate_task_class(self._task_class)
 
-        if self._task_class.VERSION == '0.0.0':
+    def _validate_task_class(self, task_class):
+        if task_class.VERSION == '0.0.0':
             logger.warning(f"Task {self._task_name} is version 0.0.0. Please define VERSION attribute in the Task class..")
 
-        if not dataclasses.is_dataclass(self._task_class.Config):
-            raise RuntimeError(f"Config class must be a dataclass. Actual: {type(self._task_class.Config)}")
-        if not dataclasses.is_dataclass(self._task_class.Inputs):
-            raise RuntimeError(f"Inputs class must be a dataclass. Actual: {type(self._task_class.Inputs)}")
-        if not dataclasses.is_dataclass(self._task_class.Outputs):
-            raise RuntimeError(f"Outputs class must be a dataclass. Actual: {type(self._task_class.Outputs)}")
+        if not dataclasses.is_dataclass(task_class.Config):
+            raise RuntimeError(f"Config class must be a dataclass. Actual: {type(task_class.Config)}")
+        if not dataclasses.is_dataclass(task_class.Inputs):
+            raise RuntimeError(f"Inputs class must be a dataclass. Actual: {type(task_class.Inputs)}")
+        if not dataclasses.is_dataclass(task_class.Outputs):
+            raise RuntimeError(f"Outputs class must be a dataclass. Actual: {type(task_class.Outputs)}")
 
-        for f in dataclasses.fields(self._task_class.Inputs):
+        for f in dataclasses.fields(task_class.Inputs):
             if dataclasses.is_dataclass(f.type):
                 raise RuntimeError(f"Nested input dataclass is not allowed: {f.name}")
 
-        for f in dataclasses.fields(self._task_class.Outputs):
+        for f in dataclasses.fields(task_class.Outputs):
             if f.default == dataclasses.MISSING and f.default_factory == dataclasses.MISSING:
                 raise RuntimeError(f"All output fields must have a default value or a default factory: {f.name}")
             if dataclasses.is_dataclass(f.type):
@@ -192,13 +322,35 @@ class Task:
                 c[field.name] = inputs_dict[field.name]
         return inputs_class(**c)
 
-    def _reset_random_seed(self):
+    @staticmethod
+    def _reset_random_seed():
         """Reset the random seed.
 
         To make sure the tasks are deterministic, we reset the random seed every time a task starts.
         """
+        import torch  # Imported here since torch takes seconds to import. Most task modules have already imported it.
         torch.manual_seed(42)
         random.seed(42)
 
     def __str__(self):
         return f"Task {self.task_name} (name: {self.name})"
+
+
+class _WorkerContext(Context):
+    """Context for a task in a worker process. It has only the environment variables since outputs of other tasks are not available in the worker process."""
+    def _get_entry(self, output_name):
+        # The outputs added by nested tasks in the worker process are available.
+        if output_name not in self._outputs:
+            raise RuntimeError(f"Output {output_name} is not available to a task in a worker process. Refer to it with a $output variable in the task inputs, "
+                               "or run the job with --executor thread.")
+        return super()._get_entry(output_name)
+
+
+def _execute_in_process(task_class, resolved_config, resolved_inputs, env_vars):
+    """Run a task module in a worker process.
+
+    The task gets a new Context that has only the environment variables. Reading other outputs through the context raises a RuntimeError.
+    """
+    Task._reset_random_seed()
+    task = task_class(resolved_config, _WorkerContext(env_vars))
+    return task.execute(resolved_inputs)
@@ -0,0 +1,283 @@
+"""Index of task metadata, so that jobs can be validated without importing the task modules.
+
+Task modules often import heavy packages such as torchvision. The index keeps the metadata of each task module: VERSION, CACHE_ENABLED, the docstring
+and the schemas of the Config, Inputs and Outputs dataclasses. An entry is built by importing the module the first time it is requested, and it is
+rebuilt when the modification time or the size of one of its files changes. The files are the module file, every Python file in the directory of a
+package task, and the files of the modules that define the dataclasses and enums in the schemas. Changes in other files that the module imports are not
+detected, so a job that fails the validation with the index is validated again after importing the task module.
+
+The index is stored at $IRISML_TASK_INDEX, or ~/.cache/irisml/task_index.json by default. If IRISML_TASK_INDEX is set to an empty string, the index is
+kept only in memory.
+
+Types in the schemas are stored as JSON. Builtin scalar types, pathlib.Path, enums, dataclasses, List, Dict and Optional are restored as they are.
+Other types are restored as a stand-in that accepts any value, so config values of those types are checked only when the task runs.
+"""
+import dataclasses
+import enum
+import importlib
+import importlib.util
+import inspect
+import json
+import logging
+import os
+import pathlib
+import sys
+import typing
+import uuid
+from .task_base import TaskBase
+
+logger = logging.getLogger(__name__)
+
+_SCALAR_TYPES = {t.__name__: t for t in (int, float, str, bool, bytes, type(None))}
+_SCALAR_TYPES['Path'] = pathlib.Path
+
+
+class _UnknownType:
+    """Stands for a type that cannot be stored in the index. Any value is accepted."""
+    def __new__(cls, value):
+        return value
+
+
+def _type_to_spec(type_class):
+    origin = typing.get_origin(type_class)
+    args = typing.get_args(type_class)
+    if dataclasses.is_dataclass(type_class):
+        return {'dataclass': _dataclass_to_schema(type_class)}
+    elif origin is list and len(args) == 1:
+        return {'list': _type_to_spec(args[0])}
+    elif origin is dict and len(args) == 2:
+        return {'dict': [_type_to_spec(args[0]), _type_to_spec(args[1])]}
+    elif origin is typing.Union:
+        return {'union': [_type_to_spec(a) for a in args]}
+    elif isinstance(type_class, type) and issubclass(type_class, enum.Enum):
+        return {'enum': type_class.__name__, 'values': {m.name: m.value for m in type_class}}
+    elif isinstance(type_class, type) and _SCALAR_TYPES.get(type_class.__name__) is type_class:
+        return {'type': type_class.__name__}
+    return {'unknown': str(type_class)}
+
+
+def _spec_to_type(spec):
+    if 'dataclass' in spec:
+        return _schema_to_dataclass(spec['dataclass'])
+    elif 'list' in spec:
+        return typing.List[_spec_to_type(spec['list'])]
+    elif 'dict' in spec:
+        return typing.Dict[_spec_to_type(spec['dict'][0]), _spec_to_type(spec['dict'][1])]
+    elif 'union' in spec:
+        args = tuple(_spec_to_type(s) for s in spec['union'])
+        return typing.Union[args]
+    elif 'enum' in spec:
+        return enum.Enum(spec['enum'], spec['values'])
+    elif 'type' in spec:
+        return _SCALAR_TYPES[spec['type']]
+    return _UnknownType
+
+
+def _dataclass_to_schema(data_class):
+    """Returns {'name': <class name>, 'fields': [{'name', 'type': <printable type>, 'spec': <type spec>, 'has_default': bool}]}."""
+    fields = [{'name': f.name, 'type': str(f.type), 'spec': _type_to_spec(f.type),
+               'has_default': f.default is not dataclasses.MISSING or f.default_factory is not dataclasses.MISSING} for f in dataclasses.fields(data_class)]
+    return {'name': data_class.__name__, 'fields': fields}
+
+
+def _schema_to_dataclass(schema):
+    fields = []
+    for f in schema['fields']:
+        field = dataclasses.field(default=None) if f['has_default'] else dataclasses.field()
+        fields.append((f['name'], _spec_to_type(f['spec']), field))
+
+    required_names = {f['name'] for f in schema['fields'] if not f['has_default']}
+    field_names = [f['name'] for f in schema['fields']]
+
+    def __init__(self, **kwargs):
+        # Only keyword arguments are supported. The generated __init__ is not used since a field without a default might follow the fields with defaults.
+        missing_names = required_names - set(kwargs)
+        if missing_names:
+            raise TypeError(f"{schema['name']}.__init__() missing required arguments: {sorted(missing_names)}")
+        unexpected_names = set(kwargs) - set(field_names)
+        if unexpected_names:
+            raise TypeError(f"{schema['name']}.__init__() got unexpected arguments: {sorted(unexpected_names)}")
+        for name in field_names:
+            setattr(self, name, kwargs.get(name))
+
+    return dataclasses.make_dataclass(schema['name'], fields, init=False, namespace={'__init__': __init__})
+
+
+@dataclasses.dataclass
+class TaskMetadata:
+    """Metadata of a task module.
+
+    The schemas are None if the class is not a dataclass. See _dataclass_to_schema() for the format.
+    """
+    task_name: str
+    version: str
+    cache_enabled: bool
+    doc: typing.Optional[str]
+    config: typing.Optional[typing.Dict]
+    inputs: typing.Optional[typing.Dict]
+    outputs: typing.Optional[typing.Dict]
+
+    @classmethod
+    def from_task_class(cls, task_name, task_class):
+        def to_schema(data_class):
+            return _dataclass_to_schema(data_class) if dataclasses.is_dataclass(data_class) else None
+
+        return cls(task_name, task_class.VERSION, task_class.CACHE_ENABLED, inspect.getdoc(task_class),
+                   to_schema(task_class.Config), to_schema(task_class.Inputs), to_schema(task_class.Outputs))
+
+    def get_fields(self, name) -> typing.List[typing.Tuple[str, str]]:
+        """Returns [(field name, printable type)] of 'config', 'inputs' or 'outputs'."""
+        schema = getattr(self, name)
+        return [(f['name'], f['type']) for f in schema['fields']] if schema else []
+
+    def create_task_class(self):
+        """Create a stand-in Task class that has the same attributes and dataclasses as the actual task. It can be validated, but not executed."""
+        def to_class(schema, name):
+            return _schema_to_dataclass(schema) if schema else type(name, (), {})
+
+        return type('Task', (TaskBase,), {'VERSION': self.version, 'CACHE_ENABLED': self.cache_enabled, '__doc__': self.doc,
+                                          'Config': to_class(self.config, 'Config'), 'Inputs': to_class(self.inputs, 'Inputs'),
+                                          'Outputs': to_class(self.outputs, 'Outputs')})
+
+
+class TaskIndex:
+    """Persisted index of TaskMetadata keyed by the task name. Each entry records the modification time and the size of the files it was built from.
+
+    Args:
+        index_filepath (pathlib.Path): The file to store the index. If None, $IRISML_TASK_INDEX or ~/.cache/irisml/task_index.json is used.
+            If it is an empty string, the index is not stored.
+    """
+    INDEX_VERSION = 2
+
+    def __init__(self, index_filepath: typing.Optional[typing.Union[str, pathlib.Path]] = None):
+        if index_filepath is None:
+            index_filepath = os.getenv('IRISML_TASK_INDEX', pathlib.Path.home() / '.cache' / 'irisml' / 'task_index.json')
+        self._index_filepath = pathlib.Path(index_filepath) if index_filepath else None
+        self._entries = self._load()
+
+    def get(self, task_name: str, import_module: bool = True, refresh: bool = False) -> typing.Optional[TaskMetadata]:
+        """Get the metadata of a task. The task module is imported only if the index doesn't have an up-to-date entry.
+
+        If the module has been imported already, the metadata is read from the module. If import_module is False, returns None instead of importing
+        the module. If refresh is True, the module is imported and the entry is rebuilt even if it looks up-to-date.
+
+        Raises:
+            RuntimeError: If the task module is not found or it doesn't have a valid Task class.
+        """
+        module_name = 'irisml.tasks.' + task_name
+        if module_name in sys.modules:
+            return TaskMetadata.from_task_class(task_name, self._get_task_class(task_name))
+
+        try:
+            spec = importlib.util.find_spec(module_name)
+        except ModuleNotFoundError:
+            spec = None
+        if not spec:
+            raise RuntimeError(f"Task not found: {module_name}")
+
+        module_files = self._get_module_files(spec)
+        entry = self._entries.get(task_name)
+        if not refresh and module_files and entry and self._is_up_to_date(entry['files'], module_files):
+            return TaskMetadata(**entry['metadata'])
+
+        if not import_module:
+            return None
+
+        logger.debug(f"Updating the task index for {task_name}")
+        task_class = self._get_task_class(task_name)
+        metadata = TaskMetadata.from_task_class(task_name, task_class)
+        if module_files:
+            filepaths = module_files + sorted(self._get_dataclass_files(task_class) - set(module_files))
+            files_info = [self._get_file_info(f) for f in filepaths]
+            if all(files_info):
+                self._entries[task_name] = {'files': files_info, 'metadata': dataclasses.asdict(metadata)}
+                self._save()
+        return metadata
+
+    @staticmethod
+    def _get_task_class(task_name):
+        try:
+            task_module = importlib.import_module('irisml.tasks.' + task_name)
+        except ModuleNotFoundError as e:
+            raise RuntimeError(f"Task not found: irisml.tasks.{task_name}") from e
+
+        task_class = getattr(task_module, 'Task', None)
+        if not isinstance(task_class, type) or not issubclass(task_class, TaskBase):
+            raise RuntimeError(f"Failed to load {task_name}. Please make sure the Task class inherits the TaskBase class.")
+        return task_class
+
+    @staticmethod
+    def _get_module_files(spec):
+        """Returns the absolute paths of the module file and, for a package, all the Python files in the package directory.
+
+        Returns an empty list if the module doesn't have a file.
+        """
+        if not spec.origin or not os.path.isfile(spec.origin):
+            return []
+        origin = os.path.abspath(spec.origin)
+        package_files = set()
+        for directory in spec.submodule_search_locations or []:
+            package_files.update(str(p.absolute()) for p in pathlib.Path(directory).rglob('*.py'))
+        return [origin] + sorted(package_files - {origin})
+
+    @staticmethod
+    def _get_dataclass_files(task_class):
+        """Returns the absolute paths of the modules that define the dataclasses and enums used by Config, Inputs and Outputs."""
+        filepaths = set()
+        visited = set()
+
+        def visit(type_class):
+            if isinstance(type_class, type) and (dataclasses.is_dataclass(type_class) or issubclass(type_class, enum.Enum)):
+                if type_class in visited:
+                    return
+                visited.add(type_class)
+                filepath = getattr(sys.modules.get(type_class.__module__), '__file__', None)
+                if filepath and os.path.isfile(filepath):
+                    filepaths.add(os.path.abspath(filepath))
+                if dataclasses.is_dataclass(type_class):
+                    for f in dataclasses.fields(type_class):
+                        visit(f.type)
+            for arg in typing.get_args(type_class):
+                visit(arg)
+
+        for data_class in (task_class.Config, task_class.Inputs, task_class.Outputs):
+            visit(data_class)
+        return filepaths
+
+    def _is_up_to_date(self, files_info, module_files):
+        """Returns True if none of the recorded files has changed and no file has been added to the package."""
+        if not set(module_files) <= {f['path'] for f in files_info}:
+            return False
+        return all(self._get_file_info(f['path']) == f for f in files_info)
+
+    @staticmethod
+    def _get_file_info(filepath):
+        """Returns {'path', 'mtime_ns', 'size'} of a file. Returns None if the file doesn't exist."""
+        if not filepath or not os.path.isfile(filepath):
+            return None
+        stat = os.stat(filepath)
+        return {'path': os.path.abspath(filepath), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+    def _load(self):
+        if not self._index_filepath or not self._index_filepath.exists():
+            return {}
+        try:
+            index = json.loads(self._index_filepath.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read the task index {self._index_filepath}: {e}. The index is rebuilt.")
+            return {}
+        return index['tasks'] if index.get('version') == self.INDEX_VERSION else {}
+
+    def _save(self):
+        if not self._index_filepath:
+            return
+        # Other processes might have updated the index. Their entries are kept unless this instance has a newer one.
+        entries = {**self._load(), **self._entries}
+        temp_filepath = self._index_filepath.with_name(f'{self._index_filepath.name}.{uuid.uuid4().hex}.tmp')
+        try:
+            self._index_filepath.parent.mkdir(parents=True, exist_ok=True)
+            temp_filepath.write_text(json.dumps({'version': self.INDEX_VERSION, 'tasks': entries}))
+            os.replace(temp_filepath, self._index_filepath)
+        except OSError as e:
+            logger.warning(f"Failed to save the task index {self._index_filepath}: {e}")
+            temp_filepath.unlink(missing_ok=True)
@@ -1,4 +1,4 @@
-from .cache_manager import CachedOutputs, HashGenerator
+from .hash_generator import HashGenerator
 
 
 def replace_variables(value):
@@ -18,6 +18,23 @@ def replace_variables(value):
         return value
 
 
+def find_variables(value, variable_class=None):
+    """Find all Variable instances in the given object. Returns a list of Variables in the order of appearance.
+
+    Args:
+        value: An object that can contain Variables. Dict and List are searched recursively.
+        variable_class (type): If provided, returns only the instances of this class.
+    """
+    variable_class = variable_class or Variable
+    if isinstance(value, dict):
+        return [v for child in value.values() for v in find_variables(child, variable_class)]
+    elif isinstance(value, list):
+        return [v for child in value for v in find_variables(child, variable_class)]
+    elif isinstance(value, variable_class):
+        return [value]
+    return []
+
+
 class Variable:
     """Base class for Variables.
 
@@ -80,21 +97,21 @@ class OutputVariable(Variable):
         self._name = parts[1]
         self._path = parts[2]
 
+    @property
+    def output_name(self):
+        """The name of the task that provides this output."""
+        return self._name
+
+    @property
+    def field_name(self):
+        """The name of the output field."""
+        return self._path
+
     def resolve(self, context):
-        outputs = context.get_outputs(self._name)
-        if not hasattr(outputs, self._path):
-            raise ValueError(f"Output {self._name} doesn't have path {self._path}")
-        return getattr(outputs, self._path)
+        return context.get_output(self._name, self._path)
 
     def get_hash(self, context):
-        outputs = context.get_outputs(self._name)
-        if isinstance(outputs, CachedOutputs):
-            return outputs.get_hash(self._path)
-
-        if not hasattr(outputs, self._path):
-            raise ValueError(f"Output {self._name} doesn't have path {self._path}")
-        value = getattr(outputs, self._path)
-        return HashGenerator.calculate_hash(value, context)
+        return context.get_output_hash(self._name, self._path)
 
     def __str__(self):
         return f"OutputVar({self._name}.{self._path})"
@@ -0,0 +1,31 @@
+import dataclasses
+from irisml.core import TaskBase
+
+
+def make_task_module(execute, cache_enabled=True):
+    """Returns a task module whose Task returns Outputs(execute(config, inputs.value)).
+
+    Register it with unittest.mock.patch.dict(sys.modules) as sys.modules['irisml.tasks.<task_name>'].
+    """
+    class TaskModule:
+        class Task(TaskBase):
+            VERSION = '0.1.0'
+            CACHE_ENABLED = cache_enabled
+
+            @dataclasses.dataclass
+            class Config:
+                name: str = ''
+                value: float = 1
+
+            @dataclasses.dataclass
+            class Inputs:
+                value: object = None
+
+            @dataclasses.dataclass
+            class Outputs:
+                value: object = None
+
+            def execute(self, inputs):
+                return self.Outputs(execute(self.config, inputs.value))
+
+    return TaskModule
@@ -1,10 +1,18 @@
 import collections
+import concurrent.futures
+import copy
 import dataclasses
+import json
+import os
+import pathlib
 import pickle
+import tempfile
 import typing
 import unittest
+import unittest.mock
+import zlib
 import torch
-from irisml.core.cache_manager import CachedOutputs, StorageManager
+from irisml.core.cache_manager import AzureBlobStorageManager, CachedOutputs, CacheManager, create_storage_manager, FileSystemStorageManager, StorageManager, TieredStorageManager
 from irisml.core.hash_generator import HashGenerator
 from irisml.core.variable import Variable
 
@@ -23,6 +31,9 @@ class DummyModule(torch.nn.Module):
         return self.conv(x)
 
 
+Pair = collections.namedtuple('Pair', ['first', 'second'])
+
+
 class TestHashGenerator(unittest.TestCase):
     def test_objects_without_variable(self):
         self.assertIsNotNone(HashGenerator.calculate_hash('abcde'))
@@ -100,6 +111,85 @@ class TestHashGenerator(unittest.TestCase):
 
         self.assertEqual(HashGenerator.calculate_hash(dummy_instance), HashGenerator.calculate_hash(dummy_instance2))
 
+    def test_dataclass_without_copy(self):
+        @dataclasses.dataclass
+        class Inner:
+            value: int
+            tensor: torch.Tensor
+
+        @dataclasses.dataclass
+        class Outer:
+            inner: Inner
+            inner_list: list
+            inner_dict: dict
+            tuple_value: tuple
+            tensor: torch.Tensor
+
+        inner = Inner(1, torch.zeros(3))
+        value = Outer(inner, [inner, Inner(2, torch.ones(2))], {'a': inner}, (1, 'a', torch.ones(1)), torch.arange(4))
+
+        # The hash is the same as the hash of the dict converted by dataclasses.asdict(), but the fields are not copied.
+        expected = HashGenerator.calculate_hash(dataclasses.asdict(value))
+        with unittest.mock.patch('copy.deepcopy', side_effect=AssertionError):
+            self.assertEqual(HashGenerator.calculate_hash(value), expected)
+            with HashGenerator.memoize():
+                self.assertEqual(HashGenerator.calculate_hash(value), expected)
+
+    def test_dataclass_with_tuples(self):
+        @dataclasses.dataclass
+        class Inner:
+            tensor: torch.Tensor
+
+        @dataclasses.dataclass
+        class Outer:
+            inner_tuple: tuple
+            shared_tuple: tuple
+            pair: Pair
+
+        inner = Inner(torch.zeros(3))
+        tensor = torch.ones(2)
+        value = Outer((inner, 3, [(inner,)]), (tensor, [tensor]), Pair(inner, 'x'))
+        self.assertEqual(HashGenerator.calculate_hash(value), HashGenerator.calculate_hash(dataclasses.asdict(value)))
+        with HashGenerator.memoize():
+            self.assertEqual(HashGenerator.calculate_hash([value.shared_tuple, value]), HashGenerator.calculate_hash([value.shared_tuple, dataclasses.asdict(value)]))
+
+    def test_memoize(self):
+        a = [1, 2, 3]
+        hash_value = HashGenerator.calculate_hash(a)
+        with HashGenerator.memoize():
+            self.assertEqual(HashGenerator.calculate_hash(a), hash_value)
+            a.append(4)  # Objects must not be modified in the context.
+            self.assertEqual(HashGenerator.calculate_hash(a), hash_value)
+            self.assertEqual(HashGenerator.calculate_hash([a, a]), HashGenerator.calculate_hash([[1, 2, 3], [1, 2, 3]]))
+        self.assertNotEqual(HashGenerator.calculate_hash(a), hash_value)
+
+    def test_hash_version(self):
+        a = torch.arange(12, dtype=torch.float32).reshape(3, 4)
+        v1_hash = HashGenerator.calculate_hash(a)
+        try:
+            HashGenerator.set_hash_version(2)
+            v2_hash = HashGenerator.calculate_hash(a)
+            self.assertNotEqual(v1_hash, v2_hash)
+            self.assertEqual(v2_hash, HashGenerator.calculate_hash(a.clone()))
+            self.assertEqual(v2_hash, HashGenerator.calculate_hash(a.t().contiguous().t()))  # Non-contiguous tensor with the same values.
+            self.assertNotEqual(v2_hash, HashGenerator.calculate_hash(a.to(torch.float64)))
+            self.assertNotEqual(v2_hash, HashGenerator.calculate_hash(a.reshape(4, 3)))
+            self.assertNotEqual(v2_hash, HashGenerator.calculate_hash(a + 1))
+            self.assertEqual(HashGenerator.calculate_hash(torch.zeros(3, dtype=torch.bfloat16)), HashGenerator.calculate_hash(torch.zeros(3, dtype=torch.bfloat16)))
+
+            torch.manual_seed(0)
+            module_a = DummyModule()
+            torch.manual_seed(0)
+            module_b = DummyModule()
+            self.assertEqual(HashGenerator.calculate_hash(module_a), HashGenerator.calculate_hash(module_b))
+            self.assertEqual(HashGenerator.calculate_hash(module_a), HashGenerator.calculate_hash(pickle.loads(pickle.dumps(module_a))))
+        finally:
+            HashGenerator.set_hash_version(1)
+
+        self.assertEqual(HashGenerator.calculate_hash(a), v1_hash)
+        with self.assertRaises(ValueError):
+            HashGenerator.set_hash_version(3)
+
     def _assert_same_hash(self, a, b):
         self.assertEqual(HashGenerator.calculate_hash(a), HashGenerator.calculate_hash(b))
 
@@ -107,16 +197,19 @@ class TestHashGenerator(unittest.TestCase):
 class FakeStorageManager(StorageManager):
     def __init__(self, data=None):
         self._data = data or {}
+        self.num_requests = 0
 
     def get_hash(self, paths):
+        self.num_requests += 1
         data = self._data.get('/'.join(paths))
         return data and data[1]
 
     def get_contents(self, paths):
+        self.num_requests += 1
         data = self._data.get('/'.join(paths))
         return data and data[0]
 
-    def put_contents(self, paths, contents, hash_value):
+    def put_contents(self, paths, contents, hash_value, codec=None, codec_level=None):
         self._data['/'.join(paths)] = (contents, hash_value)
 
 
@@ -144,3 +237,332 @@ class TestCachedOutputs(unittest.TestCase):
 
         self.assertEqual(c.elem0, 12345)
         self.assertEqual(c.elem1, '12345')
+
+    def test_load_async(self):
+        @dataclasses.dataclass
+        class Outputs:
+            elem0: int
+
+        storage = FakeStorageManager({'base/elem0': (pickle.dumps(12345), HashGenerator.calculate_hash(12345))})
+        c = CachedOutputs(storage, ['base'], Outputs, {'elem0': HashGenerator.calculate_hash(12345)})
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            future = c.load_async('elem0', executor)
+            self.assertIsNone(c.load_async('elem0', executor))
+            future.result()
+            self.assertEqual(storage.num_requests, 1)
+            self.assertEqual(c.elem0, 12345)
+            self.assertEqual(storage.num_requests, 1)
+            self.assertEqual(copy.deepcopy(c).elem0, 12345)
+
+
+class TestCacheManager(unittest.TestCase):
+    @dataclasses.dataclass
+    class Outputs:
+        elem0: int = 0
+        elem1: str = ''
+        elem2: list = dataclasses.field(default_factory=list)
+
+    def test_manifest(self):
+        storage = FakeStorageManager()
+        cache_manager = CacheManager(storage)
+        self.assertIsNone(cache_manager.get_cache('task', '1.0.0', 'hash', self.Outputs))
+
+        cache_manager.upload_cache('task', '1.0.0', 'hash', self.Outputs(42, 'value', [1, 2]))
+        self.assertIn('task/1.0.0/hash/manifest.json', storage._data)
+
+        storage.num_requests = 0
+        cached = cache_manager.get_cache('task', '1.0.0', 'hash', self.Outputs)
+        self.assertEqual(storage.num_requests, 1)
+        self.assertEqual(cached.get_hash('elem0'), HashGenerator.calculate_hash(42))
+        self.assertEqual(cached.get_size('elem1'), len(pickle.dumps('value')))
+        self.assertEqual(cached.elem2, [1, 2])
+
+    def test_without_manifest(self):
+        storage = FakeStorageManager()
+        cache_manager = CacheManager(storage)
+        cache_manager.upload_cache('task', '1.0.0', 'hash', self.Outputs(42, 'value', [1, 2]))
+        del storage._data['task/1.0.0/hash/manifest.json']
+
+        cached = cache_manager.get_cache('task', '1.0.0', 'hash', self.Outputs)
+        self.assertEqual(cached.get_hash('elem1'), HashGenerator.calculate_hash('value'))
+        self.assertIsNone(cached.get_size('elem1'))
+        self.assertEqual(cached.elem0, 42)
+
+        del storage._data['task/1.0.0/hash/elem2']
+        self.assertIsNone(cache_manager.get_cache('task', '1.0.0', 'hash', self.Outputs))
+
+    def test_background_upload(self):
+        storage = FakeStorageManager()
+        cache_manager = CacheManager(storage, background_upload=True)
+        outputs = self.Outputs(42, 'value', [1, 2])
+        cache_manager.upload_cache('task', '1.0.0', 'hash', outputs)
+        outputs.elem2.append(3)  # The cache must have a snapshot of the outputs.
+        self.assertEqual(cache_manager.flush(), [])
+
+        cached = cache_manager.get_cache('task', '1.0.0', 'hash', self.Outputs)
+        self.assertEqual(cached.elem2, [1, 2])
+        self.assertEqual(cached.get_hash('elem2'), HashGenerator.calculate_hash([1, 2]))
+
+    def test_background_upload_hash_values(self):
+        storage = FakeStorageManager()
+        cache_manager = CacheManager(storage, background_upload=True)
+        outputs = self.Outputs(42, 'value', [1, 2])
+        hash_values = {'elem0': HashGenerator.calculate_hash(42), 'elem1': 'wrong_hash', 'elem2': HashGenerator.calculate_hash([1, 2])}
+        with self.assertLogs('irisml.core.cache_manager', 'ERROR'):
+            cache_manager.upload_cache('task', '1.0.0', 'hash', outputs, hash_values)
+            outputs.elem2.append(3)
+            self.assertEqual(cache_manager.flush(), [])
+
+        cached = cache_manager.get_cache('task', '1.0.0', 'hash', self.Outputs)
+        self.assertEqual(cached.get_hash('elem0'), HashGenerator.calculate_hash(42))
+        self.assertEqual(cached.get_hash('elem2'), HashGenerator.calculate_hash([1, 2]))
+
+    def test_background_upload_failure(self):
+        class FailingStorageManager(FakeStorageManager):
+            def put_contents(self, paths, contents, hash_value, codec=None, codec_level=None):
+                raise IOError("Failed")
+
+        cache_manager = CacheManager(FailingStorageManager(), background_upload=True, max_pending_uploads=1, max_pending_bytes=1)
+        for i in range(3):
+            cache_manager.upload_cache('task', '1.0.0', f'hash{i}', self.Outputs(i))
+
+        failures = cache_manager.flush()
+        self.assertEqual([f[0] for f in failures], [['task', '1.0.0', f'hash{i}'] for i in range(3)])
+        self.assertEqual(cache_manager.flush(), [])
+
+    def test_tensors_format(self):
+        @dataclasses.dataclass
+        class Outputs:
+            tensor: torch.Tensor = None
+            state_dict: dict = None
+            small_tensor: torch.Tensor = None
+
+        outputs = Outputs(torch.arange(1024 * 1024, dtype=torch.float32), torch.nn.Linear(1024, 1024).state_dict(), torch.zeros(3))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_manager = CacheManager(FileSystemStorageManager(pathlib.Path(temp_dir)))
+            cache_manager.upload_cache('task', '1.0.0', 'hash', outputs)
+            manifest = json.loads(pathlib.Path(temp_dir, 'task', '1.0.0', 'hash', 'manifest.json').read_text())
+            self.assertEqual({k: v['format'] for k, v in manifest['fields'].items()}, {'tensor': 'tensors', 'state_dict': 'tensors', 'small_tensor': 'pickle'})
+
+            cached = cache_manager.get_cache('task', '1.0.0', 'hash', Outputs)
+            self.assertTrue(torch.equal(cached.tensor, outputs.tensor))
+            self.assertEqual(cached.get_hash('tensor'), HashGenerator.calculate_hash(outputs.tensor))
+            self.assertEqual(HashGenerator.calculate_hash(cached.state_dict), HashGenerator.calculate_hash(outputs.state_dict))
+            self.assertTrue(torch.equal(cached.small_tensor, outputs.small_tensor))
+
+            cached.tensor[0] = 42  # The change must not be written back to the cache.
+            self.assertEqual(cache_manager.get_cache('task', '1.0.0', 'hash', Outputs).tensor[0], 0)
+
+    def test_compression(self):
+        @dataclasses.dataclass
+        class Outputs:
+            text: str = ''
+            random: bytes = b''
+            small: str = ''
+            tensor: torch.Tensor = None
+
+        outputs = Outputs('a' * 100000, os.urandom(100000), 'a' * 100, torch.zeros(1024 * 1024))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_manager = CacheManager(FileSystemStorageManager(pathlib.Path(temp_dir)), compression_codec='zlib')
+            cache_manager.upload_cache('task', '1.0.0', 'hash', outputs)
+            sidecars = {name: json.loads(pathlib.Path(temp_dir, 'task', '1.0.0', 'hash', name + '.irisml.json').read_text()) for name in ('text', 'random', 'small', 'tensor')}
+            self.assertEqual({k: v.get('compression') for k, v in sidecars.items()}, {'text': 'zlib', 'random': None, 'small': None, 'tensor': None})
+            self.assertLess(sidecars['text']['size'], 10000)
+
+            cached = cache_manager.get_cache('task', '1.0.0', 'hash', Outputs)
+            self.assertEqual(cached.get_size('text'), len(pickle.dumps(outputs.text)))
+            self.assertEqual(cached.text, outputs.text)
+            self.assertEqual(cached.random, outputs.random)
+            self.assertTrue(torch.equal(cached.tensor, outputs.tensor))
+
+    def test_missing_field_in_manifest(self):
+        @dataclasses.dataclass
+        class NewOutputs:
+            elem0: int = 0
+            new_elem: int = 0
+
+        storage = FakeStorageManager()
+        cache_manager = CacheManager(storage)
+        cache_manager.upload_cache('task', '1.0.0', 'hash', self.Outputs(42, 'value', [1, 2]))
+        self.assertIsNone(cache_manager.get_cache('task', '1.0.0', 'hash', NewOutputs))
+
+
+class TestAzureBlobStorageManager(unittest.TestCase):
+    def test_reuse_client(self):
+        with unittest.mock.patch('azure.storage.blob.ContainerClient') as mock_container_client:
+            mock_container_client.from_container_url.return_value.download_blob.return_value.properties.metadata = {}
+            storage = AzureBlobStorageManager('https://example.com/container', max_concurrency=4, block_size=1024)
+            storage.get_hash(['a', 'b'])
+            storage.get_contents(['a', 'b'])
+            storage.put_contents(['a', 'c'], b'contents', 'hash')
+
+            mock_container_client.from_container_url.assert_called_once()
+            self.assertEqual(mock_container_client.from_container_url.call_args.kwargs['max_chunk_get_size'], 1024)
+            client = mock_container_client.from_container_url.return_value
+            client.download_blob.assert_called_once_with('a/b', max_concurrency=4)
+            client.upload_blob.assert_called_once_with('a/c', b'contents', metadata={'irisml_hash': 'hash'}, max_concurrency=4)
+
+    def test_list_and_delete(self):
+        with unittest.mock.patch('azure.storage.blob.ContainerClient') as mock_container_client:
+            client = mock_container_client.from_container_url.return_value
+            blob = unittest.mock.MagicMock(size=10, last_accessed_on=None)
+            blob.name = 'task/1.0/hash/field'
+            client.list_blobs.return_value = [blob]
+            storage = AzureBlobStorageManager('https://example.com/container')
+
+            files = list(storage.list_files(['task']))
+            self.assertEqual(files[0].paths, ['task', '1.0', 'hash', 'field'])
+            self.assertEqual(files[0].size, 10)
+            self.assertEqual(files[0].last_access, blob.last_modified.timestamp.return_value)
+            self.assertEqual(client.list_blobs.call_args.kwargs['name_starts_with'], 'task/')
+
+            storage.put_contents(['a', 'b'], b'0' * 100, 'hash', codec='zlib')
+            self.assertEqual(client.upload_blob.call_args.kwargs['metadata'], {'irisml_hash': 'hash', 'irisml_compression': 'zlib', 'irisml_size': '100'})
+            self.assertEqual(zlib.decompress(b''.join(client.upload_blob.call_args.args[1])), b'0' * 100)
+
+            # Compressed blobs are decompressed chunk by chunk. Blobs without the size in the metadata are supported as well.
+            compressed = zlib.compress(b'contents')
+            client.download_blob.return_value.chunks.return_value = [compressed[:5], compressed[5:]]
+            for metadata in ({'irisml_hash': 'hash', 'irisml_compression': 'zlib', 'irisml_size': '8'}, {'irisml_hash': 'hash', 'irisml_compression': 'zlib'}):
+                client.download_blob.return_value.properties.metadata = metadata
+                self.assertEqual(storage.get_contents_and_hash(['a', 'b']), (b'contents', 'hash'))
+            client.download_blob.return_value.readall.assert_not_called()
+
+            storage.delete_files([['task', str(i)] for i in range(300)])
+            self.assertEqual(client.delete_blobs.call_count, 2)
+            self.assertEqual(len(client.delete_blobs.call_args_list[0].args), 256)
+
+
+class TestFileSystemStorageManager(unittest.TestCase):
+    def test_put_and_get(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = FileSystemStorageManager(pathlib.Path(temp_dir))
+            self.assertIsNone(storage.get_hash(['task', 'field']))
+            self.assertIsNone(storage.get_contents(['task', 'field']))
+
+            storage.put_contents(['task', 'field'], pickle.dumps(12345), 'hash_value')
+            with unittest.mock.patch('pickle.loads') as mock_loads:
+                self.assertEqual(storage.get_hash(['task', 'field']), 'hash_value')
+                mock_loads.assert_not_called()
+            self.assertEqual(pickle.loads(storage.get_contents(['task', 'field'])), 12345)
+            self.assertEqual(sorted(p.name for p in pathlib.Path(temp_dir, 'task').iterdir()), ['field', 'field.irisml.json'])
+
+    def test_list_and_delete(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = FileSystemStorageManager(pathlib.Path(temp_dir))
+            storage.put_contents(['task', '1.0', 'hash', 'field'], b'12345', 'hash_value')
+            storage.put_contents(['task2', '1.0', 'hash', 'field'], b'1', 'hash_value')
+
+            files = list(storage.list_files(['task']))
+            self.assertEqual(len(files), 1)
+            self.assertEqual(files[0].paths, ['task', '1.0', 'hash', 'field'])
+            self.assertEqual(files[0].size, 5)
+            self.assertEqual(len(list(storage.list_files())), 2)
+
+            storage.delete_files([['task', '1.0', 'hash', 'field'], ['missing']])
+            self.assertIsNone(storage.get_hash(['task', '1.0', 'hash', 'field']))
+            self.assertEqual(list(pathlib.Path(temp_dir, 'task', '1.0', 'hash').iterdir()), [])
+
+    def test_max_size(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = FileSystemStorageManager(pathlib.Path(temp_dir), max_size=250)
+            storage.put_contents(['a'], b'0' * 100, 'hash_a')
+            storage.put_contents(['b'], b'0' * 100, 'hash_b')
+            os.utime(pathlib.Path(temp_dir, 'a'), (0, 0))
+            os.utime(pathlib.Path(temp_dir, 'b'), (1, 1))
+            self.assertIsNotNone(storage.get_contents(['a']))  # 'a' becomes the most recently used file.
+
+            storage.put_contents(['c'], b'0' * 100, 'hash_c')
+            self.assertIsNone(storage.get_contents(['b']))
+            self.assertIsNone(storage.get_hash(['b']))
+            self.assertEqual(storage.get_hash(['a']), 'hash_a')
+            self.assertEqual(storage.get_hash(['c']), 'hash_c')
+
+    def test_evict_entries(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_dir = pathlib.Path(temp_dir)
+            cache_manager = CacheManager(FileSystemStorageManager(temp_dir))
+            cache_manager.upload_cache('task', '1.0.0', 'a', TestCacheManager.Outputs(1, 'a' * 1000, [1]))
+            cache_manager.upload_cache('task', '1.0.0', 'b', TestCacheManager.Outputs(2, 'b' * 1000, [2]))
+            entry_size = sum(f.stat().st_size for f in (temp_dir / 'task' / '1.0.0' / 'a').iterdir() if not f.name.endswith('.irisml.json'))
+            for filepath in temp_dir.rglob('*'):
+                if filepath.is_file():
+                    os.utime(filepath, (0, 0))
+
+            # Only the manifest and elem0 of 'a' are read. Its unread field must not be evicted alone.
+            cache_manager = CacheManager(FileSystemStorageManager(temp_dir, max_size=entry_size * 2 + entry_size // 2))
+            self.assertEqual(cache_manager.get_cache('task', '1.0.0', 'a', TestCacheManager.Outputs).elem0, 1)
+            cache_manager.upload_cache('task', '1.0.0', 'c', TestCacheManager.Outputs(3, 'c' * 1000, [3]))
+
+            self.assertEqual(list((temp_dir / 'task' / '1.0.0' / 'b').glob('*')), [])
+            self.assertIsNone(cache_manager.get_cache('task', '1.0.0', 'b', TestCacheManager.Outputs))
+            self.assertEqual(cache_manager.get_cache('task', '1.0.0', 'a', TestCacheManager.Outputs).elem1, 'a' * 1000)
+            self.assertEqual(cache_manager.get_cache('task', '1.0.0', 'c', TestCacheManager.Outputs).elem1, 'c' * 1000)
+
+    def test_missing_field(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_manager = CacheManager(FileSystemStorageManager(pathlib.Path(temp_dir)))
+            cache_manager.upload_cache('task', '1.0.0', 'a', TestCacheManager.Outputs(1, 'a', [1]))
+            pathlib.Path(temp_dir, 'task', '1.0.0', 'a', 'elem1').unlink()
+            cached = cache_manager.get_cache('task', '1.0.0', 'a', TestCacheManager.Outputs)
+            with self.assertRaisesRegex(RuntimeError, 'elem1'):
+                cached.elem1
+
+    def test_without_metadata(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pathlib.Path(temp_dir, 'task').mkdir()
+            pathlib.Path(temp_dir, 'task', 'field').write_bytes(pickle.dumps(12345))
+            storage = FileSystemStorageManager(pathlib.Path(temp_dir))
+            self.assertEqual(storage.get_hash(['task', 'field']), HashGenerator.calculate_hash(12345))
+            self.assertTrue(pathlib.Path(temp_dir, 'task', 'field.irisml.json').exists())
+
+
+class TestTieredStorageManager(unittest.TestCase):
+    def test_read_through(self):
+        local = FakeStorageManager()
+        remote = FakeStorageManager({'a/b': (b'contents', 'hash')})
+        storage = TieredStorageManager([local, remote])
+
+        self.assertEqual(storage.get_hash(['a', 'b']), 'hash')
+        self.assertEqual(storage.get_contents(['a', 'b']), b'contents')
+        self.assertEqual(local._data['a/b'], (b'contents', 'hash'))
+
+        remote.num_requests = 0
+        self.assertEqual(storage.get_contents(['a', 'b']), b'contents')
+        self.assertEqual(bytes(storage.get_buffer(['a', 'b'])), b'contents')
+        self.assertEqual(remote.num_requests, 0)
+
+        self.assertIsNone(storage.get_contents(['a', 'c']))
+        stats = list(storage.get_stats().values())
+        self.assertEqual(stats[0], {'hits': 2, 'misses': 3})
+        self.assertEqual(stats[1], {'hits': 2, 'misses': 1})
+
+    def test_read_through_manifest(self):
+        local = FakeStorageManager()
+        remote = FakeStorageManager()
+        CacheManager(remote).upload_cache('task', '1.0.0', 'hash', TestCacheManager.Outputs(42, 'value', [1, 2]))
+        cached = CacheManager(TieredStorageManager([local, remote])).get_cache('task', '1.0.0', 'hash', TestCacheManager.Outputs)
+        self.assertEqual(cached.elem0, 42)
+
+        # The manifest is not copied while some fields are missing in the local tier, so the local tier alone has no cache.
+        self.assertNotIn('task/1.0.0/hash/manifest.json', local._data)
+        self.assertIsNone(CacheManager(local).get_cache('task', '1.0.0', 'hash', TestCacheManager.Outputs))
+
+        self.assertEqual(cached.elem1, 'value')
+        self.assertEqual(cached.elem2, [1, 2])
+        self.assertIn('task/1.0.0/hash/manifest.json', local._data)
+        self.assertEqual(CacheManager(local).get_cache('task', '1.0.0', 'hash', TestCacheManager.Outputs).elem2, [1, 2])
+
+    def test_write_through(self):
+        local = FakeStorageManager()
+        remote = FakeStorageManager()
+        storage = TieredStorageManager([local, remote])
+        storage.put_contents(['a'], b'contents', 'hash')
+        self.assertEqual(local._data, remote._data)
+
+    def test_create_storage_manager(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = create_storage_manager(f'{temp_dir}?max_size=1.5K;https://example.com/container?sv=token')
+            self.assertIsInstance(storage, TieredStorageManager)
+            self.assertEqual(storage._tiers[0]._max_size, 1536)
+            self.assertEqual(str(storage._tiers[1]), 'https://example.com/container')
@@ -0,0 +1,46 @@
+import pathlib
+import tempfile
+import unittest
+from irisml.core.cache_manager import CacheFileInfo, FileSystemStorageManager
+from irisml.core.commands.cache import delete_entries, group_entries, select_entries_to_delete
+
+DAY = 24 * 60 * 60
+
+
+def _make_files(task_name, version, hash_value, size, last_access):
+    return [CacheFileInfo([task_name, version, hash_value, 'field'], size, last_access), CacheFileInfo([task_name, version, hash_value, 'manifest.json'], 0, last_access)]
+
+
+class TestCacheCommand(unittest.TestCase):
+    def test_group_entries(self):
+        files = _make_files('task', '1.0', 'a', 10, 100) + _make_files('task', '1.0', 'b', 20, 200) + [CacheFileInfo(['unknown'], 1, 0)]
+        entries = group_entries(files)
+        self.assertEqual([str(e) for e in entries], ['task/1.0/a', 'task/1.0/b'])
+        self.assertEqual(entries[1].size, 20)
+        self.assertEqual(entries[1].last_access, 200)
+
+    def test_select_by_age(self):
+        entries = group_entries(_make_files('task', '1.0', 'a', 10, 0) + _make_files('task', '1.0', 'b', 10, 9 * DAY))
+        selected = select_entries_to_delete(entries, max_age_days=7, now=10 * DAY)
+        self.assertEqual([e.hash_value for e in selected], ['a'])
+
+    def test_select_by_size(self):
+        entries = group_entries(_make_files('task', '1.0', 'a', 10, 300) + _make_files('task', '1.0', 'b', 10, 100) + _make_files('task', '1.0', 'c', 10, 200))
+        selected = select_entries_to_delete(entries, max_size=15)
+        self.assertEqual(sorted(e.hash_value for e in selected), ['b', 'c'])
+        self.assertEqual(select_entries_to_delete(entries, max_size=30), [])
+
+    def test_select_stale_versions(self):
+        entries = group_entries(_make_files('task', '0.9.1', 'a', 10, 0) + _make_files('task', '0.10.0', 'b', 10, 0) + _make_files('task2', '0.1.0', 'c', 10, 0))
+        selected = select_entries_to_delete(entries, stale_versions=True)
+        self.assertEqual([str(e) for e in selected], ['task/0.9.1/a'])
+
+    def test_delete_entries(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            storage = FileSystemStorageManager(pathlib.Path(temp_dir))
+            storage.put_contents(['task', '1.0', 'a', 'field'], b'1', 'hash')
+            storage.put_contents(['task', '1.0', 'a', 'manifest.json'], b'{}', 'hash')
+            storage.put_contents(['task', '1.0', 'b', 'field'], b'2', 'hash')
+            entries = group_entries(storage.list_files())
+            delete_entries(storage, [e for e in entries if e.hash_value == 'a'])
+            self.assertEqual([str(e) for e in group_entries(storage.list_files())], ['task/1.0/b'])
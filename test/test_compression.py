@@ -0,0 +1,42 @@
+import importlib.util
+import os
+import unittest
+from irisml.core.compression import compress, compress_chunks, decompress, decompress_chunks, is_compressible, parse_compression
+
+
+class TestCompression(unittest.TestCase):
+    def _test_codec(self, codec_name):
+        data = b'0123456789' * 1000000
+        compressed = compress(data, codec_name)
+        self.assertLess(len(compressed), len(data) // 10)
+        self.assertEqual(decompress(compressed, codec_name), data)
+        self.assertEqual(b''.join(compress_chunks(bytearray(data), codec_name, 1)), compress(data, codec_name, 1))
+        self.assertEqual(decompress(compress(b'', codec_name), codec_name), b'')
+
+        chunks = list(compress_chunks(data, codec_name))
+        self.assertEqual(decompress_chunks(chunks, codec_name), data)
+        self.assertEqual(decompress_chunks(chunks, codec_name, len(data)), data)
+        with self.assertRaises(ValueError):
+            decompress_chunks(chunks, codec_name, len(data) - 1)
+
+    def test_zlib(self):
+        self._test_codec('zlib')
+
+    @unittest.skipUnless(importlib.util.find_spec('zstandard'), "zstandard is not installed")
+    def test_zstd(self):
+        self._test_codec('zstd')
+
+    @unittest.skipUnless(importlib.util.find_spec('lz4'), "lz4 is not installed")
+    def test_lz4(self):
+        self._test_codec('lz4')
+
+    def test_is_compressible(self):
+        self.assertTrue(is_compressible(b'0' * 1000, 'zlib'))
+        self.assertFalse(is_compressible(os.urandom(1000), 'zlib'))
+        self.assertFalse(is_compressible(b'', 'zlib'))
+
+    def test_parse_compression(self):
+        self.assertEqual(parse_compression('zlib'), ('zlib', None))
+        self.assertEqual(parse_compression('zlib:9'), ('zlib', 9))
+        with self.assertRaises(ValueError):
+            parse_compression('unknown')
@@ -1,5 +1,12 @@
+import dataclasses
+import pickle
+import typing
 import unittest
+import unittest.mock
+import torch
+from irisml.core.cache_manager import CachedOutputs
 from irisml.core.context import Context
+from irisml.core.hash_generator import HashGenerator
 from irisml.core.variable import EnvironmentVariable, OutputVariable
 
 
@@ -18,6 +25,113 @@ class TestContext(unittest.TestCase):
         with self.assertRaises(ValueError):
             context.get_outputs('out')
 
+    def test_clone_layers(self):
+        @dataclasses.dataclass
+        class Outputs:
+            value: typing.List
+
+        outputs = Outputs([1, 2, 3])
+        context = Context({'env': 'value'})
+        context.add_outputs('out', outputs)
+        parent_hash = context.get_output_hash('out', 'value')
+
+        new_context = context.clone()
+        self.assertIs(new_context.get_outputs('out'), outputs)
+        self.assertEqual(new_context.get_output_hash('out', 'value'), parent_hash)
+
+        # Overrides in the child are not visible to the parent.
+        new_context.add_outputs('out', Outputs([4]))
+        new_context.add_environment_variable('env', 'new_value')
+        self.assertEqual(new_context.get_output('out', 'value'), [4])
+        self.assertNotEqual(new_context.get_output_hash('out', 'value'), parent_hash)
+        self.assertEqual(new_context.get_environment_variables(), {'env': 'new_value'})
+        self.assertIs(context.get_outputs('out'), outputs)
+        self.assertEqual(context.get_output_hash('out', 'value'), parent_hash)
+        self.assertEqual(context.get_environment_variable('env'), 'value')
+
+        grandchild = new_context.clone()
+        self.assertEqual(grandchild.get_output('out', 'value'), [4])
+        self.assertEqual(grandchild.get_environment_variable('env'), 'new_value')
+
+    def test_clone_shares_outputs(self):
+        @dataclasses.dataclass
+        class Outputs:
+            value: typing.List
+
+        context = Context()
+        context.add_outputs('out', Outputs([1, 2, 3]))
+        child = context.clone()
+
+        # The output objects are not copied. In-place modifications by nested tasks are visible to the parent.
+        child.resolve(OutputVariable('$output.out.value')).append(4)
+        self.assertEqual(context.get_output('out', 'value'), [1, 2, 3, 4])
+
+    def test_release_outputs(self):
+        @dataclasses.dataclass
+        class Outputs:
+            value: list = dataclasses.field(default_factory=list)
+            unused: list = dataclasses.field(default_factory=list)
+
+        context = Context(output_consumers={('a', 'value'): {'b', 'c'}})
+        outputs = Outputs([1], [2])
+        context.add_outputs('a', outputs)
+        self.assertIs(context.get_outputs('a'), outputs)  # The fields that no task refers to are kept.
+
+        self.assertEqual(context.resolve(OutputVariable('$output.a.value')), [1])
+        expected_hash = context.get_output_hash('a', 'value')
+        context.add_outputs('b', Outputs())
+        self.assertEqual(context.get_output('a', 'value'), [1])
+
+        context.add_outputs('c', Outputs())
+        self.assertEqual(outputs.value, [1])  # The original object is not modified.
+        self.assertEqual(context.get_output('a', 'unused'), [2])
+        self.assertEqual(context.get_outputs('b'), Outputs())
+        with self.assertRaisesRegex(ValueError, '--keep_outputs'):
+            context.get_outputs('a')
+        with self.assertRaises(ValueError):
+            context.get_output('a', 'value')
+        self.assertEqual(context.get_output_hash('a', 'value'), expected_hash)
+        with self.assertRaises(ValueError):
+            context.resolve(OutputVariable('$output.a.value'))
+
+    def test_release_cached_outputs(self):
+        storage = unittest.mock.MagicMock()
+        storage.get_contents.return_value = pickle.dumps([1])
+        cached_outputs = CachedOutputs(storage, [], dataclasses.make_dataclass('Outputs', [('value', list)]), {'value': HashGenerator.calculate_hash([1])})
+        context = Context(output_consumers={('a', 'value'): {'b'}})
+        context.add_outputs('a', cached_outputs)
+        self.assertEqual(context.resolve(OutputVariable('$output.a.value')), [1])
+        context.add_outputs('b', None)
+        self.assertEqual(context.get_output_hash('a', 'value'), HashGenerator.calculate_hash([1]))
+        self.assertNotIn('value', cached_outputs._contents)
+
+    def test_release_shared_cached_outputs(self):
+        storage = unittest.mock.MagicMock()
+        storage.get_contents.return_value = pickle.dumps([1])
+        cached_outputs = CachedOutputs(storage, [], dataclasses.make_dataclass('Outputs', [('value', list)]), {'value': HashGenerator.calculate_hash([1])})
+        context = Context(output_consumers={('a', 'value'): {'b'}, ('a2', 'value'): {'c'}})
+        context.add_outputs('a', cached_outputs)
+        context.add_outputs('a2', cached_outputs)  # An identical task shares the CachedOutputs.
+        self.assertEqual(context.resolve(OutputVariable('$output.a.value')), [1])
+        context.add_outputs('b', None)
+        self.assertIn('value', cached_outputs._contents)  # a2 still needs the field.
+        context.add_outputs('c', None)
+        self.assertNotIn('value', cached_outputs._contents)
+
+    def test_add_cache_outputs(self):
+        @dataclasses.dataclass
+        class Outputs:
+            value: list = dataclasses.field(default_factory=list)
+
+        cache_manager = unittest.mock.MagicMock()
+        context = Context(cache_manager=cache_manager)
+        context.add_outputs('a', Outputs([1]))
+        context.add_cache_outputs('task', '1.0.0', 'hash', context.get_outputs('a'), 'a')
+        hash_values = cache_manager.upload_cache.call_args[0][4]
+        self.assertEqual(hash_values, {'value': HashGenerator.calculate_hash([1])})
+        with unittest.mock.patch.object(HashGenerator, 'calculate_hash', side_effect=AssertionError("Hashed again")):
+            self.assertEqual(context.get_output_hash('a', 'value'), hash_values['value'])
+
     def test_resolve(self):
         context = Context()
         self.assertEqual(context.resolve(123), 123)
@@ -37,3 +151,53 @@ class TestContext(unittest.TestCase):
 
         context.add_outputs('test_out', DummyOutput())
         self.assertEqual(context.resolve([123, OutputVariable('$output.test_out.value')]), [123, 3])
+
+    def test_resolve_dataclass(self):
+        @dataclasses.dataclass
+        class Nested:
+            value: typing.Any
+
+        @dataclasses.dataclass
+        class Inputs:
+            nested: Nested
+            data: list
+            env: typing.Any
+
+        data = [torch.zeros(3), Nested(1)]
+        inputs = Inputs(Nested(EnvironmentVariable('$env.E')), data, EnvironmentVariable('$env.E'))
+        resolved = Context({'E': 'v'}).resolve(inputs)
+        self.assertIsInstance(resolved, Inputs)
+        # Nested dataclasses are converted to dicts as dataclasses.asdict() does, but the other values are not copied.
+        self.assertEqual(resolved.nested, {'value': 'v'})
+        self.assertEqual(resolved.data[1], {'value': 1})
+        self.assertEqual(resolved.env, 'v')
+        self.assertIs(resolved.data[0], data[0])
+
+    def test_get_output_hash(self):
+        class Counter:
+            num_calls = 0
+
+            def __getstate__(self):
+                Counter.num_calls += 1
+                return {'value': 42}
+
+        class DummyOutput:
+            value = Counter()
+
+        context = Context()
+        context.add_outputs('test_out', DummyOutput())
+        expected = HashGenerator.calculate_hash({'value': 42})
+        self.assertEqual(context.get_output_hash('test_out', 'value'), expected)
+        self.assertEqual(context.get_output_hash('test_out', 'value'), expected)
+        self.assertEqual(Counter.num_calls, 1)
+
+        with HashGenerator.memoize():
+            context.get_output_hash('test_out', 'value')
+            self.assertEqual(HashGenerator.calculate_hash(DummyOutput.value), expected)
+        self.assertEqual(Counter.num_calls, 1)
+
+        with self.assertRaises(ValueError):
+            context.get_output_hash('test_out', 'unknown')
+
+        context.add_outputs('cached_out', CachedOutputs(None, [], dataclasses.make_dataclass('Outputs', ['value']), {'value': 'cached_hash'}))
+        self.assertEqual(context.get_output_hash('cached_out', 'value'), 'cached_hash')
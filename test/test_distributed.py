@@ -0,0 +1,141 @@
+import importlib
+import json
+import multiprocessing
+import os
+import pathlib
+import sys
+import tempfile
+import threading
+import unittest
+import unittest.mock
+import urllib.error
+import urllib.request
+from irisml.core.cache_manager import CacheManager, FileSystemStorageManager
+from irisml.core.distributed import Coordinator, Worker
+
+TASK_MODULE = '''
+import dataclasses
+import os
+import irisml.core
+
+
+class Task(irisml.core.TaskBase):
+    VERSION = '1.0.0'
+    CACHE_ENABLED = {cache_enabled}
+
+    @dataclasses.dataclass
+    class Config:
+        value: int = 0
+
+    @dataclasses.dataclass
+    class Inputs:
+        value: int = 0
+        value2: int = 0
+
+    @dataclasses.dataclass
+    class Outputs:
+        value: int = 0
+        pid: int = 0
+
+    def execute(self, inputs):
+        if self.config.value < 0:
+            raise ValueError("Negative value")
+        return self.Outputs(inputs.value + inputs.value2 + self.config.value, os.getpid())
+'''
+
+JOB = {'tasks': [{'task': 'dist_add', 'config': {'value': 1}},
+                 {'task': 'dist_uncached', 'inputs': {'value': '$output.dist_add.value'}, 'config': {'value': 10}},
+                 {'task': 'dist_add', 'config': {'value': 100}},
+                 {'task': 'dist_add', 'inputs': {'value': '$output.dist_uncached.value', 'value2': '$output.dist_add@2.value'}}]}
+
+
+class TestDistributed(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._temp_dir.cleanup)
+        temp_path = pathlib.Path(self._temp_dir.name)
+        (temp_path / 'irisml' / 'tasks').mkdir(parents=True)
+        (temp_path / 'irisml' / 'tasks' / 'dist_add.py').write_text(TASK_MODULE.format(cache_enabled=True))
+        (temp_path / 'irisml' / 'tasks' / 'dist_uncached.py').write_text(TASK_MODULE.format(cache_enabled=False))
+        self._cache_dir = temp_path / 'cache'
+        self._cache_dir.mkdir()
+
+        # The worker processes inherit sys.path.
+        sys_path_patcher = unittest.mock.patch.object(sys, 'path', [str(temp_path)] + sys.path)
+        sys_path_patcher.start()
+        self.addCleanup(sys_path_patcher.stop)
+        # sys.modules is not restored as a whole since the tasks import torch, which cannot be imported twice.
+        for name in ('irisml.tasks.dist_add', 'irisml.tasks.dist_uncached'):
+            self.addCleanup(sys.modules.pop, name, None)
+        importlib.invalidate_caches()
+
+    def _get_outputs(self, key):
+        outputs_class = importlib.import_module('irisml.tasks.' + key['task']).Task.Outputs
+        return CacheManager(FileSystemStorageManager(self._cache_dir)).get_cache(key['task'], key['version'], key['hash'], outputs_class)
+
+    def test_worker_processes(self):
+        coordinator = Coordinator(JOB, {})
+        context = multiprocessing.get_context('spawn')
+        workers = [context.Process(target=Worker(coordinator.url, str(self._cache_dir), f'worker{i}', poll_interval=0.05, token=coordinator.token).run) for i in range(2)]
+        for w in workers:
+            w.start()
+        coordinator.run(timeout=120)
+        for w in workers:
+            w.join(timeout=30)
+            self.assertEqual(w.exitcode, 0)
+
+        keys = coordinator.get_cache_keys()
+        self.assertEqual(set(keys), {'dist_add', 'dist_uncached', 'dist_add@2', 'dist_add@3'})
+        self.assertEqual(self._get_outputs(keys['dist_add@3']).value, 111)
+        self.assertNotEqual(self._get_outputs(keys['dist_add@3']).pid, os.getpid())
+        # The outputs of the uncached task are exchanged with a key that is not used by other runs.
+        self.assertTrue(keys['dist_uncached']['hash'].startswith(coordinator.run_id + '-'))
+        self.assertEqual(self._get_outputs(keys['dist_uncached']).value, 11)
+
+        # The second run reuses the cached outputs except for the uncached task.
+        coordinator2 = Coordinator(JOB, {})
+        thread = threading.Thread(target=Worker(coordinator2.url, str(self._cache_dir), poll_interval=0.05, token=coordinator2.token).run)
+        thread.start()
+        coordinator2.run(timeout=60)
+        thread.join()
+        keys2 = coordinator2.get_cache_keys()
+        self.assertEqual(keys2['dist_add@3'], keys['dist_add@3'])
+        self.assertEqual(self._get_outputs(keys2['dist_add@3']).pid, self._get_outputs(keys['dist_add@3']).pid)
+        self.assertNotEqual(keys2['dist_uncached'], keys['dist_uncached'])
+
+    def test_failure(self):
+        job = {'tasks': [{'task': 'dist_add', 'config': {'value': -1}}, {'task': 'dist_add', 'inputs': {'value': '$output.dist_add.value'}}]}
+        coordinator = Coordinator(job, {})
+        thread = threading.Thread(target=Worker(coordinator.url, str(self._cache_dir), poll_interval=0.05, token=coordinator.token).run)
+        thread.start()
+        with self.assertRaisesRegex(RuntimeError, 'Negative value'):
+            coordinator.run(timeout=60)
+        thread.join()
+        self.assertEqual(coordinator.get_cache_keys(), {})
+
+    def test_invalid_requests(self):
+        coordinator = Coordinator(JOB, {'SECRET': 'value'}, token='token')
+        self.assertTrue(coordinator.url.startswith('http://127.0.0.1:'))
+        # The coordinator stops with a timeout error since no task is completed.
+        thread = threading.Thread(target=self.assertRaises, args=(RuntimeError, coordinator.run, 1))
+        thread.start()
+
+        def request(path, body=None, token='token'):
+            data = body if isinstance(body, bytes) else (json.dumps(body).encode('utf-8') if body is not None else None)
+            headers = {'Authorization': f'Bearer {token}'} if token else {}
+            with urllib.request.urlopen(urllib.request.Request(coordinator.url + path, data=data, headers=headers)) as response:
+                return json.loads(response.read())
+
+        try:
+            for token in (None, 'wrong'):
+                with self.assertRaises(urllib.error.HTTPError) as cm:
+                    request('/job', token=token)
+                self.assertEqual(cm.exception.code, 401)
+            self.assertEqual(request('/job')['env'], {'SECRET': 'value'})
+
+            for body in (b'not json', {'worker': 'w'}, {'worker': 'w', 'index': 0, 'key': None}, {'worker': 'w', 'index': 0, 'key': {'task': 'a'}}):
+                with self.assertRaises(urllib.error.HTTPError) as cm:
+                    request('/complete', body)
+                self.assertEqual(cm.exception.code, 400)
+        finally:
+            thread.join()
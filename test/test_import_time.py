@@ -0,0 +1,38 @@
+import json
+import subprocess
+import sys
+import unittest
+
+# The heavy dependencies that must not be imported until they are used.
+HEAVY_MODULES = ['torch', 'numpy', 'azure.storage.blob', 'requests']
+
+# The budget for importing a module in a fresh interpreter. Importing torch alone takes seconds.
+IMPORT_TIME_BUDGET = 1.0
+
+SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{'time': time.perf_counter() - start, 'modules': [m for m in {heavy_modules} if m in sys.modules]}}))
+'''
+
+
+class TestImportTime(unittest.TestCase):
+    def _measure(self, module):
+        result = subprocess.run([sys.executable, '-c', SCRIPT.format(module=module, heavy_modules=HEAVY_MODULES)], capture_output=True, text=True, check=True)
+        return json.loads(result.stdout)
+
+    def test_core(self):
+        for module in ['irisml.core', 'irisml.core.job_runner']:
+            with self.subTest(module=module):
+                result = self._measure(module)
+                self.assertEqual(result['modules'], [])
+                self.assertLess(result['time'], IMPORT_TIME_BUDGET)
+
+    def test_commands(self):
+        for module in ['irisml.core.commands.run', 'irisml.core.commands.run_task', 'irisml.core.commands.show', 'irisml.core.commands.cache',
+                       'irisml.core.commands.sweep', 'irisml.core.commands.worker']:
+            with self.subTest(module=module):
+                result = self._measure(module)
+                self.assertEqual(result['modules'], [])
+                self.assertLess(result['time'], IMPORT_TIME_BUDGET)
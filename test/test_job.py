@@ -17,3 +17,40 @@ class TestJob(unittest.TestCase):
         job = Job(JobDescription.from_dict(job_description))
         names = [t.name for t in job.tasks]
         self.assertEqual(names, ['custom_task', 'custom_task@2', 'custom_task@3', 'custom_name', 'custom_name@2', 'custom_name@3'])
+
+    def test_get_dependencies(self):
+        job_description = {'tasks': [
+            {'task': 'task_a'},
+            {'task': 'task_b'},
+            {'task': 'task_c', 'inputs': {'a': '$output.task_a.value'}, 'config': {'nested': ['$output.task_b.value', '$output.unknown.value']}},
+            {'task': 'task_a', 'inputs': {'c': '$output.task_c.value'}},
+            {'task': 'task_d', 'inputs': {'a': '$output.task_a.value', 'a2': '$output.task_a@2.value'}}
+        ]}
+
+        job = Job(JobDescription.from_dict(job_description))
+        self.assertEqual(job.get_dependencies(), [set(), set(), {0, 1}, {2}, {0, 3}])
+
+    def test_get_consumers(self):
+        job_description = {'tasks': [
+            {'task': 'task_a'},
+            {'task': 'task_b', 'inputs': {'a': '$output.task_a.value'}},
+            {'task': 'task_c', 'inputs': {'a': '$output.task_a.value', 'a2': '$output.task_a.other', 'b': '$output.task_b.value'}},
+        ]}
+
+        job = Job(JobDescription.from_dict(job_description))
+        self.assertEqual(job.get_consumers(), {('task_a', 'value'): {'task_b', 'task_c'}, ('task_a', 'other'): {'task_c'}, ('task_b', 'value'): {'task_c'}})
+
+    def test_get_identical_task_candidates(self):
+        job_description = {'tasks': [
+            {'task': 'load', 'config': {'path': 'a'}},
+            {'task': 'load', 'config': {'path': 'a'}},
+            {'task': 'load', 'config': {'path': 'b'}},
+            {'task': 'train', 'name': 'train_a', 'inputs': {'data': '$output.load.data'}},
+            {'task': 'train', 'name': 'train_a2', 'inputs': {'data': '$output.load@2.data'}},
+            {'task': 'train', 'name': 'train_b', 'inputs': {'data': '$output.load@3.data'}},
+            {'task': 'train', 'name': 'train_env', 'inputs': {'data': '$output.load.data'}, 'config': {'lr': '$env.LR'}},
+            {'task': 'train', 'name': 'train_env2', 'inputs': {'data': '$output.load@2.data'}, 'config': {'lr': '$env.LR'}}
+        ]}
+
+        job = Job(JobDescription.from_dict(job_description))
+        self.assertEqual(job.get_identical_task_candidates(), [['load', 'load@2'], ['train_a', 'train_a2'], ['train_env', 'train_env2']])
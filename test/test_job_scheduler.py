@@ -0,0 +1,120 @@
+import sys
+import threading
+import unittest
+import unittest.mock
+from irisml.core import Context, JobDescription
+from irisml.core.job import Job
+from irisml.core.job_scheduler import JobScheduler
+from fake_task import make_task_module
+
+
+class TestJobScheduler(unittest.TestCase):
+    def test_independent_tasks_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=10)
+
+        def execute(config, value):
+            if config.name in ('a', 'b'):
+                barrier.wait()  # Deadlocks if a and b don't run at the same time.
+            return (value or 0) + 1
+
+        job_description = {'tasks': [
+            {'task': 'custom_task', 'name': 'a', 'config': {'name': 'a'}},
+            {'task': 'custom_task', 'name': 'b', 'config': {'name': 'b'}},
+            {'task': 'custom_task', 'name': 'c', 'config': {'name': 'c'}, 'inputs': {'value': '$output.a.value'}}
+        ]}
+
+        context = Context()
+        with unittest.mock.patch.dict(sys.modules):
+            sys.modules['irisml.tasks.custom_task'] = make_task_module(execute)
+            job = Job(JobDescription.from_dict(job_description))
+            job.load_modules()
+            JobScheduler(job, num_workers=2, executor_type='thread').run(context)
+
+        self.assertEqual(context.get_outputs('c').value, 2)
+
+    def test_dependencies_are_respected(self):
+        executed = []
+
+        def execute(config, value):
+            executed.append(config.name)
+            return (value or 0) + 1
+
+        job_description = {'tasks': [
+            {'task': 'custom_task', 'name': 'a', 'config': {'name': 'a'}},
+            {'task': 'custom_task', 'name': 'b', 'config': {'name': 'b'}, 'inputs': {'value': '$output.a.value'}},
+            {'task': 'custom_task', 'name': 'c', 'config': {'name': 'c'}, 'inputs': {'value': '$output.b.value'}}
+        ]}
+
+        context = Context()
+        with unittest.mock.patch.dict(sys.modules):
+            sys.modules['irisml.tasks.custom_task'] = make_task_module(execute)
+            job = Job(JobDescription.from_dict(job_description))
+            job.load_modules()
+            JobScheduler(job, num_workers=4, executor_type='thread').run(context)
+
+        self.assertEqual(executed, ['a', 'b', 'c'])
+        self.assertEqual(context.get_outputs('c').value, 3)
+
+    def test_failure(self):
+        executed = []
+
+        def execute(config, value):
+            executed.append(config.name)
+            if config.name == 'a':
+                raise RuntimeError("Failed")
+            return value or 0
+
+        job_description = {'tasks': [
+            {'task': 'custom_task', 'name': 'a', 'config': {'name': 'a'}},
+            {'task': 'custom_task', 'name': 'b', 'config': {'name': 'b'}, 'inputs': {'value': '$output.a.value'}}
+        ]}
+
+        with unittest.mock.patch.dict(sys.modules):
+            sys.modules['irisml.tasks.custom_task'] = make_task_module(execute)
+            job = Job(JobDescription.from_dict(job_description))
+            job.load_modules()
+            with self.assertRaises(RuntimeError):
+                JobScheduler(job, num_workers=2, executor_type='thread').run(Context())
+
+        self.assertEqual(executed, ['a'])
+
+    def test_identical_tasks_run_once(self):
+        executed = []
+
+        def execute(config, value):
+            executed.append(config.name)
+            return (value or 0) + 1
+
+        job_description = {'tasks': [
+            {'task': 'custom_task', 'config': {'name': 'a'}},
+            {'task': 'custom_task', 'config': {'name': 'a'}},
+            {'task': 'custom_task', 'name': 'b', 'config': {'name': 'b'}, 'inputs': {'value': '$output.custom_task.value'}},
+            {'task': 'custom_task', 'name': 'b2', 'config': {'name': 'b'}, 'inputs': {'value': '$output.custom_task@2.value'}}
+        ]}
+
+        for num_workers in (1, 2):
+            with self.subTest(num_workers=num_workers), unittest.mock.patch.dict(sys.modules):
+                executed.clear()
+                sys.modules['irisml.tasks.custom_task'] = make_task_module(execute)
+                job = Job(JobDescription.from_dict(job_description))
+                job.load_modules()
+                context = Context(identical_task_candidates=job.get_identical_task_candidates())
+                JobScheduler(job, num_workers=num_workers, executor_type='thread').run(context)
+
+                self.assertEqual(executed, ['a', 'b'])
+                self.assertIs(context.get_outputs('custom_task@2'), context.get_outputs('custom_task'))
+                self.assertEqual(context.get_outputs('b2').value, 2)
+
+    def test_default_executor(self):
+        job = Job(JobDescription.from_dict({'tasks': []}))
+        self.assertEqual(JobScheduler(job)._executor_type, 'thread')
+        self.assertEqual(JobScheduler(job, num_workers=2)._executor_type, 'process')
+        with self.assertLogs('irisml.core.job_scheduler', 'WARNING'):
+            JobScheduler(job, num_workers=2, executor_type='thread')
+
+    def test_invalid_arguments(self):
+        job = Job(JobDescription.from_dict({'tasks': []}))
+        with self.assertRaises(ValueError):
+            JobScheduler(job, num_workers=0)
+        with self.assertRaises(ValueError):
+            JobScheduler(job, executor_type='unknown')
@@ -0,0 +1,83 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+import unittest.mock
+import torch
+from irisml.core.job_runner import JobRunner
+from irisml.core.journal import RunJournal
+from fake_task import make_task_module
+
+
+class TestRunJournal(unittest.TestCase):
+    def test_resume(self):
+        executed = []
+        failing = {'b'}
+
+        def execute(config, tensor):
+            executed.append(config.name)
+            if config.name in failing:
+                raise RuntimeError("Failed")
+            return (tensor if tensor is not None else torch.zeros(1024)) + config.value
+
+        def make_job(a_value=1):
+            return {'tasks': [{'task': 'journal_task', 'name': 'a', 'config': {'name': 'a', 'value': a_value}},
+                              {'task': 'journal_task', 'name': 'b', 'config': {'name': 'b'}, 'inputs': {'value': '$output.a.value'}},
+                              {'task': 'journal_task', 'name': 'c', 'config': {'name': 'c'}, 'inputs': {'value': '$output.b.value'}}]}
+
+        with tempfile.TemporaryDirectory() as temp_dir, unittest.mock.patch.dict(sys.modules), unittest.mock.patch.dict(os.environ, {'IRISML_TASK_INDEX': ''}):
+            sys.modules['irisml.tasks.journal_task'] = make_task_module(execute, cache_enabled=False)
+
+            with self.assertRaises(RuntimeError):
+                JobRunner(make_job(), {}, run_dir=temp_dir).run()
+            self.assertEqual(executed, ['a', 'b'])
+            self.assertEqual(RunJournal(temp_dir).num_entries, 1)
+
+            # The completed task is skipped without the cache.
+            executed.clear()
+            failing.clear()
+            JobRunner(make_job(), {}, run_dir=temp_dir).run()
+            self.assertEqual(executed, ['b', 'c'])
+
+            executed.clear()
+            JobRunner(make_job(), {}, run_dir=temp_dir).run()
+            self.assertEqual(executed, [])
+
+            # The tasks run again if their inputs changed.
+            JobRunner(make_job(a_value=2), {}, run_dir=temp_dir).run()
+            self.assertEqual(executed, ['a', 'b', 'c'])
+
+    def test_broken_entry(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            journal = RunJournal(temp_dir)
+            journal.record('a', 'task', '0.1.0', 'hash', make_task_module(None).Task.Outputs(torch.ones(4)))
+            with open(os.path.join(temp_dir, RunJournal.JOURNAL_NAME), 'a') as f:
+                f.write('{"name": "b", "ta')
+
+            journal = RunJournal(temp_dir)
+            self.assertEqual(journal.num_entries, 1)
+            outputs = journal.get_outputs('a', 'task', '0.1.0', 'hash', make_task_module(None).Task.Outputs)
+            self.assertTrue(torch.equal(outputs.value, torch.ones(4)))
+            self.assertIsNone(journal.get_outputs('a', 'task', '0.2.0', 'hash', make_task_module(None).Task.Outputs))
+
+    def test_unpicklable_outputs(self):
+        executed = []
+
+        def execute(config, value):
+            executed.append(config.name)
+            return threading.Lock() if config.name == 'a' else 1
+
+        job = {'tasks': [{'task': 'journal_task', 'name': 'a', 'config': {'name': 'a'}},
+                         {'task': 'journal_task', 'name': 'b', 'config': {'name': 'b'}}]}
+
+        with tempfile.TemporaryDirectory() as temp_dir, unittest.mock.patch.dict(sys.modules), unittest.mock.patch.dict(os.environ, {'IRISML_TASK_INDEX': ''}):
+            sys.modules['irisml.tasks.journal_task'] = make_task_module(execute, cache_enabled=False)
+            with self.assertLogs('irisml.core.journal', 'WARNING'):
+                JobRunner(job, {}, run_dir=temp_dir).run()
+            self.assertEqual(RunJournal(temp_dir).num_entries, 1)
+
+            # The task whose outputs were not saved runs again.
+            executed.clear()
+            JobRunner(job, {}, run_dir=temp_dir).run()
+            self.assertEqual(executed, ['a'])
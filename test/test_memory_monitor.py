@@ -0,0 +1,17 @@
+import unittest
+from irisml.core.memory_monitor import get_rss, MemoryMonitor
+
+
+class TestMemoryMonitor(unittest.TestCase):
+    @unittest.skipIf(get_rss() is None, "RSS is not available on this platform")
+    def test_track(self):
+        monitor = MemoryMonitor(interval=0.001)
+        with monitor.track('task'):
+            data = bytearray(64 * 1024 * 1024)
+            data[::4096] = b'1' * len(data[::4096])  # Touch the pages.
+            rss = get_rss()
+            del data
+        monitor.close()
+        self.assertGreaterEqual(monitor.get_peak('task'), rss)
+        self.assertIsNone(monitor.get_peak('unknown'))
+        self.assertEqual(list(monitor.get_peaks()), ['task'])
@@ -0,0 +1,47 @@
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock
+from irisml.core.cache_manager import CachedOutputs
+from irisml.core.job_runner import JobRunner
+from irisml.core.planner import format_plan
+from fake_task import make_task_module
+
+
+class TestPlanner(unittest.TestCase):
+    def test_plan(self):
+        def execute(config, value):
+            return (value or 0) + config.value
+
+        def make_job(c_value=1):
+            return {'tasks': [{'task': 'plan_task', 'name': 'a'},
+                              {'task': 'plan_task', 'name': 'b', 'inputs': {'value': '$output.a.value'}},
+                              {'task': 'plan_task', 'name': 'c', 'inputs': {'value': '$output.b.value'}, 'config': {'value': c_value}},
+                              {'task': 'plan_uncached_task', 'name': 'd', 'inputs': {'value': '$output.a.value'}},
+                              {'task': 'plan_task', 'name': 'e', 'inputs': {'value': '$output.d.value'}}]}
+
+        with tempfile.TemporaryDirectory() as temp_dir, unittest.mock.patch.dict(sys.modules), unittest.mock.patch.dict(os.environ, {'IRISML_TASK_INDEX': ''}):
+            sys.modules['irisml.tasks.plan_task'] = make_task_module(execute)
+            sys.modules['irisml.tasks.plan_uncached_task'] = make_task_module(execute, cache_enabled=False)
+
+            plan = JobRunner(make_job(), {}, cache_storage_url=temp_dir).plan()
+            self.assertEqual([(e.name, e.status, e.reason) for e in plan], [('a', 'run', 'cache miss'), ('b', 'run', 'upstream task runs'),
+                                                                            ('c', 'run', 'upstream task runs'), ('d', 'run', 'upstream task runs'),
+                                                                            ('e', 'run', 'upstream task runs')])
+            JobRunner(make_job(), {}, cache_storage_url=temp_dir).run()
+
+            # The cached outputs are not downloaded.
+            with unittest.mock.patch.object(CachedOutputs, '_load', side_effect=AssertionError("Downloaded")):
+                plan = JobRunner(make_job(), {}, cache_storage_url=temp_dir).plan()
+                self.assertEqual([e.status for e in plan], ['hit', 'hit', 'hit', 'run', 'run'])
+                self.assertEqual(plan[3].reason, 'cache disabled for the task')
+                self.assertGreater(plan[0].download_bytes, 0)  # d consumes a.value.
+                self.assertEqual(plan[1].download_bytes, 0)
+
+                plan = JobRunner(make_job(c_value=2), {}, cache_storage_url=temp_dir).plan()
+                self.assertEqual([e.status for e in plan], ['hit', 'hit', 'run', 'run', 'run'])
+                self.assertEqual(plan[2].reason, 'cache miss')
+                self.assertGreater(plan[1].download_bytes, 0)
+
+            self.assertIn('3 to run', format_plan(plan))
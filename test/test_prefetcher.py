@@ -0,0 +1,79 @@
+import dataclasses
+import pickle
+import threading
+import unittest
+from irisml.core.cache_manager import CachedOutputs, StorageManager
+from irisml.core.context import Context
+from irisml.core.hash_generator import HashGenerator
+from irisml.core.prefetcher import Prefetcher
+
+
+class BlockingStorageManager(StorageManager):
+    """get_contents() blocks until the path is released."""
+    def __init__(self, data):
+        self._data = data
+        self.requested = []
+        self.events = {k: threading.Event() for k in data}
+
+    def get_hash(self, paths):
+        return self._data['/'.join(paths)][1]
+
+    def get_contents(self, paths):
+        key = '/'.join(paths)
+        self.requested.append(key)
+        self.events[key].wait()
+        return self._data[key][0]
+
+    def put_contents(self, paths, contents, hash_value, codec=None, codec_level=None):
+        raise NotImplementedError
+
+
+@dataclasses.dataclass
+class Outputs:
+    a: int = 0
+    b: int = 0
+
+
+def _make_cached_outputs(name):
+    storage = BlockingStorageManager({f'{name}/a': (pickle.dumps(1), HashGenerator.calculate_hash(1)), f'{name}/b': (pickle.dumps(2), HashGenerator.calculate_hash(2))})
+    hash_values = {'a': HashGenerator.calculate_hash(1), 'b': HashGenerator.calculate_hash(2)}
+    return storage, CachedOutputs(storage, [name], Outputs, hash_values, sizes={'a': 10, 'b': 10})
+
+
+class TestPrefetcher(unittest.TestCase):
+    def test_prefetch(self):
+        storage, cached_outputs = _make_cached_outputs('task_a')
+        prefetcher = Prefetcher({('task_a', 'a'): {'task_b'}})
+        context = Context(prefetcher=prefetcher)
+        context.add_outputs('task_a', cached_outputs)
+        storage.events['task_a/a'].set()
+        self.assertEqual(cached_outputs.a, 1)
+        self.assertEqual(storage.requested, ['task_a/a'])  # The field b is not consumed.
+        prefetcher.shutdown()
+
+    def test_budget(self):
+        storage, cached_outputs = _make_cached_outputs('task_a')
+        prefetcher = Prefetcher({('task_a', 'a'): {'task_b'}, ('task_a', 'b'): {'task_c'}}, max_bytes=15)
+        prefetcher.on_outputs_added('task_a', cached_outputs)
+        storage.events['task_a/a'].set()
+        self.assertEqual(cached_outputs.a, 1)
+        self.assertEqual(storage.requested, ['task_a/a'])
+
+        # The field a is released when task_b is completed.
+        prefetcher.on_outputs_added('task_b', Outputs())
+        storage.events['task_a/b'].set()
+        self.assertEqual(cached_outputs.b, 2)
+        self.assertEqual(storage.requested, ['task_a/a', 'task_a/b'])
+        prefetcher.shutdown()
+
+    def test_cancel(self):
+        storage, cached_outputs = _make_cached_outputs('task_a')
+        prefetcher = Prefetcher({('task_a', 'a'): {'task_b'}, ('task_a', 'b'): {'task_c'}}, num_workers=1)
+        prefetcher.on_outputs_added('task_a', cached_outputs)
+        prefetcher.on_outputs_added('task_c', Outputs())  # The loading of b hasn't started since the only worker is waiting for a.
+        storage.events['task_a/a'].set()
+        prefetcher.shutdown()
+        self.assertEqual(storage.requested, ['task_a/a'])
+
+        storage.events['task_a/b'].set()
+        self.assertEqual(cached_outputs.b, 2)
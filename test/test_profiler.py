@@ -0,0 +1,111 @@
+import dataclasses
+import json
+import pathlib
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import unittest.mock
+import torch
+from irisml.core import TaskBase, profiler
+from irisml.core.job_runner import JobRunner
+
+
+class CustomTask:
+    class Task(TaskBase):
+        VERSION = '0.1.0'
+        CACHE_ENABLED = True
+
+        @dataclasses.dataclass
+        class Inputs:
+            value: int = 0
+
+        @dataclasses.dataclass
+        class Outputs:
+            tensor: torch.Tensor = None
+
+        def execute(self, inputs):
+            return self.Outputs(torch.zeros(256 + inputs.value))
+
+
+class TestProfiler(unittest.TestCase):
+    def test_span(self):
+        p = profiler.Profiler()
+        p.start()
+        try:
+            with profiler.task('task'):
+                with profiler.span('resolve'):
+                    with profiler.span('download'):
+                        time.sleep(0.05)
+                profiler.add_bytes('downloaded', 100)
+                profiler.set_task_info(cache='miss')
+                profiler.set_task_info(cache='hit')  # Ignored since it's already set.
+        finally:
+            p.stop()
+
+        stats = p.get_task_stats()['task']
+        self.assertGreaterEqual(stats['phases']['download'], 0.05)
+        self.assertLess(stats['phases']['resolve'], 0.05)  # The nested span is excluded.
+        self.assertGreaterEqual(stats['wall_time'], 0.05)
+        self.assertEqual(stats['bytes'], {'downloaded': 100})
+        self.assertEqual(stats['cache'], 'miss')
+
+        trace = p.get_trace()
+        spans = [e for e in trace['traceEvents'] if e['ph'] == 'X']
+        self.assertEqual([e['name'] for e in spans], ['task', 'resolve', 'download'])
+        self.assertTrue(all(e['args']['task'] == 'task' for e in spans))
+        self.assertIn('task', p.format_summary())
+
+    def test_inactive(self):
+        self.assertIsNone(profiler.get_active_profiler())
+        with profiler.task('task'), profiler.span('execute'):
+            profiler.add_bytes('uploaded', 1)
+
+        func = unittest.mock.MagicMock()
+        self.assertIs(profiler.bind_task(func), func)
+
+    def test_bind_task(self):
+        p = profiler.Profiler()
+        p.start()
+        try:
+            with profiler.task('task'):
+                func = profiler.bind_task(lambda: profiler.add_bytes('uploaded', 10))
+            thread = threading.Thread(target=func)
+            thread.start()
+            thread.join()
+        finally:
+            p.stop()
+        self.assertEqual(p.get_task_stats()['task']['bytes'], {'uploaded': 10})
+
+    def test_get_tensor_bytes(self):
+        tensor = torch.zeros(100, dtype=torch.float32)
+        self.assertEqual(profiler.get_tensor_bytes(CustomTask.Task.Outputs(tensor)), 400)
+        self.assertEqual(profiler.get_tensor_bytes({'a': [tensor, tensor[:10]], 'b': (torch.zeros(10, dtype=torch.uint8),)}), 410)
+        self.assertEqual(profiler.get_tensor_bytes(42), 0)
+
+    def test_job_runner(self):
+        job_description = {'tasks': [{'task': 'custom_task', 'name': 'a'}, {'task': 'custom_task', 'name': 'b', 'inputs': {'value': 1}}]}
+        with tempfile.TemporaryDirectory() as temp_dir, unittest.mock.patch.dict(sys.modules):
+            sys.modules['irisml.tasks.custom_task'] = CustomTask
+            profile_filepath = pathlib.Path(temp_dir) / 'profile.json'
+            cache_dir = pathlib.Path(temp_dir) / 'cache'
+            cache_dir.mkdir()
+            JobRunner(job_description, {}, cache_storage_url=str(cache_dir), profile_filepath=profile_filepath).run()
+            first_run = json.loads(profile_filepath.read_text())
+            JobRunner(job_description, {}, cache_storage_url=str(cache_dir), profile_filepath=profile_filepath).run()
+            second_run = json.loads(profile_filepath.read_text())
+
+        tasks = first_run['otherData']['tasks']
+        self.assertEqual(list(tasks), ['a', 'b'])
+        self.assertEqual(tasks['a']['cache'], 'miss')
+        self.assertEqual(tasks['b']['output_tensor_bytes'], 257 * 4)
+        self.assertGreater(tasks['a']['bytes']['uploaded'], 0)
+        self.assertIn('execute', tasks['a']['phases'])
+        self.assertIn('upload', tasks['a']['phases'])
+
+        tasks = second_run['otherData']['tasks']
+        self.assertEqual(tasks['a']['cache'], 'hit')
+        self.assertNotIn('execute', tasks['a']['phases'])
+        self.assertIn('cache_lookup', tasks['a']['phases'])
+        self.assertIsNone(profiler.get_active_profiler())
@@ -0,0 +1,57 @@
+import collections
+import io
+import pickle
+import unittest
+import torch
+from irisml.core.serialization import deserialize, select_format, serialize, write_tensors
+
+
+class TestSerialization(unittest.TestCase):
+    def test_select_format(self):
+        self.assertEqual(select_format(torch.zeros(10)), 'tensors')
+        self.assertEqual(select_format({'a': torch.zeros(10), 'b': torch.zeros(3)}), 'tensors')
+        self.assertEqual(select_format(collections.OrderedDict(a=torch.zeros(10))), 'tensors')
+        self.assertEqual(select_format(torch.zeros(10), tensors_min_size=1024), 'pickle')
+        self.assertEqual(select_format({'a': torch.zeros(10), 'b': 3}), 'pickle')
+        self.assertEqual(select_format({}), 'pickle')
+        self.assertEqual(select_format(torch.nn.Parameter(torch.zeros(10))), 'pickle')
+        self.assertEqual(select_format(torch.zeros(10, requires_grad=True)), 'pickle')
+        self.assertEqual(select_format([torch.zeros(10)]), 'pickle')
+        self.assertEqual(select_format(12345), 'pickle')
+
+    def test_tensor(self):
+        for tensor in [torch.arange(12, dtype=torch.float32).reshape(3, 4), torch.arange(12).reshape(3, 4).t(), torch.tensor(3.5), torch.zeros(0, 3),
+                       torch.ones(5, dtype=torch.bfloat16), torch.tensor([True, False, True])]:
+            loaded = deserialize(serialize(tensor, 'tensors'), 'tensors')
+            self.assertEqual(loaded.dtype, tensor.dtype)
+            self.assertEqual(loaded.shape, tensor.shape)
+            self.assertTrue(torch.equal(loaded, tensor))
+
+    def test_dict(self):
+        state_dict = torch.nn.Linear(3, 4).state_dict()
+        loaded = deserialize(serialize(state_dict, 'tensors'), 'tensors')
+        self.assertIsInstance(loaded, collections.OrderedDict)
+        self.assertEqual(list(loaded.keys()), list(state_dict.keys()))
+        for key in state_dict:
+            self.assertTrue(torch.equal(loaded[key], state_dict[key]))
+
+        loaded = deserialize(serialize({'a': torch.zeros(3)}, 'tensors'), 'tensors')
+        self.assertIs(type(loaded), dict)
+
+    def test_write_tensors(self):
+        value = collections.OrderedDict([('a', torch.arange(10, dtype=torch.float32)), ('empty', torch.zeros(0)), ('t', torch.arange(6).reshape(2, 3).t())])
+        f = io.BytesIO()
+        self.assertEqual(write_tensors(value, f), len(serialize(value, 'tensors')))
+        self.assertEqual(f.getvalue(), bytes(serialize(value, 'tensors')))
+
+    def test_shared_memory(self):
+        buffer = serialize(torch.zeros(4), 'tensors')
+        loaded = deserialize(buffer, 'tensors')
+        loaded += 1
+        self.assertTrue(torch.equal(deserialize(buffer, 'tensors'), torch.ones(4)))
+
+    def test_pickle(self):
+        self.assertEqual(deserialize(serialize({'a': [1, 2]}, 'pickle'), 'pickle'), {'a': [1, 2]})
+        self.assertEqual(serialize(12345, 'pickle'), pickle.dumps(12345))
+        with self.assertRaises(ValueError):
+            serialize(12345, 'unknown')
@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+import numpy
+import torch
+from irisml.core import shared_memory
+
+
+def _double(value):
+    return {'tensor': value['tensor'] * 2, 'array': value['array'] * 2, 'pid': os.getpid()}
+
+
+class TestSharedMemory(unittest.TestCase):
+    def test_dumps_loads(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            large = torch.arange(1024, dtype=torch.float32)
+            value = {'large': large, 'same': large, 'small': torch.zeros(4), 'array': numpy.arange(1024, dtype=numpy.int64), 'grad': torch.zeros(4, requires_grad=True),
+                     'objects': numpy.array(['a', None], dtype=object)}
+            data = shared_memory.dumps(value, temp_dir, min_size=1024)
+            self.assertEqual(len(os.listdir(temp_dir)), 2)  # large and array. The same tensor is written once.
+            self.assertLess(len(data), 4096)
+
+            loaded = shared_memory.loads(data)
+            self.assertEqual(os.listdir(temp_dir), [])
+            self.assertTrue(torch.equal(loaded['large'], large))
+            self.assertIs(loaded['same'], loaded['large'])
+            self.assertTrue(torch.equal(loaded['small'], value['small']))
+            self.assertIsInstance(loaded['array'], numpy.ndarray)
+            self.assertTrue(numpy.array_equal(loaded['array'], value['array']))
+            self.assertTrue(loaded['grad'].requires_grad)
+            self.assertEqual(list(loaded['objects']), ['a', None])
+
+            # The loaded tensors are writable without affecting each other.
+            loaded['large'][0] = 100
+            self.assertEqual(large[0], 0)
+
+    def test_process_pool(self):
+        value = {'tensor': torch.ones(1024 * 1024), 'array': numpy.ones(1024 * 1024)}
+        with shared_memory.ProcessPool(1) as pool:
+            result = pool.run(_double, value)
+            self.assertEqual(pool.run(_double, value)['pid'], result['pid'])  # The worker is reused.
+
+        self.assertNotEqual(result['pid'], os.getpid())
+        self.assertTrue(torch.equal(result['tensor'], value['tensor'] * 2))
+        self.assertTrue(numpy.array_equal(result['array'], value['array'] * 2))
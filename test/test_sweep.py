@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock
+import torch
+from irisml.core.cache_manager import CachedOutputs
+from irisml.core.sweep import make_env_sets, SweepRunner
+from fake_task import make_task_module
+
+
+JOB = {'tasks': [{'task': 'sweep_task', 'name': 'load', 'config': {'name': 'load'}},
+                 {'task': 'sweep_task', 'name': 'preprocess', 'config': {'name': 'preprocess', 'value': 2}, 'inputs': {'value': '$output.load.value'}},
+                 {'task': 'sweep_task', 'name': 'train', 'config': {'name': 'train', 'value': '$env.SCALE'}, 'inputs': {'value': '$output.preprocess.value'}},
+                 {'task': 'sweep_uncached_task', 'name': 'record', 'config': {'name': 'record'}, 'inputs': {'value': '$output.train.value'}}]}
+
+
+class TestSweep(unittest.TestCase):
+    def test_make_env_sets(self):
+        self.assertEqual(make_env_sets({'A': '0', 'B': '0'}, {'B': ['1', '2']}), [{'A': '0', 'B': '1'}, {'A': '0', 'B': '2'}])
+        self.assertEqual(make_env_sets({}, {'B': ['1', '2']}, [{'A': '1'}, {'A': '2'}]),
+                         [{'A': '1', 'B': '1'}, {'A': '1', 'B': '2'}, {'A': '2', 'B': '1'}, {'A': '2', 'B': '2'}])
+        self.assertEqual(make_env_sets({'A': '0'}), [{'A': '0'}])
+
+    def test_shared_tasks_run_once(self):
+        executed = []
+
+        def execute(config, tensor):
+            executed.append(config.name)
+            if config.value == 4:
+                raise RuntimeError("Failed")
+            return (tensor if tensor is not None else torch.ones(1024)) * config.value
+
+        env_sets = make_env_sets({}, {'SCALE': ['1', '3', '4', '3']})
+        with unittest.mock.patch.dict(sys.modules), unittest.mock.patch.dict(os.environ, {'IRISML_TASK_INDEX': ''}):
+            sys.modules['irisml.tasks.sweep_task'] = make_task_module(execute)
+            sys.modules['irisml.tasks.sweep_uncached_task'] = make_task_module(execute, cache_enabled=False)
+            contexts = SweepRunner(JOB, env_sets, num_workers=2, release_outputs=False).run()
+
+        self.assertIsNone(contexts[2])
+        self.assertEqual(sorted(executed), sorted(['load', 'preprocess', 'train', 'train', 'train', 'record', 'record', 'record']))
+        self.assertIs(contexts[0].get_outputs('preprocess'), contexts[1].get_outputs('preprocess'))
+        self.assertIs(contexts[1].get_outputs('train'), contexts[3].get_outputs('train'))
+        self.assertIsNot(contexts[1].get_outputs('record'), contexts[3].get_outputs('record'))
+        self.assertTrue(torch.equal(contexts[0].get_outputs('record').value, torch.full((1024,), 2.0)))
+        self.assertTrue(torch.equal(contexts[1].get_outputs('record').value, torch.full((1024,), 6.0)))
+
+    def test_release_shared_cached_outputs(self):
+        def execute(config, tensor):
+            return (tensor if tensor is not None else torch.ones(1024)) * config.value
+
+        env_sets = make_env_sets({}, {'SCALE': ['1', '3', '3']})
+        with tempfile.TemporaryDirectory() as temp_dir, unittest.mock.patch.dict(sys.modules), unittest.mock.patch.dict(os.environ, {'IRISML_TASK_INDEX': ''}):
+            sys.modules['irisml.tasks.sweep_task'] = make_task_module(execute)
+            sys.modules['irisml.tasks.sweep_uncached_task'] = make_task_module(execute, cache_enabled=False)
+            SweepRunner(JOB, env_sets, cache_storage_url=temp_dir).run()
+
+            # The CachedOutputs of 'train' is shared by the last two variants. It is loaded once even if a variant releases it first.
+            with unittest.mock.patch.object(CachedOutputs, '_load', autospec=True, side_effect=CachedOutputs._load) as mock_load:
+                contexts = SweepRunner(JOB, env_sets, cache_storage_url=temp_dir).run()
+            self.assertEqual(mock_load.call_count, 2)
+            self.assertTrue(all(contexts))
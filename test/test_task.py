@@ -3,7 +3,7 @@ import sys
 import unittest
 from typing import Dict, List, Optional
 from irisml.core import Context, TaskBase, TaskDescription
-from irisml.core.task import Task
+from irisml.core.task import _execute_in_process, Task
 
 
 class TestTask(unittest.TestCase):
@@ -73,3 +73,20 @@ class TestTask(unittest.TestCase):
             task = Task(task_description)
             task.load_module()
             task.execute(context)
+
+    def test_context_in_worker_process(self):
+        """A task in a worker process cannot read other outputs through the context."""
+        class CustomTask(TaskBase):
+            @dataclasses.dataclass
+            class Outputs:
+                value: str = ''
+
+            def execute(self, inputs):
+                self.context.add_outputs('nested', self.Outputs('nested'))
+                return self.Outputs(self.context.get_output('nested', 'value') + self.context.get_environment_variable('ENV'))
+
+        self.assertEqual(_execute_in_process(CustomTask, CustomTask.Config(), CustomTask.Inputs(), {'ENV': '_env'}).value, 'nested_env')
+
+        CustomTask.execute = lambda self, inputs: self.context.get_outputs('other_task')
+        with self.assertRaisesRegex(RuntimeError, '--executor thread'):
+            _execute_in_process(CustomTask, CustomTask.Config(), CustomTask.Inputs(), {})
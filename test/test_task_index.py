@@ -0,0 +1,201 @@
+import dataclasses
+import enum
+import importlib
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import typing
+import unittest
+import unittest.mock
+from irisml.core import Context, JobDescription, TaskBase
+from irisml.core.job import Job
+from irisml.core.task import Task
+from irisml.core.task_index import TaskIndex, TaskMetadata
+
+TASK_MODULE = '''
+import dataclasses
+import typing
+import irisml.core
+
+
+class Task(irisml.core.TaskBase):
+    """Add a value."""
+    VERSION = '{version}'
+
+    @dataclasses.dataclass
+    class Config:
+        value: int
+        names: typing.List[str] = dataclasses.field(default_factory=list)
+
+    @dataclasses.dataclass
+    class Inputs:
+        value: int = 0
+
+    @dataclasses.dataclass
+    class Outputs:
+        value: int = 0
+
+    def execute(self, inputs):
+        return self.Outputs(inputs.value + self.config.value)
+'''
+
+
+class TestTaskIndex(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._temp_dir.cleanup)
+        self._temp_path = pathlib.Path(self._temp_dir.name)
+        (self._temp_path / 'irisml' / 'tasks').mkdir(parents=True)
+        self._write_task('1.0.0')
+
+        sys_path_patcher = unittest.mock.patch.object(sys, 'path', [str(self._temp_path)] + sys.path)
+        sys_path_patcher.start()
+        self.addCleanup(sys_path_patcher.stop)
+        sys_modules_patcher = unittest.mock.patch.dict(sys.modules)
+        sys_modules_patcher.start()
+        self.addCleanup(sys_modules_patcher.stop)
+        importlib.invalidate_caches()
+
+    def _write_task(self, version):
+        filepath = self._temp_path / 'irisml' / 'tasks' / 'indexed_task.py'
+        filepath.write_text(TASK_MODULE.format(version=version))
+        # Make sure the modification time changes even on file systems with coarse timestamps.
+        stat = filepath.stat()
+        os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def _unload_task(self):
+        sys.modules.pop('irisml.tasks.indexed_task', None)
+
+    def test_get(self):
+        index_filepath = self._temp_path / 'index.json'
+        metadata = TaskIndex(index_filepath).get('indexed_task')
+        self.assertEqual(metadata.version, '1.0.0')
+        self.assertEqual(metadata.doc, 'Add a value.')
+        self.assertEqual(metadata.get_fields('config'), [('value', "<class 'int'>"), ('names', 'typing.List[str]')])
+        self.assertTrue(index_filepath.exists())
+
+        # The second lookup doesn't import the module.
+        self._unload_task()
+        metadata = TaskIndex(index_filepath).get('indexed_task')
+        self.assertEqual(metadata.version, '1.0.0')
+        self.assertNotIn('irisml.tasks.indexed_task', sys.modules)
+
+        # The entry is rebuilt when the module is modified.
+        self._write_task('2.0.0')
+        self.assertIsNone(TaskIndex(index_filepath).get('indexed_task', import_module=False))
+        self.assertEqual(TaskIndex(index_filepath).get('indexed_task').version, '2.0.0')
+
+        with self.assertRaises(RuntimeError):
+            TaskIndex(index_filepath).get('missing_task')
+
+    def test_validate_job(self):
+        index_filepath = self._temp_path / 'index.json'
+        TaskIndex(index_filepath).get('indexed_task')
+        self._unload_task()
+
+        job = Job(JobDescription.from_dict({'tasks': [{'task': 'indexed_task', 'config': {'value': 1}}, {'task': 'indexed_task', 'config': {'value': 2, 'names': ['a']}}]}))
+        job.validate(TaskIndex(index_filepath))
+        self.assertNotIn('irisml.tasks.indexed_task', sys.modules)
+
+        invalid_job = Job(JobDescription.from_dict({'tasks': [{'task': 'indexed_task', 'config': {'value': 1, 'unknown': 3}}]}))
+        with self.assertRaises(ValueError):
+            invalid_job.validate(TaskIndex(index_filepath))
+        missing_job = Job(JobDescription.from_dict({'tasks': [{'task': 'indexed_task', 'config': {}}]}))
+        with self.assertRaises(TypeError):
+            missing_job.validate(TaskIndex(index_filepath))
+
+        # The module is imported when the task runs.
+        context = Context()
+        for task in job.tasks:
+            task.execute(context)
+        self.assertEqual(context.get_outputs('indexed_task@2').value, 2)
+
+    def test_package_task(self):
+        package_dir = self._temp_path / 'irisml' / 'tasks' / 'package_task'
+        package_dir.mkdir()
+        (package_dir / '__init__.py').write_text('from .task import Task\n')
+        task_source = TASK_MODULE.format(version='1.0.0').replace('class Config:', 'class Config(Base):')
+        (package_dir / 'task.py').write_text(task_source.replace('import irisml.core\n', 'import irisml.core\nfrom .base import Base\n'))
+        base_filepath = package_dir / 'base.py'
+        base_filepath.write_text('import dataclasses\n\n\n@dataclasses.dataclass\nclass Base:\n    value: int\n')
+        importlib.invalidate_caches()
+
+        index_filepath = self._temp_path / 'index.json'
+        self.assertEqual(TaskIndex(index_filepath).get('package_task').get_fields('config'), [('value', "<class 'int'>"), ('names', 'typing.List[str]')])
+        for name in [n for n in sys.modules if n.startswith('irisml.tasks.package_task')]:
+            del sys.modules[name]
+        self.assertIsNotNone(TaskIndex(index_filepath).get('package_task', import_module=False))
+
+        # A modified file in the package invalidates the entry.
+        base_filepath.write_text('import dataclasses\n\n\n@dataclasses.dataclass\nclass Base:\n    value: int\n    scale: float = 1.0\n')
+        stat = base_filepath.stat()
+        os.utime(base_filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNone(TaskIndex(index_filepath).get('package_task', import_module=False))
+        self.assertEqual([n for n, _ in TaskIndex(index_filepath).get('package_task').get_fields('config')], ['value', 'scale', 'names'])
+
+    def test_validate_with_stale_index(self):
+        index_filepath = self._temp_path / 'index.json'
+        TaskIndex(index_filepath).get('indexed_task')
+        self._unload_task()
+
+        # Simulate a change that the index doesn't track. The task module is imported and the job is validated again.
+        index = json.loads(index_filepath.read_text())
+        index['tasks']['indexed_task']['metadata']['config']['fields'].pop()
+        index_filepath.write_text(json.dumps(index))
+
+        job = Job(JobDescription.from_dict({'tasks': [{'task': 'indexed_task', 'config': {'value': 1, 'names': ['a']}}]}))
+        job.validate(TaskIndex(index_filepath))
+        self.assertIn('irisml.tasks.indexed_task', sys.modules)
+        self.assertEqual(len(json.loads(index_filepath.read_text())['tasks']['indexed_task']['metadata']['config']['fields']), 2)
+
+        invalid_job = Job(JobDescription.from_dict({'tasks': [{'task': 'indexed_task', 'config': {'value': 1, 'unknown': 3}}]}))
+        with self.assertRaises(ValueError):
+            invalid_job.validate(TaskIndex(index_filepath))
+
+
+class TestTaskMetadata(unittest.TestCase):
+    def test_create_task_class(self):
+        class Color(enum.Enum):
+            RED = 'red'
+            BLUE = 'blue'
+
+        class Scale:
+            def __init__(self, value):
+                self.value = value
+
+        @dataclasses.dataclass
+        class Child:
+            path: pathlib.Path
+            weight: typing.Optional[float] = None
+
+        class TaskModule:
+            class Task(TaskBase):
+                VERSION = '0.1.0'
+                CACHE_ENABLED = False
+
+                @dataclasses.dataclass
+                class Config:
+                    child: Child
+                    color: Color
+                    values: typing.Dict[str, typing.List[int]]
+                    scale: Scale = None
+
+        metadata = TaskMetadata.from_task_class('task', TaskModule.Task)
+        task_class = TaskMetadata(**dataclasses.asdict(metadata)).create_task_class()
+        self.assertEqual(task_class.VERSION, '0.1.0')
+        self.assertFalse(task_class.CACHE_ENABLED)
+
+        config_dict = {'child': {'path': 'a/b'}, 'color': 'blue', 'values': {'a': [1, 2]}, 'scale': 3}
+        expected = Task._load_config(TaskModule.Task.Config, config_dict)
+        actual = Task._load_config(task_class.Config, config_dict)
+        self.assertEqual(actual.child.path, expected.child.path)
+        self.assertIsNone(actual.child.weight)
+        self.assertEqual(actual.color.value, 'blue')
+        self.assertEqual(actual.values, expected.values)
+        self.assertEqual(expected.scale.value, 3)
+        self.assertEqual(actual.scale, 3)  # Types that are not in the index accept any value.
+
+        with self.assertRaises(ValueError):
+            Task._load_config(task_class.Config, {**config_dict, 'color': 'green'})